@@ -11,7 +11,17 @@ from alembic import context
 # Import all models to ensure they are registered with Base.metadata
 from app.core.config import settings
 from app.db.base import Base
-from app.models import IdempotencyKey, Order, OrderItem, Outbox, Product  # noqa: F401
+from app.models import (  # noqa: F401
+    IdempotencyKey,
+    Order,
+    OrderItem,
+    Outbox,
+    OutboxArchive,
+    OutboxPartitionLease,
+    OutboxWorkerMember,
+    Product,
+    ProductStockShard,
+)
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
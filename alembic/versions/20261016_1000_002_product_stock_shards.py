@@ -0,0 +1,53 @@
+"""Sharded stock counters
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-16 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "002"
+down_revision: Union[str, None] = "001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "products",
+        sa.Column("stock_shards", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+    # Create product_stock_shards table
+    op.create_table(
+        "product_stock_shards",
+        sa.Column("product_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("shard_no", sa.Integer(), nullable=False),
+        sa.Column("stock", sa.Integer(), nullable=False, server_default="0"),
+        sa.ForeignKeyConstraint(["product_id"], ["products.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("product_id", "shard_no"),
+    )
+
+
+def downgrade() -> None:
+    # Fold sharded stock back into products before dropping the shards
+    op.execute(
+        """
+        UPDATE products p
+        SET stock = s.total
+        FROM (
+            SELECT product_id, SUM(stock) AS total
+            FROM product_stock_shards
+            GROUP BY product_id
+        ) s
+        WHERE p.id = s.product_id AND p.stock_shards > 0
+        """
+    )
+    op.drop_table("product_stock_shards")
+    op.drop_column("products", "stock_shards")
@@ -0,0 +1,35 @@
+"""Pending idempotency key claims
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-16 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "003"
+down_revision: Union[str, None] = "002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "idempotency_keys",
+        sa.Column("status", sa.String(20), nullable=False, server_default="completed"),
+    )
+    op.add_column(
+        "idempotency_keys",
+        sa.Column("claimed_until", sa.DateTime(timezone=True), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    # Claims without an order cannot be represented in the old schema
+    op.execute("DELETE FROM idempotency_keys WHERE status = 'pending'")
+    op.drop_column("idempotency_keys", "claimed_until")
+    op.drop_column("idempotency_keys", "status")
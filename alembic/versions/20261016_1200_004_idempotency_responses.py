@@ -0,0 +1,27 @@
+"""Stored idempotent responses
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "004"
+down_revision: Union[str, None] = "003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("idempotency_keys", sa.Column("response_status", sa.Integer(), nullable=True))
+    op.add_column("idempotency_keys", sa.Column("response_body", sa.LargeBinary(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("idempotency_keys", "response_body")
+    op.drop_column("idempotency_keys", "response_status")
@@ -0,0 +1,105 @@
+"""Partition idempotency_keys by created_at
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-16 13:00:00.000000
+
+"""
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "005"
+down_revision: Union[str, None] = "004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = (
+    "key, request_hash, order_id, status, claimed_until, "
+    "response_status, response_body, created_at"
+)
+
+
+def create_daily_partition_sql(table: str, day: date) -> str:
+    """DDL creating the partition of `day` (UTC) if it does not exist."""
+    start = datetime.combine(day, time.min, tzinfo=timezone.utc)
+    end = start + timedelta(days=1)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {table}_p{day:%Y%m%d} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE idempotency_keys RENAME TO idempotency_keys_unpartitioned")
+    op.execute(
+        "ALTER TABLE idempotency_keys_unpartitioned "
+        "RENAME CONSTRAINT idempotency_keys_pkey TO idempotency_keys_unpartitioned_pkey"
+    )
+    op.execute("DROP INDEX ix_idempotency_keys_order_id")
+
+    # The partition key must be part of the primary key, so uniqueness of `key`
+    # alone is enforced by the application under an advisory lock.
+    op.execute(
+        """
+        CREATE TABLE idempotency_keys (
+            key VARCHAR(255) NOT NULL,
+            request_hash VARCHAR(64) NOT NULL,
+            order_id UUID NOT NULL,
+            status VARCHAR(20) NOT NULL DEFAULT 'completed',
+            claimed_until TIMESTAMP WITH TIME ZONE,
+            response_status INTEGER,
+            response_body BYTEA,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            PRIMARY KEY (key, created_at)
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+    op.create_index("ix_idempotency_keys_order_id", "idempotency_keys", ["order_id"])
+
+    # Rows outside the daily partitions (existing keys, or days the purger has not
+    # created yet) land in the default partition and are purged with DELETE.
+    op.execute("CREATE TABLE idempotency_keys_default PARTITION OF idempotency_keys DEFAULT")
+    today = datetime.now(timezone.utc).date()
+    for offset in range(3):
+        op.execute(create_daily_partition_sql("idempotency_keys", today + timedelta(days=offset)))
+
+    op.execute(
+        f"INSERT INTO idempotency_keys ({COLUMNS}) "
+        f"SELECT {COLUMNS} FROM idempotency_keys_unpartitioned"
+    )
+    op.execute("DROP TABLE idempotency_keys_unpartitioned")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE idempotency_keys RENAME TO idempotency_keys_partitioned")
+    op.execute(
+        "ALTER TABLE idempotency_keys_partitioned "
+        "RENAME CONSTRAINT idempotency_keys_pkey TO idempotency_keys_partitioned_pkey"
+    )
+    op.execute("DROP INDEX ix_idempotency_keys_order_id")
+    op.execute(
+        """
+        CREATE TABLE idempotency_keys (
+            key VARCHAR(255) NOT NULL PRIMARY KEY,
+            request_hash VARCHAR(64) NOT NULL,
+            order_id UUID NOT NULL,
+            status VARCHAR(20) NOT NULL DEFAULT 'completed',
+            claimed_until TIMESTAMP WITH TIME ZONE,
+            response_status INTEGER,
+            response_body BYTEA,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+        )
+        """
+    )
+    op.create_index("ix_idempotency_keys_order_id", "idempotency_keys", ["order_id"])
+
+    # Expired keys may have been reused: keep the newest row per key
+    op.execute(
+        f"INSERT INTO idempotency_keys ({COLUMNS}) "
+        f"SELECT DISTINCT ON (key) {COLUMNS} FROM idempotency_keys_partitioned "
+        f"ORDER BY key, created_at DESC"
+    )
+    op.execute("DROP TABLE idempotency_keys_partitioned")
@@ -0,0 +1,40 @@
+"""Notify the outbox worker on insert
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "006"
+down_revision: Union[str, None] = "005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+NOTIFY_FUNCTION_DDL = """
+CREATE OR REPLACE FUNCTION notify_outbox_insert() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('outbox_events', '');
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+NOTIFY_TRIGGER_DDL = """
+CREATE TRIGGER outbox_notify AFTER INSERT ON outbox
+FOR EACH STATEMENT EXECUTE FUNCTION notify_outbox_insert()
+"""
+
+
+def upgrade() -> None:
+    op.execute(NOTIFY_FUNCTION_DDL)
+    op.execute(NOTIFY_TRIGGER_DDL)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS outbox_notify ON outbox")
+    op.execute("DROP FUNCTION IF EXISTS notify_outbox_insert()")
@@ -0,0 +1,29 @@
+"""Outbox claim leases
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-16 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "007"
+down_revision: Union[str, None] = "006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("outbox", sa.Column("claimed_by", sa.String(255), nullable=True))
+    op.add_column("outbox", sa.Column("lease_until", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    # Events in flight are retried from the start by the old worker
+    op.execute("UPDATE outbox SET status = 'pending' WHERE status = 'processing'")
+    op.drop_column("outbox", "lease_until")
+    op.drop_column("outbox", "claimed_by")
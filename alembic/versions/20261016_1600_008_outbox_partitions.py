@@ -0,0 +1,86 @@
+"""Ordered, hash-partitioned outbox events
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-16 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "008"
+down_revision: Union[str, None] = "007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Number of hash partitions events are spread over by partition_key
+OUTBOX_PARTITIONS = 64
+
+
+def upgrade() -> None:
+    # Number existing events in creation order before switching to an identity
+    op.add_column("outbox", sa.Column("sequence", sa.BigInteger(), nullable=True))
+    op.execute(
+        "UPDATE outbox SET sequence = numbered.n FROM ("
+        "SELECT id, row_number() OVER (ORDER BY created_at, id) AS n FROM outbox"
+        ") AS numbered WHERE outbox.id = numbered.id"
+    )
+    op.alter_column("outbox", "sequence", nullable=False)
+    op.execute("ALTER TABLE outbox ALTER COLUMN sequence ADD GENERATED BY DEFAULT AS IDENTITY")
+    op.execute(
+        "SELECT setval(pg_get_serial_sequence('outbox', 'sequence'), "
+        "COALESCE(MAX(sequence), 0) + 1, false) FROM outbox"
+    )
+    op.create_unique_constraint("uq_outbox_sequence", "outbox", ["sequence"])
+
+    op.add_column("outbox", sa.Column("partition_key", sa.String(255), nullable=True))
+    op.execute(
+        "UPDATE outbox SET partition_key = COALESCE(payload_json::json->>'order_id', id::text)"
+    )
+    op.alter_column("outbox", "partition_key", nullable=False)
+    op.add_column(
+        "outbox",
+        sa.Column(
+            "partition",
+            sa.SmallInteger(),
+            sa.Computed(
+                "(('x' || substr(md5(partition_key), 1, 8))::bit(32)::bigint "
+                f"% {OUTBOX_PARTITIONS})::smallint"
+            ),
+        ),
+    )
+    op.create_index("ix_outbox_partition", "outbox", ["partition"])
+    op.create_index("ix_outbox_partition_key_sequence", "outbox", ["partition_key", "sequence"])
+
+    op.create_table(
+        "outbox_partition_leases",
+        sa.Column("partition", sa.SmallInteger(), autoincrement=False, nullable=False),
+        sa.Column("owner", sa.String(255), nullable=False),
+        sa.Column("lease_until", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("partition"),
+    )
+    op.create_index(
+        "ix_outbox_partition_leases_owner", "outbox_partition_leases", ["owner"]
+    )
+
+    op.create_table(
+        "outbox_workers",
+        sa.Column("worker_id", sa.String(255), nullable=False),
+        sa.Column("lease_until", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("worker_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("outbox_workers")
+    op.drop_index("ix_outbox_partition_leases_owner", table_name="outbox_partition_leases")
+    op.drop_table("outbox_partition_leases")
+    op.drop_index("ix_outbox_partition_key_sequence", table_name="outbox")
+    op.drop_index("ix_outbox_partition", table_name="outbox")
+    op.drop_column("outbox", "partition")
+    op.drop_column("outbox", "partition_key")
+    op.drop_constraint("uq_outbox_sequence", "outbox", type_="unique")
+    op.drop_column("outbox", "sequence")
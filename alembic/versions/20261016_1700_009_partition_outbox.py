@@ -0,0 +1,206 @@
+"""Partition outbox by created_at and archive sent events
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-16 17:00:00.000000
+
+"""
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "009"
+down_revision: Union[str, None] = "008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Number of hash partitions events are spread over by partition_key
+OUTBOX_PARTITIONS = 64
+
+NOTIFY_TRIGGER_DDL = """
+CREATE TRIGGER outbox_notify AFTER INSERT ON outbox
+FOR EACH STATEMENT EXECUTE FUNCTION notify_outbox_insert()
+"""
+
+# `partition` is generated and cannot be copied
+COLUMNS = (
+    "id, sequence, partition_key, event_type, payload_json, status, attempts, "
+    "next_attempt_at, created_at, claimed_by, lease_until"
+)
+
+ARCHIVE_COLUMNS = "id, sequence, partition_key, event_type, payload_json, attempts, created_at"
+
+OLD_INDEXES = (
+    "ix_outbox_event_type",
+    "ix_outbox_status",
+    "ix_outbox_next_attempt_at",
+    "ix_outbox_partition",
+    "ix_outbox_partition_key_sequence",
+)
+
+
+def create_daily_partition_sql(table: str, day: date) -> str:
+    """DDL creating the partition of `day` (UTC) if it does not exist."""
+    start = datetime.combine(day, time.min, tzinfo=timezone.utc)
+    end = start + timedelta(days=1)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {table}_p{day:%Y%m%d} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+
+
+def create_unfinished_indexes() -> None:
+    op.create_index(
+        "ix_outbox_partition_key_sequence",
+        "outbox",
+        ["partition_key", "sequence"],
+        postgresql_where=sa.text("status IN ('pending', 'processing')"),
+    )
+    op.create_index(
+        "ix_outbox_pending_next_attempt_at",
+        "outbox",
+        ["next_attempt_at"],
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+    op.create_index(
+        "ix_outbox_processing_lease_until",
+        "outbox",
+        ["lease_until"],
+        postgresql_where=sa.text("status = 'processing'"),
+    )
+
+
+def upgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS outbox_notify ON outbox")
+    op.execute("ALTER TABLE outbox RENAME TO outbox_unpartitioned")
+    op.execute(
+        "ALTER TABLE outbox_unpartitioned "
+        "RENAME CONSTRAINT outbox_pkey TO outbox_unpartitioned_pkey"
+    )
+    op.execute("ALTER TABLE outbox_unpartitioned DROP CONSTRAINT uq_outbox_sequence")
+    for index in OLD_INDEXES:
+        op.execute(f"DROP INDEX {index}")
+
+    # Partitioned tables support no identity columns and no unique constraint
+    # without the partition key, so `sequence` comes from a plain sequence
+    op.execute("CREATE SEQUENCE outbox_sequence_seq")
+    op.execute(
+        "SELECT setval('outbox_sequence_seq', COALESCE(MAX(sequence), 0) + 1, false) "
+        "FROM outbox_unpartitioned"
+    )
+    op.execute(
+        f"""
+        CREATE TABLE outbox (
+            id UUID NOT NULL,
+            sequence BIGINT NOT NULL DEFAULT nextval('outbox_sequence_seq'),
+            partition_key VARCHAR(255) NOT NULL,
+            partition SMALLINT GENERATED ALWAYS AS (
+                (('x' || substr(md5(partition_key), 1, 8))::bit(32)::bigint
+                % {OUTBOX_PARTITIONS})::smallint
+            ) STORED,
+            event_type VARCHAR(100) NOT NULL,
+            payload_json TEXT NOT NULL,
+            status VARCHAR(20) NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at TIMESTAMP WITH TIME ZONE NOT NULL,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            claimed_by VARCHAR(255),
+            lease_until TIMESTAMP WITH TIME ZONE,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+    op.execute("ALTER SEQUENCE outbox_sequence_seq OWNED BY outbox.sequence")
+    op.create_index("ix_outbox_sequence", "outbox", ["sequence"])
+    op.create_index("ix_outbox_partition", "outbox", ["partition"])
+    op.create_index("ix_outbox_event_type", "outbox", ["event_type"])
+    create_unfinished_indexes()
+
+    # Rows outside the daily partitions (existing events, events left unfinished
+    # in an archived partition, or days not created yet) land in the default one
+    op.execute("CREATE TABLE outbox_default PARTITION OF outbox DEFAULT")
+    today = datetime.now(timezone.utc).date()
+    for offset in range(3):
+        op.execute(create_daily_partition_sql("outbox", today + timedelta(days=offset)))
+
+    op.execute(f"INSERT INTO outbox ({COLUMNS}) SELECT {COLUMNS} FROM outbox_unpartitioned")
+    op.execute("DROP TABLE outbox_unpartitioned")
+    op.execute(NOTIFY_TRIGGER_DDL)
+
+    op.create_table(
+        "outbox_archive",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("sequence", sa.BigInteger(), nullable=False),
+        sa.Column("partition_key", sa.String(255), nullable=False),
+        sa.Column("event_type", sa.String(100), nullable=False),
+        sa.Column("payload_json", sa.Text(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column(
+            "archived_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False
+        ),
+    )
+    op.create_index("ix_outbox_archive_partition_key", "outbox_archive", ["partition_key"])
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS outbox_notify ON outbox")
+    op.execute("ALTER TABLE outbox RENAME TO outbox_partitioned")
+    op.execute(
+        "ALTER TABLE outbox_partitioned "
+        "RENAME CONSTRAINT outbox_pkey TO outbox_partitioned_pkey"
+    )
+    for index in (
+        "ix_outbox_sequence",
+        "ix_outbox_partition",
+        "ix_outbox_event_type",
+        "ix_outbox_partition_key_sequence",
+        "ix_outbox_pending_next_attempt_at",
+        "ix_outbox_processing_lease_until",
+    ):
+        op.execute(f"DROP INDEX {index}")
+
+    op.execute(
+        f"""
+        CREATE TABLE outbox (
+            id UUID NOT NULL PRIMARY KEY,
+            sequence BIGINT NOT NULL GENERATED BY DEFAULT AS IDENTITY,
+            partition_key VARCHAR(255) NOT NULL,
+            partition SMALLINT GENERATED ALWAYS AS (
+                (('x' || substr(md5(partition_key), 1, 8))::bit(32)::bigint
+                % {OUTBOX_PARTITIONS})::smallint
+            ) STORED,
+            event_type VARCHAR(100) NOT NULL,
+            payload_json TEXT NOT NULL,
+            status VARCHAR(20) NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at TIMESTAMP WITH TIME ZONE NOT NULL,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            claimed_by VARCHAR(255),
+            lease_until TIMESTAMP WITH TIME ZONE,
+            CONSTRAINT uq_outbox_sequence UNIQUE (sequence)
+        )
+        """
+    )
+    op.execute(f"INSERT INTO outbox ({COLUMNS}) SELECT {COLUMNS} FROM outbox_partitioned")
+    op.execute(
+        f"INSERT INTO outbox ({ARCHIVE_COLUMNS}, status, next_attempt_at) "
+        f"SELECT {ARCHIVE_COLUMNS}, 'sent', created_at FROM outbox_archive"
+    )
+    op.execute(
+        "SELECT setval(pg_get_serial_sequence('outbox', 'sequence'), "
+        "COALESCE(MAX(sequence), 0) + 1, false) FROM outbox"
+    )
+    op.execute("DROP TABLE outbox_partitioned")
+    op.drop_table("outbox_archive")
+
+    op.create_index("ix_outbox_event_type", "outbox", ["event_type"])
+    op.create_index("ix_outbox_status", "outbox", ["status"])
+    op.create_index("ix_outbox_next_attempt_at", "outbox", ["next_attempt_at"])
+    op.create_index("ix_outbox_partition", "outbox", ["partition"])
+    op.create_index("ix_outbox_partition_key_sequence", "outbox", ["partition_key", "sequence"])
+    op.execute(NOTIFY_TRIGGER_DDL)
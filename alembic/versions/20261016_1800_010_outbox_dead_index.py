@@ -0,0 +1,30 @@
+"""Index dead outbox events for dead-letter inspection
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-16 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "010"
+down_revision: Union[str, None] = "009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_outbox_dead_created_at_id",
+        "outbox",
+        ["created_at", "id"],
+        postgresql_where=sa.text("status = 'dead'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_outbox_dead_created_at_id", table_name="outbox")
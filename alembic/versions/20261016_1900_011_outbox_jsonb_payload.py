@@ -0,0 +1,44 @@
+"""Store outbox payloads as JSONB
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-16 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "011"
+down_revision: Union[str, None] = "010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ("outbox", "outbox_archive")
+
+
+def upgrade() -> None:
+    # Rewrites every partition under an exclusive lock; run it while the
+    # outbox backlog is small
+    for table in TABLES:
+        op.execute(
+            f"ALTER TABLE {table} ALTER COLUMN payload_json TYPE jsonb USING payload_json::jsonb"
+        )
+    op.create_index(
+        "ix_outbox_dead_payload",
+        "outbox",
+        ["payload_json"],
+        postgresql_using="gin",
+        postgresql_ops={"payload_json": "jsonb_path_ops"},
+        postgresql_where=sa.text("status = 'dead'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_outbox_dead_payload", table_name="outbox")
+    for table in TABLES:
+        op.execute(
+            f"ALTER TABLE {table} ALTER COLUMN payload_json TYPE text USING payload_json::text"
+        )
@@ -0,0 +1,147 @@
+"""Circuit breaker for calls to an unreliable dependency."""
+import asyncio
+import time
+from collections import deque
+from enum import Enum
+
+import httpx
+
+from app.core.logging_config import get_logger
+from app.core.metrics import circuit_breaker_state, circuit_breaker_transitions_total
+
+logger = get_logger(__name__)
+
+
+class CircuitState(str, Enum):
+    """Circuit breaker state."""
+
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+
+
+# Gauge values of circuit_breaker_state
+STATE_GAUGE_VALUES = {CircuitState.CLOSED: 0, CircuitState.HALF_OPEN: 1, CircuitState.OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit is open."""
+
+
+def is_upstream_failure(error: BaseException) -> bool:
+    """Whether `error` means the dependency itself failed, rather than the request."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500 or error.response.status_code == 429
+    return isinstance(error, httpx.TransportError | asyncio.TimeoutError)
+
+
+class CircuitBreaker:
+    """
+    Closed/open/half-open circuit breaker over a failure-rate window.
+
+    While closed, the outcomes of the last `window_size` calls are kept, and the
+    circuit opens once at least `min_calls` of them failed at `failure_rate` or
+    more. An open circuit rejects calls for `open_seconds`, then lets up to
+    `half_open_max_calls` trial calls through: a failed trial re-opens it for
+    twice as long (up to `max_open_seconds`), and as many successes close it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float,
+        window_size: int,
+        min_calls: int,
+        open_seconds: float,
+        max_open_seconds: float,
+        half_open_max_calls: int,
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.half_open_max_calls = half_open_max_calls
+
+        self._outcomes: deque[bool] = deque(maxlen=window_size)
+        self._state = CircuitState.CLOSED
+        self._opened_for = open_seconds
+        self._retry_at = 0.0
+        self._trials = 0
+        self._trial_successes = 0
+        circuit_breaker_state.labels(name=name).set(STATE_GAUGE_VALUES[CircuitState.CLOSED])
+
+    @property
+    def state(self) -> CircuitState:
+        """Current state; an open circuit turns half-open once its open period is over."""
+        if self._state == CircuitState.OPEN and time.monotonic() >= self._retry_at:
+            self._transition(CircuitState.HALF_OPEN)
+        return self._state
+
+    def seconds_until_retry(self) -> float:
+        """Seconds until an open circuit lets trial calls through (0 if not open)."""
+        if self.state != CircuitState.OPEN:
+            return 0.0
+        return max(self._retry_at - time.monotonic(), 0.0)
+
+    def available_calls(self) -> int | None:
+        """Calls that may start now: None for no limit, 0 while open."""
+        state = self.state
+        if state == CircuitState.CLOSED:
+            return None
+        if state == CircuitState.OPEN:
+            return 0
+        return max(self.half_open_max_calls - self._trials, 0)
+
+    def before_call(self) -> None:
+        """Reserve a call, raising CircuitOpenError if the circuit does not allow one."""
+        available = self.available_calls()
+        if available == 0:
+            raise CircuitOpenError(f"Circuit {self.name} is {self._state.value}")
+        if self._state == CircuitState.HALF_OPEN:
+            self._trials += 1
+
+    def cancel_call(self) -> None:
+        """Give back a reserved call that ended without reaching the dependency."""
+        if self._state == CircuitState.HALF_OPEN and self._trials > 0:
+            self._trials -= 1
+
+    def record_success(self) -> None:
+        """Record a successful call."""
+        if self._state == CircuitState.HALF_OPEN:
+            self._trial_successes += 1
+            if self._trial_successes >= self.half_open_max_calls:
+                self._opened_for = self.open_seconds
+                self._transition(CircuitState.CLOSED)
+            return
+        self._outcomes.append(True)
+
+    def record_failure(self) -> None:
+        """Record a failed call, opening the circuit if the failure rate is exceeded."""
+        if self._state == CircuitState.HALF_OPEN:
+            self._opened_for = min(self._opened_for * 2, self.max_open_seconds)
+            self._open()
+            return
+        if self._state == CircuitState.OPEN:
+            return
+
+        self._outcomes.append(False)
+        failures = self._outcomes.count(False)
+        if (
+            len(self._outcomes) >= self.min_calls
+            and failures / len(self._outcomes) >= self.failure_rate
+        ):
+            self._open()
+
+    def _open(self) -> None:
+        self._retry_at = time.monotonic() + self._opened_for
+        self._transition(CircuitState.OPEN)
+        logger.warning(f"Circuit {self.name} opened for {self._opened_for}s")
+
+    def _transition(self, state: CircuitState) -> None:
+        self._state = state
+        self._outcomes.clear()
+        self._trials = 0
+        self._trial_successes = 0
+        circuit_breaker_state.labels(name=self.name).set(STATE_GAUGE_VALUES[state])
+        circuit_breaker_transitions_total.labels(name=self.name, state=state.value).inc()
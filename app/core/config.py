@@ -35,19 +35,251 @@ class Settings(BaseSettings):
     rate_limit_orders_per_minute: int = Field(
         default=5, description="Max orders per minute per user/IP"
     )
+    rate_limit_order_batches_per_minute: int = Field(
+        default=10, description="Max order batches per minute per client IP"
+    )
+    order_batch_max_size: int = Field(default=500, description="Max orders in one batch")
+
+    order_group_commit_enabled: bool = Field(
+        default=False, description="Merge concurrent orders for the same product into one commit"
+    )
+    order_group_commit_window_ms: int = Field(
+        default=5, description="How long a group waits for more orders before committing"
+    )
+    order_group_commit_max_size: int = Field(
+        default=50, description="Max orders per group commit"
+    )
+
+    idempotency_claim_lease_seconds: float = Field(
+        default=30, description="Age after which a pending idempotency claim may be taken over"
+    )
+    idempotency_wait_timeout_seconds: float = Field(
+        default=10, description="How long a duplicate request waits for the in-flight original"
+    )
+    idempotency_poll_interval_ms: int = Field(
+        default=50, description="Polling interval while waiting for a pending idempotency claim"
+    )
+
+    idempotency_key_retention_hours: int = Field(
+        default=168, ge=1, description="How long idempotency keys are honoured before expiring"
+    )
+    idempotency_purger_embedded_enabled: bool = Field(
+        default=True, description="Run the idempotency key purger inside API processes"
+    )
+    idempotency_purge_interval_seconds: int = Field(
+        default=3600, description="Interval between purges of expired idempotency keys"
+    )
+    idempotency_partitions_premake_days: int = Field(
+        default=3, ge=1, description="Daily idempotency_keys partitions created ahead of time"
+    )
+    idempotency_purge_batch_size: int = Field(
+        default=5000, description="Rows per DELETE when purging keys outside dropped partitions"
+    )
+
+    idempotency_cache_max_entries: int = Field(
+        default=10000, description="Max responses in the in-process idempotency replay cache"
+    )
+    idempotency_cache_max_bytes: int = Field(
+        default=16 * 1024 * 1024,
+        description="Max total response bytes in the in-process idempotency replay cache",
+    )
+    idempotency_cache_ttl_seconds: int = Field(
+        default=300, description="TTL of in-process idempotency replay cache entries"
+    )
+    idempotency_cache_redis_ttl_seconds: int = Field(
+        default=86400, description="TTL of idempotency replay cache entries in Redis"
+    )
+
+    stock_reservation_mode: Literal["row_lock", "conditional_update"] = Field(
+        default="row_lock",
+        description="Stock reservation engine: SELECT ... FOR UPDATE or guarded single UPDATE",
+    )
+
+    stock_ledger_enabled: bool = Field(
+        default=False, description="Reject sold-out orders from a Redis stock mirror"
+    )
+    stock_ledger_reconcile_interval_seconds: int = Field(
+        default=30, description="Interval between Redis stock ledger drift checks"
+    )
+    stock_ledger_reconcile_batch_size: int = Field(
+        default=500, description="Products compared per Redis stock ledger round trip"
+    )
+
+    db_retry_max_attempts: int = Field(
+        default=3, ge=1, description="Max attempts for a unit of work on deadlock/serialization"
+    )
+    db_retry_base_delay_seconds: float = Field(
+        default=0.05, description="Base delay for jittered backoff between DB retries"
+    )
 
     outbox_worker_interval_seconds: int = Field(
-        default=5, description="Outbox worker polling interval"
+        default=5, description="Outbox worker polling interval when not listening for NOTIFY"
+    )
+    outbox_listen_enabled: bool = Field(
+        default=True, description="Wake the outbox worker with LISTEN/NOTIFY on new events"
+    )
+    outbox_listen_fallback_interval_seconds: int = Field(
+        default=60, description="Safety-net polling interval while listening for NOTIFY"
+    )
+    outbox_worker_concurrency: int = Field(
+        default=20, ge=1, description="Max outbox events processed concurrently"
+    )
+    outbox_lease_seconds: int = Field(
+        default=120, description="How long a claimed outbox event is held before others retake it"
+    )
+    outbox_handler_timeout_seconds: float = Field(
+        default=60, description="Max handler run time per outbox event; keep below the lease"
+    )
+    outbox_coalescing_enabled: bool = Field(
+        default=False,
+        description="Deliver only the newest pending event of coalescing types per order",
+    )
+    outbox_claim_linger_seconds: float = Field(
+        default=0.05, description="Longest expected wait for free slots to fill a claim batch"
+    )
+    outbox_finish_batch_window_seconds: float = Field(
+        default=0.01, description="How long outcomes are collected before one bulk UPDATE"
+    )
+    outbox_partition_lease_seconds: int = Field(
+        default=30, description="Lease on outbox partitions owned by a worker; renewed every third"
+    )
+    outbox_drain_timeout_seconds: float = Field(
+        default=30, description="How long a stopping outbox worker waits for in-flight events"
+    )
+    outbox_embedded_worker_enabled: bool = Field(
+        default=True, description="Run the outbox worker inside API processes"
+    )
+    outbox_worker_processes: int = Field(
+        default=1, ge=1, description="Worker processes started by python -m app.workers"
+    )
+    outbox_worker_health_port: int = Field(
+        default=8001, description="Health endpoint port of python -m app.workers"
+    )
+    outbox_worker_restart_backoff_seconds: float = Field(
+        default=1, gt=0, description="Delay before restarting a crashed worker process"
+    )
+    outbox_worker_restart_backoff_max_seconds: float = Field(
+        default=60,
+        gt=0,
+        description="Cap of the restart delay, doubled per crash of the same process",
+    )
+    outbox_retention_hours: int = Field(
+        default=72, ge=1, description="How long sent outbox events stay before being archived"
+    )
+    outbox_archiver_embedded_enabled: bool = Field(
+        default=True, description="Run the outbox archiver inside API processes"
+    )
+    outbox_archive_interval_seconds: int = Field(
+        default=3600, description="Interval between outbox archiving runs"
+    )
+    outbox_partitions_premake_days: int = Field(
+        default=3, ge=1, description="Daily outbox partitions created ahead of time"
+    )
+    outbox_archive_batch_size: int = Field(
+        default=5000, description="Sent events copied or moved to outbox_archive per statement"
+    )
+    outbox_archive_lock_timeout_ms: int = Field(
+        default=5000,
+        ge=1,
+        description="Longest wait for the outbox lock when detaching an archived partition",
+    )
+    outbox_replay_spread_seconds: float = Field(
+        default=300, description="Window the next attempts of requeued dead events spread over"
+    )
+    outbox_replay_batch_size: int = Field(
+        default=1000, ge=1, description="Dead events requeued per transaction"
+    )
+    outbox_relay_event_types: list[str] = Field(
+        default=[], description="Event types published to Redis Streams instead of handled here"
+    )
+    outbox_relay_consumer_groups: list[str] = Field(
+        default=[], description="Consumer groups created on every relay stream"
+    )
+    outbox_relay_stream_prefix: str = Field(
+        default="outbox:", description="Prefix of the per-event-type relay stream names"
+    )
+    outbox_relay_stream_maxlen: int = Field(
+        default=1_000_000, description="Approximate number of events kept per relay stream"
+    )
+    outbox_relay_batch_size: int = Field(
+        default=500, ge=1, description="Outbox events claimed and published per relay round"
     )
     outbox_max_attempts: int = Field(default=5, description="Max retry attempts for outbox events")
     outbox_retry_base_delay_seconds: int = Field(
         default=1, description="Base delay for exponential backoff"
     )
 
+    payment_provider_url: str = Field(
+        default="http://localhost:8000", description="Base URL of the (fake) payment provider"
+    )
+    payment_http_connect_timeout_seconds: float = Field(
+        default=2, description="Connect timeout for payment provider calls"
+    )
+    payment_http_read_timeout_seconds: float = Field(
+        default=5, description="Read timeout for payment provider calls"
+    )
+    payment_http_write_timeout_seconds: float = Field(
+        default=5, description="Write timeout for payment provider calls"
+    )
+    payment_http_pool_timeout_seconds: float = Field(
+        default=2, description="Max wait for a free pooled connection to the payment provider"
+    )
+    payment_http_max_connections: int = Field(
+        default=100, description="Max open connections to payment providers per worker"
+    )
+    payment_http_max_keepalive_connections: int = Field(
+        default=20, description="Max idle keep-alive connections kept to payment providers"
+    )
+    payment_http_keepalive_expiry_seconds: float = Field(
+        default=30, description="How long an idle payment provider connection is kept"
+    )
+    payment_http2_enabled: bool = Field(
+        default=False, description="Use HTTP/2 for payment provider calls"
+    )
+    payment_http_per_host_concurrency: int = Field(
+        default=50, ge=1, description="Max in-flight payment provider requests per host"
+    )
+    payment_breaker_failure_rate: float = Field(
+        default=0.5, gt=0, le=1, description="Failure rate over the window that opens the circuit"
+    )
+    payment_breaker_window_size: int = Field(
+        default=20, ge=1, description="Recent payment provider calls the failure rate is taken over"
+    )
+    payment_breaker_min_calls: int = Field(
+        default=10, ge=1, description="Calls in the window before the circuit may open"
+    )
+    payment_breaker_open_seconds: float = Field(
+        default=10, description="How long the circuit first stays open before trial calls"
+    )
+    payment_breaker_max_open_seconds: float = Field(
+        default=300, description="Cap on the open period, which doubles after each failed trial"
+    )
+    payment_breaker_half_open_max_calls: int = Field(
+        default=3, ge=1, description="Trial calls while half-open; as many successes close it"
+    )
+
     fake_payment_enabled: bool = Field(default=True, description="Enable fake payment service")
     fake_payment_success_rate: float = Field(
         default=0.8, ge=0.0, le=1.0, description="Success rate for fake payments (0.0-1.0)"
     )
+    fake_payment_latency_distribution: Literal["fixed", "uniform", "lognormal"] = Field(
+        default="fixed", description="Distribution of the delay before the fake payment webhook"
+    )
+    fake_payment_latency_seconds: float = Field(
+        default=1.0, gt=0, description="Fixed fake payment latency, or the lognormal median"
+    )
+    fake_payment_latency_min_seconds: float = Field(
+        default=0.5, ge=0, description="Lower bound of the uniform fake payment latency"
+    )
+    fake_payment_latency_max_seconds: float = Field(
+        default=1.5, ge=0, description="Upper bound of the uniform fake payment latency"
+    )
+    fake_payment_latency_sigma: float = Field(
+        default=0.5, ge=0, description="Sigma of the lognormal fake payment latency"
+    )
+    fake_payment_webhook_max_attempts: int = Field(
+        default=3, ge=1, description="Attempts to deliver a scheduled fake payment webhook"
+    )
 
 
 settings = Settings()
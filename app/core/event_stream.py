@@ -0,0 +1,109 @@
+"""Redis Streams carrying relayed outbox events to independent consumer groups."""
+from typing import Any, Sequence
+
+import redis.asyncio as redis
+from redis.exceptions import ResponseError
+from redis.typing import EncodableT, FieldT
+
+from app.core import json_codec
+from app.core.config import settings
+from app.models.outbox import Outbox
+
+# (message id, fields) of a stream entry
+StreamMessage = tuple[str, dict[str, str]]
+
+
+def stream_name(event_type: str) -> str:
+    """Stream holding the relayed events of `event_type`."""
+    return f"{settings.outbox_relay_stream_prefix}{event_type}"
+
+
+def event_fields(event: Outbox) -> dict[FieldT, EncodableT]:
+    """Stream entry fields of an outbox event; `id` lets consumers drop redeliveries."""
+    return {
+        "id": str(event.id),
+        "event_type": event.event_type,
+        "partition_key": event.partition_key,
+        "payload": json_codec.dumps(event.payload_json),
+        "created_at": event.created_at.isoformat(),
+    }
+
+
+async def ensure_consumer_group(client: redis.Redis, event_type: str, group: str) -> None:
+    """
+    Create consumer group `group` on the stream of `event_type` if it does not exist.
+
+    A new group starts at the beginning of the stream, so it also receives the
+    events still retained from before it was created.
+    """
+    try:
+        await client.xgroup_create(stream_name(event_type), group, id="0", mkstream=True)
+    except ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+async def publish_events(client: redis.Redis, events: Sequence[Outbox]) -> None:
+    """Append `events` to the streams of their types in one pipelined round trip."""
+    async with client.pipeline(transaction=False) as pipe:
+        for event in events:
+            pipe.xadd(
+                stream_name(event.event_type),
+                event_fields(event),
+                maxlen=settings.outbox_relay_stream_maxlen,
+                approximate=True,
+            )
+        await pipe.execute()
+
+
+class StreamConsumer:
+    """
+    Member `consumer` of consumer group `group` reading the stream of one event type.
+
+    Each group gets every event and tracks its own position; within a group,
+    each event goes to one consumer and stays pending until acknowledged.
+    Delivery is at least once: an event may be delivered again after a
+    consumer crash or a relay retry, so handlers dedupe on the `id` field.
+    """
+
+    def __init__(self, client: redis.Redis, event_type: str, group: str, consumer: str):
+        self.client = client
+        self.event_type = event_type
+        self.group = group
+        self.consumer = consumer
+        self.stream = stream_name(event_type)
+
+    async def read(self, count: int = 100, block_ms: int = 5000) -> list[StreamMessage]:
+        """Read up to `count` new events, waiting up to `block_ms` for the first one."""
+        response: Any = await self.client.xreadgroup(
+            self.group, self.consumer, {self.stream: ">"}, count=count, block=block_ms
+        )
+        if not response:
+            return []
+        _, messages = response[0]
+        return [(_decode(message_id), _decode_fields(fields)) for message_id, fields in messages]
+
+    async def claim_stale(self, min_idle_ms: int, count: int = 100) -> list[StreamMessage]:
+        """Take over events another consumer of the group left unacknowledged for too long."""
+        response: Any = await self.client.xautoclaim(
+            self.stream, self.group, self.consumer, min_idle_time=min_idle_ms, count=count
+        )
+        messages = response[1]
+        return [
+            (_decode(message_id), _decode_fields(fields))
+            for message_id, fields in messages
+            if fields is not None
+        ]
+
+    async def ack(self, message_ids: Sequence[str]) -> None:
+        """Acknowledge processed events so they leave the group's pending list."""
+        if message_ids:
+            await self.client.xack(self.stream, self.group, *message_ids)
+
+
+def _decode(value: str | bytes) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+def _decode_fields(fields: dict[Any, Any]) -> dict[str, str]:
+    return {_decode(key): _decode(value) for key, value in fields.items()}
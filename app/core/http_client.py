@@ -0,0 +1,91 @@
+"""Pooled outbound HTTP client for payment provider calls."""
+import asyncio
+import time
+from typing import AsyncIterator
+
+import httpx
+
+from app.core.config import settings
+from app.core.metrics import payment_provider_request_seconds
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Response stream that frees its host slot once the body is closed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, slot: asyncio.Semaphore):
+        self._stream = stream
+        self._slot: asyncio.Semaphore | None = slot
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._slot is not None:
+                self._slot.release()
+                self._slot = None
+
+
+class HostLimitedTransport(httpx.AsyncBaseTransport):
+    """
+    Transport capping in-flight requests per upstream host and timing each endpoint.
+
+    A request holds its host's slot until its response body is closed, so the
+    cap bounds what a slow provider can take from the shared connection pool.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, per_host_limit: int):
+        self._transport = transport
+        self._per_host_limit = per_host_limit
+        self._slots: dict[str, asyncio.Semaphore] = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.netloc.decode("ascii")
+        slot = self._slots.setdefault(host, asyncio.Semaphore(self._per_host_limit))
+        endpoint = f"{request.method} {host}{request.url.path}"
+
+        await slot.acquire()
+        started = time.perf_counter()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except Exception as e:
+            slot.release()
+            payment_provider_request_seconds.labels(
+                endpoint=endpoint, outcome=type(e).__name__
+            ).observe(time.perf_counter() - started)
+            raise
+
+        payment_provider_request_seconds.labels(
+            endpoint=endpoint, outcome=str(response.status_code)
+        ).observe(time.perf_counter() - started)
+        if isinstance(response.stream, httpx.AsyncByteStream):
+            response.stream = _ReleasingStream(response.stream, slot)
+        else:
+            slot.release()
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+def create_payment_http_client() -> httpx.AsyncClient:
+    """Create the HTTP client used for payment provider calls from settings."""
+    limits = httpx.Limits(
+        max_connections=settings.payment_http_max_connections,
+        max_keepalive_connections=settings.payment_http_max_keepalive_connections,
+        keepalive_expiry=settings.payment_http_keepalive_expiry_seconds,
+    )
+    transport = httpx.AsyncHTTPTransport(limits=limits, http2=settings.payment_http2_enabled)
+    return httpx.AsyncClient(
+        base_url=settings.payment_provider_url,
+        timeout=httpx.Timeout(
+            connect=settings.payment_http_connect_timeout_seconds,
+            read=settings.payment_http_read_timeout_seconds,
+            write=settings.payment_http_write_timeout_seconds,
+            pool=settings.payment_http_pool_timeout_seconds,
+        ),
+        transport=HostLimitedTransport(transport, settings.payment_http_per_host_concurrency),
+    )
@@ -0,0 +1,126 @@
+"""Two-tier cache of completed idempotent responses: in-process LRU over Redis."""
+import time
+from collections import OrderedDict
+
+from app.core import rate_limiter
+from app.core.config import settings
+from app.core.logging_config import get_logger
+from app.core.metrics import idempotency_cache_bytes, idempotency_cache_requests_total
+
+logger = get_logger(__name__)
+
+KEY_PREFIX = "idempotency_response:"
+
+
+class StoredResponse:
+    """Serialized response of a completed request, replayed for its duplicates."""
+
+    __slots__ = ("request_hash", "status_code", "body")
+
+    def __init__(self, request_hash: str, status_code: int, body: bytes):
+        self.request_hash = request_hash
+        self.status_code = status_code
+        self.body = body
+
+    def encode(self) -> str:
+        """Pack into a single Redis string value."""
+        return f"{self.status_code}:{self.request_hash}:{self.body.decode()}"
+
+    @classmethod
+    def decode(cls, value: str) -> "StoredResponse":
+        """Unpack a value written by `encode`."""
+        status_code, request_hash, body = value.split(":", 2)
+        return cls(request_hash, int(status_code), body.encode())
+
+
+class IdempotencyCache:
+    """
+    Replay cache for idempotency keys.
+
+    The first tier is a per-process LRU bounded by entry count, total body size
+    and TTL; the second is Redis, shared by all processes, with its own TTL.
+    PostgreSQL (`IdempotencyKey.response_body`) stays the source of truth, so a
+    miss in both tiers only costs a database lookup, and Redis errors are
+    treated as misses.
+    """
+
+    def __init__(self) -> None:
+        self._entries: OrderedDict[str, tuple[float, StoredResponse]] = OrderedDict()
+        self._size = 0
+
+    async def get(self, key: str) -> StoredResponse | None:
+        """Look a key up in the local tier, then in Redis."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, response = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                idempotency_cache_requests_total.labels(tier="local", result="hit").inc()
+                return response
+            self._evict(key)
+        idempotency_cache_requests_total.labels(tier="local", result="miss").inc()
+
+        if rate_limiter.redis_client is None:
+            return None
+
+        try:
+            value = await rate_limiter.redis_client.get(f"{KEY_PREFIX}{key}")
+        except Exception as e:
+            logger.error(f"Idempotency cache lookup failed: {e}")
+            return None
+
+        if value is None:
+            idempotency_cache_requests_total.labels(tier="redis", result="miss").inc()
+            return None
+
+        idempotency_cache_requests_total.labels(tier="redis", result="hit").inc()
+        response = StoredResponse.decode(value)
+        self._put_local(key, response)
+        return response
+
+    async def put(self, key: str, response: StoredResponse) -> None:
+        """Store a completed response in both tiers."""
+        self._put_local(key, response)
+
+        if rate_limiter.redis_client is None:
+            return
+
+        try:
+            await rate_limiter.redis_client.set(
+                f"{KEY_PREFIX}{key}",
+                response.encode(),
+                ex=settings.idempotency_cache_redis_ttl_seconds,
+            )
+        except Exception as e:
+            logger.error(f"Idempotency cache store failed: {e}")
+
+    def clear(self) -> None:
+        """Drop all entries of the local tier."""
+        self._entries.clear()
+        self._size = 0
+        idempotency_cache_bytes.set(0)
+
+    def _put_local(self, key: str, response: StoredResponse) -> None:
+        size = len(response.body)
+        if size > settings.idempotency_cache_max_bytes:
+            return
+
+        self._evict(key)
+        self._entries[key] = (time.monotonic() + settings.idempotency_cache_ttl_seconds, response)
+        self._size += size
+
+        while (
+            len(self._entries) > settings.idempotency_cache_max_entries
+            or self._size > settings.idempotency_cache_max_bytes
+        ):
+            self._evict(next(iter(self._entries)))
+        idempotency_cache_bytes.set(self._size)
+
+    def _evict(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[1].body)
+            idempotency_cache_bytes.set(self._size)
+
+
+idempotency_cache = IdempotencyCache()
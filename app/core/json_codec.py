@@ -0,0 +1,27 @@
+"""JSON codec shared by outbox producers, the outbox worker and JSONB columns."""
+from decimal import Decimal
+from typing import Any
+
+import orjson
+
+
+def _default(value: Any) -> Any:
+    # Amounts must stay exact, so Decimals are written as strings
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value: Any) -> bytes:
+    """Serialize `value` to JSON; UUIDs and datetimes natively, Decimals as strings."""
+    return orjson.dumps(value, default=_default)
+
+
+def dumps_str(value: Any) -> str:
+    """Serialize `value` like `dumps`, as text (the form SQLAlchemy binds JSON columns in)."""
+    return dumps(value).decode("utf-8")
+
+
+def loads(data: bytes | str) -> Any:
+    """Parse JSON produced by `dumps` or PostgreSQL."""
+    return orjson.loads(data)
@@ -0,0 +1,201 @@
+"""Prometheus metrics shared by services and workers."""
+from prometheus_client import Counter, Gauge, Histogram, Summary
+
+db_retries_total = Counter(
+    "db_retries_total",
+    "Units of work re-run after a deadlock or serialization failure",
+    ["operation", "sqlstate"],
+)
+
+stock_ledger_rejections_total = Counter(
+    "stock_ledger_rejections_total",
+    "Orders rejected as sold out by the Redis stock ledger without touching the database",
+)
+
+stock_ledger_repairs_total = Counter(
+    "stock_ledger_repairs_total",
+    "Redis stock ledger entries re-seeded from PostgreSQL",
+    ["reason"],
+)
+
+order_group_commit_size = Summary(
+    "order_group_commit_size",
+    "Orders merged into one group commit (sum/count is the average group size)",
+)
+
+db_round_trips_per_request = Histogram(
+    "db_round_trips_per_request",
+    "Database statements and transaction commands issued per HTTP request",
+    ["method", "route"],
+    buckets=(1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 30, 50),
+)
+
+idempotency_cache_requests_total = Counter(
+    "idempotency_cache_requests_total",
+    "Idempotency replay cache lookups by tier (local, redis) and result (hit, miss)",
+    ["tier", "result"],
+)
+
+idempotency_cache_bytes = Gauge(
+    "idempotency_cache_bytes",
+    "Response bytes held in the in-process idempotency replay cache",
+)
+
+idempotency_keys_table_bytes = Gauge(
+    "idempotency_keys_table_bytes",
+    "Total size of idempotency_keys including indexes and partitions",
+)
+
+idempotency_purge_duration_seconds = Histogram(
+    "idempotency_purge_duration_seconds",
+    "Time spent purging expired idempotency keys",
+    ["method"],
+)
+
+idempotency_partitions_dropped_total = Counter(
+    "idempotency_partitions_dropped_total",
+    "Expired idempotency_keys partitions dropped",
+)
+
+idempotency_keys_deleted_total = Counter(
+    "idempotency_keys_deleted_total",
+    "Expired idempotency keys removed with DELETE (outside dropped partitions)",
+)
+
+order_payment_initiation_latency_seconds = Histogram(
+    "order_payment_initiation_latency_seconds",
+    "Time from an order.created event being written to its payment being initiated",
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+
+outbox_event_processing_seconds = Histogram(
+    "outbox_event_processing_seconds",
+    "Time spent processing one outbox event, including its transaction",
+    ["event_type", "outcome"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+outbox_events_in_flight = Gauge(
+    "outbox_events_in_flight",
+    "Outbox events currently being processed by this worker",
+    ["event_type"],
+)
+
+outbox_handler_seconds = Histogram(
+    "outbox_handler_seconds",
+    "Time spent inside the registered handler of one outbox event",
+    ["event_type"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+outbox_dispatch_overhead_seconds = Histogram(
+    "outbox_dispatch_overhead_seconds",
+    "Worker time per outbox event outside its handler: registry lookup, claim share, outcome write",
+    ["event_type"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5),
+)
+
+outbox_table_bytes = Gauge(
+    "outbox_table_bytes",
+    "Total size of outbox including indexes and partitions",
+)
+
+outbox_archive_duration_seconds = Histogram(
+    "outbox_archive_duration_seconds",
+    "Time spent archiving sent outbox events",
+    ["method"],
+)
+
+outbox_events_archived_total = Counter(
+    "outbox_events_archived_total",
+    "Sent outbox events moved to outbox_archive",
+)
+
+outbox_partitions_dropped_total = Counter(
+    "outbox_partitions_dropped_total",
+    "Outbox partitions dropped after archiving",
+)
+
+outbox_dead_events_requeued_total = Counter(
+    "outbox_dead_events_requeued_total",
+    "Dead outbox events put back to pending by a replay",
+    ["event_type"],
+)
+
+outbox_dead_replay_remaining = Gauge(
+    "outbox_dead_replay_remaining",
+    "Dead events still to be requeued by the running replay",
+)
+
+outbox_events_coalesced_total = Counter(
+    "outbox_events_coalesced_total",
+    "Outbox events marked sent because a later event of the same key superseded them",
+    ["event_type"],
+)
+
+outbox_events_relayed_total = Counter(
+    "outbox_events_relayed_total",
+    "Outbox events published to Redis Streams",
+    ["event_type"],
+)
+
+outbox_relay_batch_seconds = Histogram(
+    "outbox_relay_batch_seconds",
+    "Time to publish one relay batch to Redis Streams",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+)
+
+outbox_claim_batch_size = Gauge(
+    "outbox_claim_batch_size",
+    "Adaptive claim batch size of the outbox worker",
+    ["event_type"],
+)
+
+outbox_finish_batch_size = Histogram(
+    "outbox_finish_batch_size",
+    "Outbox event outcomes written per bulk UPDATE",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200),
+)
+
+outbox_unhandled_events = Gauge(
+    "outbox_unhandled_events",
+    "Pending outbox events of types without a registered handler, left unclaimed",
+    ["event_type"],
+)
+
+outbox_partitions_owned = Gauge(
+    "outbox_partitions_owned",
+    "Outbox hash partitions currently leased by this worker",
+)
+
+delayed_tasks_pending = Gauge(
+    "delayed_tasks_pending",
+    "Jobs waiting in an in-process delayed task scheduler",
+    ["scheduler"],
+)
+
+delayed_task_lag_seconds = Histogram(
+    "delayed_task_lag_seconds",
+    "How late a delayed job started relative to its deadline",
+    ["scheduler"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+)
+
+payment_provider_request_seconds = Histogram(
+    "payment_provider_request_seconds",
+    "Payment provider request latency until response headers, per upstream endpoint",
+    ["endpoint", "outcome"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+circuit_breaker_state = Gauge(
+    "circuit_breaker_state",
+    "Circuit breaker state: 0 closed, 1 half-open, 2 open",
+    ["name"],
+)
+
+circuit_breaker_transitions_total = Counter(
+    "circuit_breaker_transitions_total",
+    "Circuit breaker state changes by the state entered",
+    ["name", "state"],
+)
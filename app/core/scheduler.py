@@ -0,0 +1,89 @@
+"""In-process scheduler for running coroutines after a delay."""
+import asyncio
+import heapq
+import itertools
+from typing import Awaitable, Callable
+
+from app.core.logging_config import get_logger
+from app.core.metrics import delayed_task_lag_seconds, delayed_tasks_pending
+
+logger = get_logger(__name__)
+
+Job = Callable[[], Awaitable[None]]
+
+
+class DelayedTaskScheduler:
+    """
+    Heap-based scheduler running jobs on the event loop once their delay has passed.
+
+    A single runner task sleeps until the earliest deadline, so scheduling a
+    job costs one heap push and holds no connection or session. Jobs run as
+    independent tasks; their failures are logged and do not stop the runner.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._heap: list[tuple[float, int, Job]] = []
+        self._sequence = itertools.count()
+        self._changed = asyncio.Event()
+        self._runner: asyncio.Task[None] | None = None
+        self._jobs: set[asyncio.Task[None]] = set()
+
+    @property
+    def pending(self) -> int:
+        """Jobs scheduled and not yet started."""
+        return len(self._heap)
+
+    def schedule(self, delay: float, job: Job) -> None:
+        """Run `job()` once `delay` seconds have passed."""
+        loop = asyncio.get_running_loop()
+        heapq.heappush(self._heap, (loop.time() + max(delay, 0.0), next(self._sequence), job))
+        delayed_tasks_pending.labels(scheduler=self.name).set(len(self._heap))
+
+        if self._runner is None or self._runner.done():
+            self._runner = asyncio.create_task(self._run())
+        self._changed.set()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            self._changed.clear()
+            now = loop.time()
+            while self._heap and self._heap[0][0] <= now:
+                due, _, job = heapq.heappop(self._heap)
+                delayed_task_lag_seconds.labels(scheduler=self.name).observe(now - due)
+                task = asyncio.create_task(self._run_job(job))
+                self._jobs.add(task)
+                task.add_done_callback(self._jobs.discard)
+            delayed_tasks_pending.labels(scheduler=self.name).set(len(self._heap))
+
+            timeout = self._heap[0][0] - now if self._heap else None
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run_job(self, job: Job) -> None:
+        try:
+            await job()
+        except Exception as e:
+            logger.error(f"Delayed task in {self.name} scheduler failed: {e!r}")
+
+    async def close(self, timeout: float) -> None:
+        """Wait up to `timeout` for scheduled and running jobs, then cancel the rest."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while (self._heap or self._jobs) and loop.time() < deadline:
+            await asyncio.sleep(min(0.05, deadline - loop.time()))
+
+        if self._heap:
+            logger.warning(f"Dropping {len(self._heap)} jobs of the {self.name} scheduler")
+            self._heap.clear()
+            delayed_tasks_pending.labels(scheduler=self.name).set(0)
+
+        tasks = [*self._jobs, *([self._runner] if self._runner else [])]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._runner = None
+
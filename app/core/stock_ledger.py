@@ -0,0 +1,219 @@
+"""Redis mirror of available stock for sub-millisecond sold-out rejection."""
+import uuid
+from collections import defaultdict
+from typing import Any, Iterable
+
+from app.core import rate_limiter
+from app.core.config import settings
+from app.core.logging_config import get_logger
+from app.core.metrics import stock_ledger_rejections_total
+
+logger = get_logger(__name__)
+
+KEY_PREFIX = "stock_ledger:"
+
+# Returns {0, 0} when every key was decremented, {-1, i} when key i is not seeded
+# and {i, available} when key i cannot cover its quantity. Nothing is decremented
+# unless all keys can be.
+HOLD_SCRIPT = """
+for i = 1, #KEYS do
+    local available = redis.call('GET', KEYS[i])
+    if not available then
+        return {-1, i}
+    end
+    if tonumber(available) < tonumber(ARGV[i]) then
+        return {i, tonumber(available)}
+    end
+end
+for i = 1, #KEYS do
+    redis.call('DECRBY', KEYS[i], ARGV[i])
+end
+return {0, 0}
+"""
+
+# Only seeded keys are incremented; missing keys are left for the reconciler.
+RELEASE_SCRIPT = """
+for i = 1, #KEYS do
+    if redis.call('EXISTS', KEYS[i]) == 1 then
+        redis.call('INCRBY', KEYS[i], ARGV[i])
+    end
+end
+return 0
+"""
+
+# Compare-and-set: key i is overwritten with ARGV[2i] only if it still holds
+# ARGV[2i-1]. An empty string stands for a missing key as seen value and for
+# deletion as new value. Returns a 1/0 flag per key.
+REPAIR_SCRIPT = """
+local applied = {}
+for i = 1, #KEYS do
+    local current = redis.call('GET', KEYS[i]) or ''
+    if current == ARGV[2 * i - 1] then
+        if ARGV[2 * i] == '' then
+            redis.call('DEL', KEYS[i])
+        else
+            redis.call('SET', KEYS[i], ARGV[2 * i])
+        end
+        applied[i] = 1
+    else
+        applied[i] = 0
+    end
+end
+return applied
+"""
+
+
+def _key(product_id: uuid.UUID) -> str:
+    return f"{KEY_PREFIX}{product_id}"
+
+
+def _aggregate(items: Iterable[tuple[uuid.UUID, int]]) -> dict[uuid.UUID, int]:
+    quantities: dict[uuid.UUID, int] = defaultdict(int)
+    for product_id, quantity in items:
+        quantities[product_id] += quantity
+    return dict(quantities)
+
+
+class StockLedger:
+    """
+    Redis ledger of available stock per product.
+
+    PostgreSQL stays the source of truth: the ledger only lets `create_order`
+    reject requests for sold-out products before opening a transaction. Every
+    accepted request still reserves stock in the database, and held quantities
+    are released again if that fails. Any Redis error makes the ledger step aside
+    (fail open) so orders are decided by the database alone.
+    """
+
+    def __init__(self) -> None:
+        self._scripts: dict[str, Any] = {}
+        self._scripts_client: Any = None
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the ledger is configured and Redis is initialized."""
+        return settings.stock_ledger_enabled and rate_limiter.redis_client is not None
+
+    def _script(self, name: str, source: str) -> Any:
+        client = rate_limiter.redis_client
+        if client is not self._scripts_client:
+            self._scripts = {}
+            self._scripts_client = client
+        if name not in self._scripts:
+            self._scripts[name] = client.register_script(source)  # type: ignore[union-attr]
+        return self._scripts[name]
+
+    async def hold(self, items: Iterable[tuple[uuid.UUID, int]]) -> bool:
+        """
+        Atomically decrement mirrored stock for all items.
+
+        Returns:
+            bool: True if quantities were held and must be released on failure,
+            False if the ledger was bypassed (disabled, not seeded or unavailable)
+
+        Raises:
+            ValueError: if a product is sold out according to the ledger
+        """
+        if not self.enabled:
+            return False
+
+        quantities = _aggregate(items)
+        product_ids = list(quantities)
+        try:
+            status, value = await self._script("hold", HOLD_SCRIPT)(
+                keys=[_key(product_id) for product_id in product_ids],
+                args=[quantities[product_id] for product_id in product_ids],
+            )
+        except Exception as e:
+            logger.error(f"Stock ledger hold failed: {e}")
+            return False
+
+        if status == 0:
+            return True
+        if status == -1:
+            logger.info(f"Stock ledger not seeded for product {product_ids[value - 1]}")
+            return False
+
+        product_id = product_ids[status - 1]
+        stock_ledger_rejections_total.inc()
+        raise ValueError(
+            f"Insufficient stock for product {product_id}: "
+            f"requested {quantities[product_id]}, available {value}"
+        )
+
+    async def release(self, items: Iterable[tuple[uuid.UUID, int]]) -> None:
+        """Return quantities to the ledger after a failed order or a cancellation."""
+        if not self.enabled:
+            return
+
+        quantities = _aggregate(items)
+        product_ids = list(quantities)
+        try:
+            await self._script("release", RELEASE_SCRIPT)(
+                keys=[_key(product_id) for product_id in product_ids],
+                args=[quantities[product_id] for product_id in product_ids],
+            )
+        except Exception as e:
+            logger.error(f"Stock ledger release failed: {e}")
+
+    async def get_levels(self, product_ids: list[uuid.UUID]) -> dict[uuid.UUID, int | None]:
+        """Read mirrored stock; products without an entry map to None."""
+        values = await rate_limiter.redis_client.mget(  # type: ignore[union-attr]
+            [_key(product_id) for product_id in product_ids]
+        )
+        return {
+            product_id: int(value) if value is not None else None
+            for product_id, value in zip(product_ids, values, strict=True)
+        }
+
+    async def set_levels(self, levels: dict[uuid.UUID, int | None]) -> None:
+        """Overwrite mirrored stock in one pipeline; None removes the entry."""
+        if not self.enabled or not levels:
+            return
+
+        try:
+            async with rate_limiter.redis_client.pipeline(  # type: ignore[union-attr]
+                transaction=False
+            ) as pipe:
+                for product_id, available in levels.items():
+                    if available is None:
+                        pipe.delete(_key(product_id))
+                    else:
+                        pipe.set(_key(product_id), available)
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"Stock ledger update failed: {e}")
+
+    async def repair_levels(
+        self, repairs: dict[uuid.UUID, tuple[int | None, int | None]]
+    ) -> set[uuid.UUID]:
+        """
+        Overwrite mirrored stock only where it is unchanged since it was read.
+
+        Args:
+            repairs: product id -> (level seen by `get_levels`, new level); None
+                stands for a missing entry, or removes it as new level
+
+        Returns:
+            set[uuid.UUID]: products whose entry was written; an entry moved by a
+            concurrent hold or release is left alone
+        """
+        if not self.enabled or not repairs:
+            return set()
+
+        product_ids = list(repairs)
+        args: list[str] = []
+        for seen, available in repairs.values():
+            args += ["" if seen is None else str(seen), "" if available is None else str(available)]
+        try:
+            applied = await self._script("repair", REPAIR_SCRIPT)(
+                keys=[_key(product_id) for product_id in product_ids], args=args
+            )
+        except Exception as e:
+            logger.error(f"Stock ledger repair failed: {e}")
+            return set()
+
+        return {product_id for product_id, flag in zip(product_ids, applied, strict=True) if flag}
+
+
+stock_ledger = StockLedger()
@@ -1,7 +1,8 @@
 """Database module."""
 from app.db.base import AsyncSessionLocal, Base, engine, get_db
+from app.db.retry import retry_on_db_conflict
 
-__all__ = ["Base", "engine", "AsyncSessionLocal", "get_db"]
+__all__ = ["Base", "engine", "AsyncSessionLocal", "get_db", "retry_on_db_conflict"]
 
 
 
@@ -4,6 +4,7 @@ from typing import AsyncGenerator
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
 
+from app.core import json_codec
 from app.core.config import settings
 
 engine = create_async_engine(
@@ -12,6 +13,8 @@ engine = create_async_engine(
     pool_pre_ping=True,
     pool_size=10,
     max_overflow=20,
+    json_serializer=json_codec.dumps_str,
+    json_deserializer=json_codec.loads,
 )
 
 AsyncSessionLocal = async_sessionmaker(
@@ -0,0 +1,30 @@
+"""PostgreSQL advisory locks serializing jobs across processes and nodes."""
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+@asynccontextmanager
+async def try_advisory_lock(engine: AsyncEngine, name: str) -> AsyncIterator[bool]:
+    """
+    Try to take the session-level advisory lock `name`, yielding whether it was taken.
+
+    The lock is held on a dedicated autocommit connection for the duration of
+    the block, so work inside it may commit as often as it needs without
+    leaving a transaction open, and it is released if the process dies.
+    """
+    async with engine.connect() as connection:
+        connection = await connection.execution_options(isolation_level="AUTOCOMMIT")
+        result = await connection.execute(
+            text("SELECT pg_try_advisory_lock(hashtext(:name))"), {"name": name}
+        )
+        acquired = bool(result.scalar_one())
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                await connection.execute(
+                    text("SELECT pg_advisory_unlock(hashtext(:name))"), {"name": name}
+                )
@@ -0,0 +1,139 @@
+"""Helpers for tables range-partitioned by day on a timestamp column."""
+from datetime import date, datetime, time, timedelta, timezone
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+DEFAULT_PARTITION_SUFFIX = "_default"
+
+
+def partition_name(table: str, day: date) -> str:
+    """Name of the partition holding rows of `day` (UTC)."""
+    return f"{table}_p{day:%Y%m%d}"
+
+
+def default_partition_name(table: str) -> str:
+    """Name of the default partition, holding rows outside the daily partitions."""
+    return f"{table}{DEFAULT_PARTITION_SUFFIX}"
+
+
+def partition_day(table: str, name: str) -> date | None:
+    """Day of a partition named by `partition_name`; None for other partitions."""
+    prefix = f"{table}_p"
+    if not name.startswith(prefix):
+        return None
+    try:
+        return datetime.strptime(name[len(prefix) :], "%Y%m%d").date()
+    except ValueError:
+        return None
+
+
+def day_bounds(day: date) -> tuple[datetime, datetime]:
+    """UTC range [start, end) covered by the partition of `day`."""
+    start = datetime.combine(day, time.min, tzinfo=timezone.utc)
+    return start, start + timedelta(days=1)
+
+
+def create_daily_partition_sql(table: str, day: date) -> str:
+    """DDL creating the partition of `day` if it does not exist."""
+    start, end = day_bounds(day)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(table, day)} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+
+
+async def is_partitioned(session: AsyncSession, table: str) -> bool:
+    """Whether `table` is a partitioned table (as opposed to a plain one)."""
+    result = await session.execute(
+        text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)"),
+        {"table": table},
+    )
+    return result.scalar_one_or_none() is not None
+
+
+async def list_partitions(session: AsyncSession, table: str) -> list[str]:
+    """Names of the partitions attached to `table`."""
+    result = await session.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:table) "
+            "ORDER BY c.relname"
+        ),
+        {"table": table},
+    )
+    return list(result.scalars().all())
+
+
+async def list_detached_partitions(session: AsyncSession, table: str) -> list[str]:
+    """Names of daily partitions of `table` that were detached but not dropped yet."""
+    result = await session.execute(
+        text(
+            "SELECT relname FROM pg_class "
+            "WHERE relkind = 'r' AND NOT relispartition "
+            "AND relnamespace = current_schema()::regnamespace "
+            "AND starts_with(relname, :prefix) "
+            "ORDER BY relname"
+        ),
+        {"prefix": f"{table}_p"},
+    )
+    return [name for name in result.scalars().all() if partition_day(table, name) is not None]
+
+
+async def has_default_partition(session: AsyncSession, table: str) -> bool:
+    """Whether partitioned `table` has a default partition."""
+    result = await session.execute(
+        text(
+            "SELECT 1 FROM pg_partitioned_table "
+            "WHERE partrelid = to_regclass(:table) AND partdefid <> 0"
+        ),
+        {"table": table},
+    )
+    return result.scalar_one_or_none() is not None
+
+
+async def is_detach_pending(session: AsyncSession, name: str) -> bool:
+    """Whether partition `name` is left half-detached by an interrupted DETACH CONCURRENTLY."""
+    result = await session.execute(
+        text("SELECT inhdetachpending FROM pg_inherits WHERE inhrelid = to_regclass(:name)"),
+        {"name": name},
+    )
+    return bool(result.scalar_one_or_none())
+
+
+async def ensure_daily_partitions(
+    session: AsyncSession, table: str, start: date, days: int
+) -> None:
+    """Create the partitions for `days` days from `start` that do not exist yet."""
+    for offset in range(days):
+        await session.execute(text(create_daily_partition_sql(table, start + timedelta(days=offset))))
+
+
+async def drop_partitions_before(session: AsyncSession, table: str, cutoff: datetime) -> list[str]:
+    """
+    Drop the daily partitions whose whole range is older than `cutoff`.
+
+    Returns:
+        list: names of the dropped partitions
+    """
+    dropped = []
+    for name in await list_partitions(session, table):
+        day = partition_day(table, name)
+        if day is None or day_bounds(day)[1] > cutoff:
+            continue
+        await session.execute(text(f"DROP TABLE IF EXISTS {name}"))
+        dropped.append(name)
+    return dropped
+
+
+async def table_size_bytes(session: AsyncSession, table: str) -> int:
+    """Total size of a table, its indexes and (for a partitioned table) all partitions."""
+    result = await session.execute(
+        text(
+            "SELECT COALESCE(SUM(pg_total_relation_size(relid)), 0) "
+            "FROM pg_partition_tree(to_regclass(:table))"
+        ),
+        {"table": table},
+    )
+    return int(result.scalar_one())
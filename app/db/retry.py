@@ -0,0 +1,71 @@
+"""Retry of database units of work on transient concurrency errors."""
+import asyncio
+import functools
+import random
+from typing import Any, Awaitable, Callable, TypeVar
+
+from sqlalchemy.exc import DBAPIError
+
+from app.core.config import settings
+from app.core.logging_config import get_logger
+from app.core.metrics import db_retries_total
+
+logger = get_logger(__name__)
+
+DEADLOCK_DETECTED = "40P01"
+SERIALIZATION_FAILURE = "40001"
+RETRYABLE_SQLSTATES = frozenset({DEADLOCK_DETECTED, SERIALIZATION_FAILURE})
+
+F = TypeVar("F", bound=Callable[..., Awaitable[Any]])
+
+
+def get_sqlstate(error: DBAPIError) -> str | None:
+    """Extract the PostgreSQL SQLSTATE code from a wrapped driver error."""
+    orig = error.orig
+    sqlstate = getattr(orig, "sqlstate", None) or getattr(orig, "pgcode", None)
+    if sqlstate is None and orig is not None:
+        sqlstate = getattr(orig.__cause__, "sqlstate", None)
+    return sqlstate
+
+
+def retry_on_db_conflict(operation: str) -> Callable[[F], F]:
+    """
+    Re-run a service method when the database aborts it with a deadlock or
+    serialization failure.
+
+    The decorated method must belong to an object with a `session` attribute and
+    must be a complete unit of work (it commits at the end), because the session
+    is rolled back before each retry and the method is invoked again from scratch.
+    """
+
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        async def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+            attempt = 1
+            while True:
+                try:
+                    return await func(self, *args, **kwargs)
+                except DBAPIError as e:
+                    sqlstate = get_sqlstate(e)
+                    if (
+                        sqlstate not in RETRYABLE_SQLSTATES
+                        or attempt >= settings.db_retry_max_attempts
+                    ):
+                        raise
+
+                    await self.session.rollback()
+                    db_retries_total.labels(operation=operation, sqlstate=sqlstate).inc()
+
+                    delay = random.uniform(
+                        0, settings.db_retry_base_delay_seconds * (2 ** (attempt - 1))
+                    )
+                    logger.warning(
+                        f"{operation} aborted with SQLSTATE {sqlstate}, retrying in "
+                        f"{delay:.3f}s (attempt {attempt}/{settings.db_retry_max_attempts})"
+                    )
+                    await asyncio.sleep(delay)
+                    attempt += 1
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
@@ -0,0 +1,29 @@
+"""Per-request counting of database round trips."""
+from contextvars import ContextVar
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class RoundTripCounter:
+    """Mutable counter shared by all statements executed in one request."""
+
+    def __init__(self) -> None:
+        self.count = 0
+
+
+db_round_trips_ctx_var: ContextVar[RoundTripCounter | None] = ContextVar(
+    "db_round_trips", default=None
+)
+
+
+def _count_round_trip(*args: Any) -> None:
+    """Count a statement or transaction control command for the current request."""
+    counter = db_round_trips_ctx_var.get()
+    if counter is not None:
+        counter.count += 1
+
+
+for _event_name in ("begin", "before_cursor_execute", "commit", "rollback"):
+    event.listen(Engine, _event_name, _count_round_trip)
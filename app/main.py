@@ -8,9 +8,15 @@ from fastapi import FastAPI
 from app.core.config import settings
 from app.core.logging_config import setup_logging
 from app.core.rate_limiter import close_redis, init_redis
-from app.middleware import RequestIdMiddleware
+from app.middleware import DbRoundTripMiddleware, RequestIdMiddleware
 from app.routers import admin, observability, orders, payments, products
-from app.workers import outbox_worker
+from app.services.order_group_commit import order_group_committer
+from app.workers import (
+    idempotency_purger,
+    outbox_archiver,
+    outbox_worker,
+    stock_ledger_reconciler,
+)
 
 
 @asynccontextmanager
@@ -19,16 +25,29 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     setup_logging()
     init_redis()
 
-    worker_task = asyncio.create_task(outbox_worker.start())
+    worker_tasks = []
+    if settings.idempotency_purger_embedded_enabled:
+        worker_tasks.append(asyncio.create_task(idempotency_purger.start()))
+    if settings.outbox_archiver_embedded_enabled:
+        worker_tasks.append(asyncio.create_task(outbox_archiver.start()))
+    if settings.outbox_embedded_worker_enabled:
+        worker_tasks.append(asyncio.create_task(outbox_worker.start()))
+    if settings.stock_ledger_enabled:
+        worker_tasks.append(asyncio.create_task(stock_ledger_reconciler.start()))
 
     yield
 
+    await order_group_committer.close()
     await outbox_worker.stop()
-    worker_task.cancel()
-    try:
-        await worker_task
-    except asyncio.CancelledError:
-        pass
+    await stock_ledger_reconciler.stop()
+    await idempotency_purger.stop()
+    await outbox_archiver.stop()
+    for worker_task in worker_tasks:
+        worker_task.cancel()
+        try:
+            await worker_task
+        except asyncio.CancelledError:
+            pass
 
     await close_redis()
 
@@ -40,6 +59,7 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+app.add_middleware(DbRoundTripMiddleware)
 app.add_middleware(RequestIdMiddleware)
 
 app.include_router(observability.router)
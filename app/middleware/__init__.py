@@ -1,7 +1,8 @@
 """Middleware modules."""
+from app.middleware.db_round_trips import DbRoundTripMiddleware
 from app.middleware.request_id import RequestIdMiddleware
 
-__all__ = ["RequestIdMiddleware"]
+__all__ = ["RequestIdMiddleware", "DbRoundTripMiddleware"]
 
 
 
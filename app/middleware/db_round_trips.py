@@ -0,0 +1,26 @@
+"""Database round-trip counting middleware."""
+from fastapi import Request
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.core.metrics import db_round_trips_per_request
+from app.db.round_trips import RoundTripCounter, db_round_trips_ctx_var
+
+
+class DbRoundTripMiddleware(BaseHTTPMiddleware):
+    """Middleware to count database round trips per request."""
+
+    async def dispatch(self, request: Request, call_next):  # type: ignore[no-untyped-def]
+        """Expose the round-trip count as a header and a histogram."""
+        counter = RoundTripCounter()
+        token = db_round_trips_ctx_var.set(counter)
+        try:
+            response = await call_next(request)
+        finally:
+            db_round_trips_ctx_var.reset(token)
+
+        route = request.scope.get("route")
+        db_round_trips_per_request.labels(
+            method=request.method, route=getattr(route, "path", "unmatched")
+        ).observe(counter.count)
+        response.headers["X-DB-Round-Trips"] = str(counter.count)
+        return response
@@ -1,17 +1,28 @@
 """Database models."""
-from app.models.idempotency import IdempotencyKey
+from app.models.idempotency import IdempotencyKey, IdempotencyStatus
 from app.models.order import Order, OrderItem, OrderStatus
-from app.models.outbox import Outbox, OutboxStatus
-from app.models.product import Product
+from app.models.outbox import (
+    Outbox,
+    OutboxArchive,
+    OutboxPartitionLease,
+    OutboxStatus,
+    OutboxWorkerMember,
+)
+from app.models.product import Product, ProductStockShard
 
 __all__ = [
     "Product",
+    "ProductStockShard",
     "Order",
     "OrderItem",
     "OrderStatus",
     "Outbox",
     "OutboxStatus",
+    "OutboxArchive",
+    "OutboxPartitionLease",
+    "OutboxWorkerMember",
     "IdempotencyKey",
+    "IdempotencyStatus",
 ]
 
 
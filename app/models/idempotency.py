@@ -1,28 +1,60 @@
 """Idempotency key model for preventing duplicate requests."""
 import uuid
 from datetime import datetime
+from enum import Enum
 
-from sqlalchemy import DateTime, String, func
+from sqlalchemy import DateTime, Integer, LargeBinary, String, func
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.base import Base
 
 
+class IdempotencyStatus(str, Enum):
+    """Idempotency key status enum."""
+
+    PENDING = "pending"
+    COMPLETED = "completed"
+
+
 class IdempotencyKey(Base):
-    """Idempotency key tracking for POST /orders."""
+    """
+    Idempotency key tracking for POST /orders.
+
+    A key is claimed as PENDING before any work is done for the request, with
+    the id its order will get, and becomes COMPLETED in the transaction that
+    writes the order, together with the serialized response replayed to
+    duplicates. A pending claim whose `claimed_until` has passed is
+    considered abandoned and may be taken over by a retry.
+
+    Keys are kept for `idempotency_key_retention_hours`; older rows count as
+    absent and are purged by dropping whole daily partitions, so the same key
+    may appear in several rows, of which at most one is live.
+    """
 
     __tablename__ = "idempotency_keys"
 
     key: Mapped[str] = mapped_column(String(255), primary_key=True, nullable=False)
     request_hash: Mapped[str] = mapped_column(String(64), nullable=False)
     order_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False, index=True)
+    status: Mapped[str] = mapped_column(
+        String(20),
+        nullable=False,
+        default=IdempotencyStatus.COMPLETED.value,
+        server_default=IdempotencyStatus.COMPLETED.value,
+    )
+    claimed_until: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    response_status: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    response_body: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
+    # Part of the primary key because the table is range-partitioned on it
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now(), nullable=False
+        DateTime(timezone=True), primary_key=True, server_default=func.now(), nullable=False
     )
 
     def __repr__(self) -> str:
-        return f"<IdempotencyKey(key={self.key}, order_id={self.order_id})>"
+        return (
+            f"<IdempotencyKey(key={self.key}, status={self.status}, order_id={self.order_id})>"
+        )
 
 
 
@@ -25,6 +25,8 @@ class Order(Base):
     """Order model."""
 
     __tablename__ = "orders"
+    # Fetch server-generated columns (updated_at on UPDATE) with RETURNING
+    __mapper_args__ = {"eager_defaults": True}
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
@@ -2,45 +2,195 @@
 import uuid
 from datetime import datetime
 from enum import Enum
+from typing import Any
 
-from sqlalchemy import DateTime, Integer, String, Text, func
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import (
+    DDL,
+    BigInteger,
+    Computed,
+    DateTime,
+    Index,
+    Integer,
+    Sequence,
+    SmallInteger,
+    String,
+    event,
+    func,
+    text,
+)
+from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.base import Base
 
+# Number of hash partitions of outbox events; workers divide these between them
+OUTBOX_PARTITIONS = 64
+
+# Numbers events in insertion order; a plain sequence rather than an identity
+# column, which partitioned tables do not support
+OUTBOX_SEQUENCE = Sequence("outbox_sequence_seq")
+
+# Channel notified when outbox rows are inserted; delivered on commit
+OUTBOX_NOTIFY_CHANNEL = "outbox_events"
+
+OUTBOX_NOTIFY_FUNCTION_DDL = f"""
+CREATE OR REPLACE FUNCTION notify_outbox_insert() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('{OUTBOX_NOTIFY_CHANNEL}', '');
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+OUTBOX_NOTIFY_TRIGGER_DDL = """
+CREATE TRIGGER outbox_notify AFTER INSERT ON outbox
+FOR EACH STATEMENT EXECUTE FUNCTION notify_outbox_insert()
+"""
+
 
 class OutboxStatus(str, Enum):
     """Outbox event status."""
 
     PENDING = "pending"
+    PROCESSING = "processing"
     SENT = "sent"
     DEAD = "dead"
 
 
 class Outbox(Base):
-    """Outbox events for reliable message delivery."""
+    """
+    Outbox events for reliable message delivery.
+
+    Events with the same `partition_key` (the order id) are processed one at a
+    time in `sequence` order. `partition` is a hash of the key, used to divide
+    keys between workers.
+
+    The table is range-partitioned by day on `created_at`. Sent events older
+    than `outbox_retention_hours` are moved to `outbox_archive` and their
+    daily partitions dropped.
+    """
 
     __tablename__ = "outbox"
+    __table_args__ = (
+        # Partial indexes cover only unfinished events, so claiming and the
+        # per-key ordering check stay proportional to the backlog, not history
+        Index(
+            "ix_outbox_partition_key_sequence",
+            "partition_key",
+            "sequence",
+            postgresql_where=text("status IN ('pending', 'processing')"),
+        ),
+        Index(
+            "ix_outbox_pending_next_attempt_at",
+            "next_attempt_at",
+            postgresql_where=text("status = 'pending'"),
+        ),
+        Index(
+            "ix_outbox_processing_lease_until",
+            "lease_until",
+            postgresql_where=text("status = 'processing'"),
+        ),
+        # Dead-letter inspection pages through dead events by creation time
+        Index(
+            "ix_outbox_dead_created_at_id",
+            "created_at",
+            "id",
+            postgresql_where=text("status = 'dead'"),
+        ),
+        # Dead-letter triage finds dead events by payload containment (@>)
+        Index(
+            "ix_outbox_dead_payload",
+            "payload_json",
+            postgresql_using="gin",
+            postgresql_ops={"payload_json": "jsonb_path_ops"},
+            postgresql_where=text("status = 'dead'"),
+        ),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
     )
+    sequence: Mapped[int] = mapped_column(
+        BigInteger,
+        OUTBOX_SEQUENCE,
+        server_default=OUTBOX_SEQUENCE.next_value(),
+        nullable=False,
+        index=True,
+    )
+    partition_key: Mapped[str] = mapped_column(String(255), nullable=False)
+    partition: Mapped[int] = mapped_column(
+        SmallInteger,
+        Computed(
+            "(('x' || substr(md5(partition_key), 1, 8))::bit(32)::bigint "
+            f"% {OUTBOX_PARTITIONS})::smallint"
+        ),
+        index=True,
+    )
     event_type: Mapped[str] = mapped_column(String(100), nullable=False, index=True)
-    payload_json: Mapped[str] = mapped_column(Text, nullable=False)
+    payload_json: Mapped[dict[str, Any]] = mapped_column(JSONB, nullable=False)
     status: Mapped[str] = mapped_column(
-        String(20), nullable=False, default=OutboxStatus.PENDING.value, index=True
+        String(20), nullable=False, default=OutboxStatus.PENDING.value
     )
     attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
-    next_attempt_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), nullable=False, index=True
-    )
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    # Part of the primary key because the table is range-partitioned on it
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now(), nullable=False
+        DateTime(timezone=True), primary_key=True, server_default=func.now(), nullable=False
     )
+    # Worker holding the event while it is processing, until lease_until
+    claimed_by: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    lease_until: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
 
     def __repr__(self) -> str:
         return f"<Outbox(id={self.id}, event_type={self.event_type}, status={self.status})>"
 
 
+class OutboxArchive(Base):
+    """Sent outbox event moved out of `outbox` after the retention period."""
+
+    __tablename__ = "outbox_archive"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    sequence: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    partition_key: Mapped[str] = mapped_column(String(255), nullable=False, index=True)
+    event_type: Mapped[str] = mapped_column(String(100), nullable=False)
+    payload_json: Mapped[dict[str, Any]] = mapped_column(JSONB, nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    archived_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+    def __repr__(self) -> str:
+        return f"<OutboxArchive(id={self.id}, event_type={self.event_type})>"
+
+
+class OutboxPartitionLease(Base):
+    """Ownership of an outbox partition by a worker, valid until `lease_until`."""
+
+    __tablename__ = "outbox_partition_leases"
+
+    partition: Mapped[int] = mapped_column(SmallInteger, primary_key=True, autoincrement=False)
+    owner: Mapped[str] = mapped_column(String(255), nullable=False, index=True)
+    lease_until: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<OutboxPartitionLease(partition={self.partition}, owner={self.owner})>"
+
+
+class OutboxWorkerMember(Base):
+    """Live outbox worker, counted when dividing partitions until `lease_until`."""
+
+    __tablename__ = "outbox_workers"
+
+    worker_id: Mapped[str] = mapped_column(String(255), primary_key=True)
+    lease_until: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<OutboxWorkerMember(worker_id={self.worker_id})>"
+
 
+# Every producer wakes the outbox worker without an extra statement; the
+# trigger fires once per INSERT statement, so batch inserts notify once.
+event.listen(Outbox.__table__, "after_create", DDL(OUTBOX_NOTIFY_FUNCTION_DDL))
+event.listen(Outbox.__table__, "after_create", DDL(OUTBOX_NOTIFY_TRIGGER_DDL))
@@ -3,7 +3,7 @@ import uuid
 from datetime import datetime
 from decimal import Decimal
 
-from sqlalchemy import DECIMAL, Boolean, DateTime, String, func
+from sqlalchemy import DECIMAL, Boolean, DateTime, ForeignKey, Integer, String, func
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -14,6 +14,8 @@ class Product(Base):
     """Product model with stock management."""
 
     __tablename__ = "products"
+    # Fetch server-generated columns (updated_at on UPDATE) with RETURNING
+    __mapper_args__ = {"eager_defaults": True}
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
@@ -21,6 +23,9 @@ class Product(Base):
     name: Mapped[str] = mapped_column(String(255), unique=True, nullable=False, index=True)
     price: Mapped[Decimal] = mapped_column(DECIMAL(12, 2), nullable=False)
     stock: Mapped[int] = mapped_column(nullable=False, default=0)
+    stock_shards: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
     is_active: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True, index=True)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
@@ -34,3 +39,27 @@ class Product(Base):
 
 
 
+
+
+class ProductStockShard(Base):
+    """
+    Stock bucket for a sharded product.
+
+    When `Product.stock_shards` is non-zero the product's stock lives in that many
+    bucket rows instead of `products.stock`, so concurrent reservations contend on
+    different rows.
+    """
+
+    __tablename__ = "product_stock_shards"
+
+    product_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("products.id", ondelete="CASCADE"), primary_key=True
+    )
+    shard_no: Mapped[int] = mapped_column(Integer, primary_key=True)
+    stock: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    def __repr__(self) -> str:
+        return (
+            f"<ProductStockShard(product_id={self.product_id}, shard_no={self.shard_no}, "
+            f"stock={self.stock})>"
+        )
@@ -1,14 +1,18 @@
 """Repository layer."""
 from app.repositories.idempotency_repository import IdempotencyRepository
 from app.repositories.order_repository import OrderRepository
+from app.repositories.outbox_partition_repository import OutboxPartitionRepository
 from app.repositories.outbox_repository import OutboxRepository
 from app.repositories.product_repository import ProductRepository
+from app.repositories.stock_shard_repository import StockShardRepository
 
 __all__ = [
     "ProductRepository",
     "OrderRepository",
     "OutboxRepository",
+    "OutboxPartitionRepository",
     "IdempotencyRepository",
+    "StockShardRepository",
 ]
 
 
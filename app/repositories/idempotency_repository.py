@@ -1,32 +1,219 @@
 """Idempotency key repository."""
 import uuid
+from datetime import timedelta
+from typing import Any, Sequence
 
-from sqlalchemy import select
+from sqlalchemy import (
+    ColumnElement,
+    Integer,
+    LargeBinary,
+    String,
+    column,
+    delete,
+    exists,
+    func,
+    literal,
+    select,
+    text,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.idempotency import IdempotencyKey
+from app.core.config import settings
+from app.models.idempotency import IdempotencyKey, IdempotencyStatus
+
+# First key of the two-key advisory locks serializing claims of one idempotency key
+ADVISORY_LOCK_NAMESPACE = 7101
 
 
 class IdempotencyRepository:
-    """Repository for idempotency key operations."""
+    """
+    Repository for idempotency key operations.
+
+    The primary key is (key, created_at) because the table is partitioned by
+    creation time, so a unique `key` cannot be enforced by an index: inserts
+    take a transaction-level advisory lock per key and skip keys that are
+    still live. Keys older than the retention period count as absent.
+    """
 
     def __init__(self, session: AsyncSession):
         self.session = session
 
+    @staticmethod
+    def _live() -> ColumnElement[bool]:
+        """Filter for keys within the retention period."""
+        return IdempotencyKey.created_at > func.now() - timedelta(
+            hours=settings.idempotency_key_retention_hours
+        )
+
+    async def _lock_keys(self, keys: list[str]) -> None:
+        """Take the advisory locks of `keys` in a canonical order until commit."""
+        await self.session.execute(
+            text(
+                "SELECT pg_advisory_xact_lock(:namespace, h) FROM ("
+                "SELECT DISTINCT hashtext(k) AS h FROM unnest(CAST(:keys AS text[])) AS k "
+                "ORDER BY h) AS hashes"
+            ),
+            {"namespace": ADVISORY_LOCK_NAMESPACE, "keys": keys},
+        )
+
     async def create(self, key: str, request_hash: str, order_id: uuid.UUID) -> IdempotencyKey:
         """Create a new idempotency key."""
         idempotency_key = IdempotencyKey(key=key, request_hash=request_hash, order_id=order_id)
         self.session.add(idempotency_key)
         await self.session.flush()
-        await self.session.refresh(idempotency_key)
         return idempotency_key
 
     async def get_by_key(self, key: str) -> IdempotencyKey | None:
         """Get idempotency key by key."""
         result = await self.session.execute(
-            select(IdempotencyKey).where(IdempotencyKey.key == key)
+            select(IdempotencyKey)
+            .where(IdempotencyKey.key == key, self._live())
+            .execution_options(populate_existing=True)
         )
         return result.scalar_one_or_none()
 
+    async def claim(
+        self, key: str, request_hash: str, order_id: uuid.UUID, lease_seconds: float
+    ) -> bool:
+        """
+        Claim a key as pending with INSERT ... WHERE NOT EXISTS under the key's
+        advisory lock.
+
+        Returns True if this call inserted the key, False if it already existed.
+        """
+        await self._lock_keys([key])
+        live_key = select(IdempotencyKey.key).where(IdempotencyKey.key == key, self._live())
+        result = await self.session.execute(
+            insert(IdempotencyKey)
+            .from_select(
+                ["key", "request_hash", "order_id", "status", "claimed_until"],
+                select(
+                    literal(key),
+                    literal(request_hash),
+                    literal(order_id, IdempotencyKey.order_id.type),
+                    literal(IdempotencyStatus.PENDING.value),
+                    func.now() + timedelta(seconds=lease_seconds),
+                ).where(~exists(live_key)),
+            )
+            .returning(IdempotencyKey.key)
+        )
+        return result.scalar_one_or_none() is not None
+
+    async def take_over_stale_claim(
+        self, key: str, request_hash: str, order_id: uuid.UUID, lease_seconds: float
+    ) -> bool:
+        """Re-claim a pending key whose lease has expired for a new order id."""
+        result = await self.session.execute(
+            update(IdempotencyKey)
+            .where(
+                IdempotencyKey.key == key,
+                IdempotencyKey.request_hash == request_hash,
+                IdempotencyKey.status == IdempotencyStatus.PENDING.value,
+                IdempotencyKey.claimed_until < func.now(),
+                self._live(),
+            )
+            .values(
+                order_id=order_id,
+                claimed_until=func.now() + timedelta(seconds=lease_seconds),
+            )
+            .returning(IdempotencyKey.key)
+            .execution_options(synchronize_session=False)
+        )
+        return result.scalar_one_or_none() is not None
+
+    async def complete(
+        self, key: str, order_id: uuid.UUID, response_status: int, response_body: bytes
+    ) -> bool:
+        """
+        Mark a pending claim as completed and store the response to replay.
+
+        Returns False if the claim no longer belongs to `order_id`.
+        """
+        result = await self.session.execute(
+            update(IdempotencyKey)
+            .where(
+                IdempotencyKey.key == key,
+                IdempotencyKey.order_id == order_id,
+                IdempotencyKey.status == IdempotencyStatus.PENDING.value,
+            )
+            .values(
+                status=IdempotencyStatus.COMPLETED.value,
+                claimed_until=None,
+                response_status=response_status,
+                response_body=response_body,
+            )
+            .returning(IdempotencyKey.key)
+            .execution_options(synchronize_session=False)
+        )
+        return result.scalar_one_or_none() is not None
+
+    async def release_claim(self, key: str, order_id: uuid.UUID) -> None:
+        """Delete a pending claim so the request can be retried."""
+        await self.session.execute(
+            delete(IdempotencyKey)
+            .where(
+                IdempotencyKey.key == key,
+                IdempotencyKey.order_id == order_id,
+                IdempotencyKey.status == IdempotencyStatus.PENDING.value,
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    async def get_by_keys(self, keys: list[str]) -> Sequence[IdempotencyKey]:
+        """Get idempotency keys by keys."""
+        result = await self.session.execute(
+            select(IdempotencyKey).where(IdempotencyKey.key.in_(keys), self._live())
+        )
+        return result.scalars().all()
 
+    async def create_many_if_absent(self, rows: list[dict[str, Any]]) -> set[str]:
+        """
+        Insert idempotency keys in one statement, skipping keys that are still live.
 
+        Returns the set of keys that were inserted by this call.
+        """
+        keys = [row["key"] for row in rows]
+        await self._lock_keys(keys)
+        result = await self.session.execute(
+            select(IdempotencyKey.key).where(IdempotencyKey.key.in_(keys), self._live())
+        )
+        existing = set(result.scalars().all())
+
+        new_rows = [row for row in rows if row["key"] not in existing]
+        if new_rows:
+            await self.session.execute(insert(IdempotencyKey).values(new_rows))
+        return {row["key"] for row in new_rows}
+
+    async def store_responses(self, responses: list[tuple[str, int, bytes]]) -> None:
+        """
+        Store the responses to replay for keys created in this transaction.
+
+        Each (key, status, body) is a row of a VALUES list joined to
+        `idempotency_keys`, so a whole batch costs a single UPDATE.
+        """
+        if not responses:
+            return
+
+        rows = values(
+            column("key", String),
+            column("response_status", Integer),
+            column("response_body", LargeBinary),
+            name="responses",
+        ).data(responses)
+        await self.session.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.key == rows.c.key, self._live())
+            .values(response_status=rows.c.response_status, response_body=rows.c.response_body)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def delete_many(self, keys: list[str]) -> None:
+        """Delete idempotency keys."""
+        await self.session.execute(
+            delete(IdempotencyKey)
+            .where(IdempotencyKey.key.in_(keys), self._live())
+            .execution_options(synchronize_session=False)
+        )
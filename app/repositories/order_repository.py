@@ -1,5 +1,6 @@
 """Order repository."""
 import uuid
+from typing import Sequence
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -18,9 +19,21 @@ class OrderRepository:
         """Create a new order with items."""
         self.session.add(order)
         await self.session.flush()
-        await self.session.refresh(order)
         return order
 
+    async def create_many(self, orders: list[Order]) -> list[Order]:
+        """Create orders with items using multi-row INSERTs."""
+        self.session.add_all(orders)
+        await self.session.flush()
+        return orders
+
+    async def get_by_ids(self, order_ids: list[uuid.UUID]) -> Sequence[Order]:
+        """Get orders by IDs with items."""
+        result = await self.session.execute(
+            select(Order).where(Order.id.in_(order_ids)).options(selectinload(Order.items))
+        )
+        return result.scalars().all()
+
     async def get_by_id(self, order_id: uuid.UUID) -> Order | None:
         """Get order by ID with items."""
         result = await self.session.execute(
@@ -31,14 +44,12 @@ class OrderRepository:
     async def update(self, order: Order) -> Order:
         """Update order."""
         await self.session.flush()
-        await self.session.refresh(order)
         return order
 
     async def add_item(self, item: OrderItem) -> OrderItem:
         """Add an item to an order."""
         self.session.add(item)
         await self.session.flush()
-        await self.session.refresh(item)
         return item
 
 
@@ -0,0 +1,134 @@
+"""Outbox partition lease repository."""
+import math
+from datetime import datetime, timedelta
+
+from sqlalchemy import (
+    ColumnElement,
+    Integer,
+    column,
+    delete,
+    func,
+    literal,
+    or_,
+    select,
+    update,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.outbox import OUTBOX_PARTITIONS, OutboxPartitionLease, OutboxWorkerMember
+
+
+class OutboxPartitionRepository:
+    """
+    Repository dividing outbox partitions between workers.
+
+    Workers register in `outbox_workers` and each keeps leases on a fair share
+    of the partitions: the partitions divided by the number of live workers. A
+    worker that joins takes free partitions; the others notice the larger group
+    on their next rebalance and release their surplus, which the newcomer then
+    picks up.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def rebalance(self, owner: str, lease_seconds: float) -> list[int]:
+        """
+        Renew the membership and leases of `owner`, then release or take
+        partitions to reach its share.
+
+        Returns:
+            list[int]: the partitions `owner` holds after rebalancing
+        """
+        lease_until = func.now() + timedelta(seconds=lease_seconds)
+
+        result = await self.session.execute(
+            update(OutboxPartitionLease)
+            .where(OutboxPartitionLease.owner == owner)
+            .values(lease_until=lease_until)
+            .returning(OutboxPartitionLease.partition)
+            .execution_options(synchronize_session=False)
+        )
+        owned = sorted(result.scalars().all())
+
+        await self.session.execute(
+            delete(OutboxWorkerMember)
+            .where(OutboxWorkerMember.lease_until < func.now())
+            .execution_options(synchronize_session=False)
+        )
+        stmt = insert(OutboxWorkerMember).values(worker_id=owner, lease_until=lease_until)
+        await self.session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[OutboxWorkerMember.worker_id],
+                set_={"lease_until": stmt.excluded.lease_until},
+            )
+        )
+        result = await self.session.execute(select(func.count()).select_from(OutboxWorkerMember))
+        share = math.ceil(OUTBOX_PARTITIONS / result.scalar_one())
+
+        if len(owned) > share:
+            surplus = owned[share:]
+            await self.session.execute(
+                delete(OutboxPartitionLease)
+                .where(
+                    OutboxPartitionLease.owner == owner,
+                    OutboxPartitionLease.partition.in_(surplus),
+                )
+                .execution_options(synchronize_session=False)
+            )
+            return owned[:share]
+
+        if len(owned) < share:
+            owned += await self._take_free(owner, share - len(owned), lease_until)
+
+        return sorted(owned)
+
+    async def _take_free(
+        self, owner: str, limit: int, lease_until: ColumnElement[datetime]
+    ) -> list[int]:
+        """Take up to `limit` partitions that have no owner or an expired lease."""
+        partitions = func.generate_series(0, OUTBOX_PARTITIONS - 1).table_valued(
+            column("value", Integer)
+        )
+        live = select(OutboxPartitionLease.partition).where(
+            OutboxPartitionLease.lease_until > func.now()
+        )
+        free = (
+            select(
+                partitions.c.value,
+                literal(owner),
+                lease_until,
+            )
+            .where(partitions.c.value.notin_(live))
+            .order_by(func.random())
+            .limit(limit)
+        )
+
+        # The conditional upsert re-checks the lease under the row lock, so of
+        # two workers racing for a partition only one gets it
+        stmt = insert(OutboxPartitionLease).from_select(["partition", "owner", "lease_until"], free)
+        result = await self.session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[OutboxPartitionLease.partition],
+                set_={"owner": stmt.excluded.owner, "lease_until": stmt.excluded.lease_until},
+                where=or_(
+                    OutboxPartitionLease.lease_until <= func.now(),
+                    OutboxPartitionLease.owner == owner,
+                ),
+            ).returning(OutboxPartitionLease.partition)
+        )
+        return list(result.scalars().all())
+
+    async def release(self, owner: str) -> None:
+        """Release every partition held by `owner` and leave the group."""
+        await self.session.execute(
+            delete(OutboxPartitionLease)
+            .where(OutboxPartitionLease.owner == owner)
+            .execution_options(synchronize_session=False)
+        )
+        await self.session.execute(
+            delete(OutboxWorkerMember)
+            .where(OutboxWorkerMember.worker_id == owner)
+            .execution_options(synchronize_session=False)
+        )
@@ -1,13 +1,47 @@
 """Outbox repository."""
 import uuid
-from datetime import datetime
-from typing import Sequence
+from datetime import datetime, timedelta
+from typing import Any, Sequence, cast
 
-from sqlalchemy import select
+from sqlalchemy import (
+    ColumnElement,
+    DateTime,
+    Integer,
+    SQLColumnExpression,
+    String,
+    and_,
+    case,
+    column,
+    func,
+    literal,
+    or_,
+    select,
+    tuple_,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
 from app.models.outbox import Outbox, OutboxStatus
 
+# (event id, status, attempts, next attempt time) of a finished event
+EventOutcome = tuple[uuid.UUID, OutboxStatus, int, datetime]
+
+# Statuses of events that still need a worker
+UNFINISHED = (OutboxStatus.PENDING, OutboxStatus.PROCESSING)
+
+
+def status_in(status: SQLColumnExpression[str], *statuses: OutboxStatus) -> ColumnElement[bool]:
+    """
+    Filter `status` on `statuses`, rendered as literals rather than parameters.
+
+    The planner can only use the partial indexes on unfinished events when
+    the statuses of the query are known at planning time.
+    """
+    return status.in_([literal(s.value, literal_execute=True) for s in statuses])
+
 
 class OutboxRepository:
     """Repository for outbox operations."""
@@ -19,15 +53,20 @@ class OutboxRepository:
         """Create a new outbox event."""
         self.session.add(outbox)
         await self.session.flush()
-        await self.session.refresh(outbox)
         return outbox
 
+    async def create_many(self, events: list[Outbox]) -> list[Outbox]:
+        """Create outbox events using a multi-row INSERT."""
+        self.session.add_all(events)
+        await self.session.flush()
+        return events
+
     async def get_pending_events(self, limit: int = 10) -> Sequence[Outbox]:
         """Get pending events that are ready to be processed."""
         now = datetime.utcnow()
         result = await self.session.execute(
             select(Outbox)
-            .where(Outbox.status == OutboxStatus.PENDING.value)
+            .where(status_in(Outbox.status, OutboxStatus.PENDING))
             .where(Outbox.next_attempt_at <= now)
             .order_by(Outbox.next_attempt_at.asc())
             .limit(limit)
@@ -35,21 +74,369 @@ class OutboxRepository:
         )
         return result.scalars().all()
 
+    @staticmethod
+    def _claimable() -> ColumnElement[bool]:
+        """Filter for ready pending events and events whose lease has expired."""
+        return or_(
+            and_(
+                status_in(Outbox.status, OutboxStatus.PENDING),
+                Outbox.next_attempt_at <= func.now(),
+            ),
+            and_(
+                status_in(Outbox.status, OutboxStatus.PROCESSING),
+                Outbox.lease_until < func.now(),
+            ),
+        )
+
+    @staticmethod
+    def _is_next_of_key(ordered_types: Sequence[str] | None = None) -> ColumnElement[bool]:
+        """
+        Filter for events with no unfinished earlier event of the same partition key.
+
+        With `ordered_types`, only earlier events of those types hold an event
+        back, so an event of a type nobody claims does not block its key.
+        """
+        earlier = aliased(Outbox)
+        blocking = (
+            select(earlier.id)
+            .where(earlier.partition_key == Outbox.partition_key)
+            .where(earlier.sequence < Outbox.sequence)
+            .where(status_in(earlier.status, *UNFINISHED))
+        )
+        if ordered_types is not None:
+            blocking = blocking.where(earlier.event_type.in_(ordered_types))
+        return ~blocking.exists()
+
+    async def supersede_events(
+        self, partitions: Sequence[int], event_types: Sequence[str]
+    ) -> int:
+        """
+        Mark pending events of `event_types` as sent when a later pending event
+        of the same type and partition key exists.
+
+        For types whose events carry the full latest state of their aggregate,
+        only the newest event of a burst needs delivering; it still goes out at
+        its own place in the key's order. Events being processed are left alone.
+
+        Returns:
+            int: number of superseded events
+        """
+        if not partitions or not event_types:
+            return 0
+
+        later = aliased(Outbox)
+        superseded = (
+            select(Outbox.id)
+            .where(Outbox.partition.in_(partitions))
+            .where(Outbox.event_type.in_(event_types))
+            .where(status_in(Outbox.status, OutboxStatus.PENDING))
+            .where(
+                select(later.id)
+                .where(later.partition_key == Outbox.partition_key)
+                .where(later.event_type == Outbox.event_type)
+                .where(later.sequence > Outbox.sequence)
+                .where(status_in(later.status, OutboxStatus.PENDING))
+                .exists()
+            )
+            .with_for_update(of=Outbox, skip_locked=True)
+        )
+        result = await self.session.execute(
+            update(Outbox)
+            .where(Outbox.id.in_(superseded.scalar_subquery()))
+            .values(status=OutboxStatus.SENT.value)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+    async def claim_events(
+        self,
+        worker_id: str,
+        partitions: Sequence[int],
+        limit: int,
+        lease_seconds: float,
+        event_types: Sequence[str] | None = None,
+        ordered_types: Sequence[str] | None = None,
+    ) -> Sequence[Outbox]:
+        """
+        Mark up to `limit` claimable events of `partitions` as processing by `worker_id`.
+
+        With `event_types`, only events of those types are claimed.
+
+        Only the oldest unfinished event of each partition key is claimable, so
+        events of one order are processed one at a time and in order; a failed
+        event holds back the later ones until it is sent or dead-lettered. With
+        `ordered_types`, earlier events of other types are skipped over.
+
+        Rows are picked with FOR UPDATE SKIP LOCKED, so concurrent workers claim
+        disjoint events; the row locks are released as soon as the caller
+        commits. Reclaiming an expired lease counts as a failed attempt.
+        """
+        if not partitions:
+            return []
+
+        claimable = (
+            select(Outbox.id)
+            .where(Outbox.partition.in_(partitions))
+            .where(self._claimable())
+            .where(self._is_next_of_key(ordered_types))
+            .order_by(Outbox.sequence.asc())
+            .limit(limit)
+            .with_for_update(of=Outbox, skip_locked=True)
+        )
+        if event_types is not None:
+            claimable = claimable.where(Outbox.event_type.in_(event_types))
+        result = await self.session.execute(
+            update(Outbox)
+            .where(Outbox.id.in_(claimable.scalar_subquery()))
+            .values(
+                status=OutboxStatus.PROCESSING.value,
+                claimed_by=worker_id,
+                lease_until=func.now() + timedelta(seconds=lease_seconds),
+                attempts=case(
+                    (Outbox.status == OutboxStatus.PROCESSING.value, Outbox.attempts + 1),
+                    else_=Outbox.attempts,
+                ),
+            )
+            .returning(Outbox)
+            .execution_options(synchronize_session=False, populate_existing=True)
+        )
+        return result.scalars().all()
+
+    async def finish_event(
+        self,
+        event_id: uuid.UUID,
+        worker_id: str,
+        status: OutboxStatus,
+        attempts: int,
+        next_attempt_at: datetime,
+    ) -> bool:
+        """
+        Record the outcome of a claimed event and release its lease.
+
+        Returns False if the event is no longer claimed by `worker_id`.
+        """
+        finished = await self.finish_events(
+            worker_id, [(event_id, status, attempts, next_attempt_at)]
+        )
+        return event_id in finished
+
+    async def finish_events(
+        self, worker_id: str, outcomes: Sequence[EventOutcome]
+    ) -> set[uuid.UUID]:
+        """
+        Record the outcomes of claimed events and release their leases in one UPDATE.
+
+        Each outcome is an (event id, status, attempts, next attempt time) row
+        of a VALUES list joined to `outbox`, so a batch of sent, retried and
+        dead events costs a single statement.
+
+        Returns:
+            set[uuid.UUID]: ids of the events that were still claimed by `worker_id`
+        """
+        if not outcomes:
+            return set()
+
+        rows = values(
+            column("id", UUID(as_uuid=True)),
+            column("status", String),
+            column("attempts", Integer),
+            column("next_attempt_at", DateTime(timezone=True)),
+            name="outcomes",
+        ).data(
+            [
+                (event_id, status.value, attempts, next_attempt_at)
+                for event_id, status, attempts, next_attempt_at in outcomes
+            ]
+        )
+        result = await self.session.execute(
+            update(Outbox)
+            .where(
+                Outbox.id == rows.c.id,
+                Outbox.status == OutboxStatus.PROCESSING.value,
+                Outbox.claimed_by == worker_id,
+            )
+            .values(
+                status=rows.c.status,
+                attempts=rows.c.attempts,
+                next_attempt_at=rows.c.next_attempt_at,
+                claimed_by=None,
+                lease_until=None,
+            )
+            .returning(Outbox.id)
+            .execution_options(synchronize_session=False)
+        )
+        return set(result.scalars().all())
+
+    async def get_next_attempt_at(
+        self,
+        partitions: Sequence[int],
+        event_types: Sequence[str] | None = None,
+        ordered_types: Sequence[str] | None = None,
+    ) -> datetime | None:
+        """
+        Get the earliest time an event of `partitions` is due or its lease expires.
+
+        Events waiting behind an earlier event of their key are left out; they
+        become due when that event finishes. With `event_types`, only events of
+        those types are considered; `ordered_types` is as for `claim_events`.
+        """
+        stmt = (
+            select(
+                func.min(
+                    case(
+                        (Outbox.status == OutboxStatus.PROCESSING.value, Outbox.lease_until),
+                        else_=Outbox.next_attempt_at,
+                    )
+                )
+            )
+            .where(Outbox.partition.in_(partitions))
+            .where(status_in(Outbox.status, *UNFINISHED))
+            .where(self._is_next_of_key(ordered_types))
+        )
+        if event_types is not None:
+            stmt = stmt.where(Outbox.event_type.in_(event_types))
+        result = await self.session.execute(stmt)
+        return cast(datetime | None, result.scalar_one())
+
+    async def count_pending_by_type(
+        self, partitions: Sequence[int], exclude_types: Sequence[str]
+    ) -> dict[str, int]:
+        """Count pending events of `partitions` by type, leaving out `exclude_types`."""
+        result = await self.session.execute(
+            select(Outbox.event_type, func.count())
+            .where(Outbox.partition.in_(partitions))
+            .where(status_in(Outbox.status, OutboxStatus.PENDING))
+            .where(Outbox.event_type.notin_(exclude_types))
+            .group_by(Outbox.event_type)
+        )
+        return dict(result.tuples().all())
+
     async def update(self, outbox: Outbox) -> Outbox:
         """Update outbox event."""
         await self.session.flush()
-        await self.session.refresh(outbox)
         return outbox
 
-    async def get_dead_events(self, limit: int = 100) -> Sequence[Outbox]:
-        """Get dead letter events."""
-        result = await self.session.execute(
+    @staticmethod
+    def _dead_filter(
+        event_type: str | None,
+        created_from: datetime | None,
+        created_to: datetime | None,
+        event_ids: Sequence[uuid.UUID] | None = None,
+        payload_contains: dict[str, Any] | None = None,
+    ) -> list[ColumnElement[bool]]:
+        """Conditions selecting dead events by type, creation time range, ids and payload."""
+        conditions = [status_in(Outbox.status, OutboxStatus.DEAD)]
+        if event_type is not None:
+            conditions.append(Outbox.event_type == event_type)
+        if created_from is not None:
+            conditions.append(Outbox.created_at >= created_from)
+        if created_to is not None:
+            conditions.append(Outbox.created_at < created_to)
+        if event_ids is not None:
+            conditions.append(Outbox.id.in_(event_ids))
+        if payload_contains is not None:
+            # @> is served by the GIN index on dead payloads
+            conditions.append(Outbox.payload_json.contains(payload_contains))
+        return conditions
+
+    async def get_dead_events(
+        self,
+        limit: int = 100,
+        event_type: str | None = None,
+        created_from: datetime | None = None,
+        created_to: datetime | None = None,
+        before: tuple[datetime, uuid.UUID] | None = None,
+        payload_contains: dict[str, Any] | None = None,
+    ) -> Sequence[Outbox]:
+        """
+        Get dead letter events, newest first, optionally filtered by type, time and payload.
+
+        Pages are keyset-paginated on (created_at, id): pass the values of the
+        last event of a page as `before` to get the next one.
+        """
+        stmt = (
             select(Outbox)
-            .where(Outbox.status == OutboxStatus.DEAD.value)
-            .order_by(Outbox.created_at.desc())
+            .where(
+                *self._dead_filter(
+                    event_type, created_from, created_to, payload_contains=payload_contains
+                )
+            )
+            .order_by(Outbox.created_at.desc(), Outbox.id.desc())
             .limit(limit)
         )
+        if before is not None:
+            created_at, event_id = before
+            stmt = stmt.where(
+                tuple_(Outbox.created_at, Outbox.id)
+                < tuple_(
+                    literal(created_at, Outbox.created_at.type), literal(event_id, Outbox.id.type)
+                )
+            )
+        result = await self.session.execute(stmt)
         return result.scalars().all()
 
+    async def requeue_dead_events(
+        self,
+        limit: int,
+        spread_seconds: float,
+        event_type: str | None = None,
+        created_from: datetime | None = None,
+        created_to: datetime | None = None,
+        event_ids: Sequence[uuid.UUID] | None = None,
+        payload_contains: dict[str, Any] | None = None,
+    ) -> list[str]:
+        """
+        Put up to `limit` matching dead events back to pending with fresh attempts.
+
+        Their next attempts are spread at random over the next `spread_seconds`,
+        so a large replay does not hit the handlers all at once.
 
+        Returns:
+            list[str]: event types of the requeued events
+        """
+        requeue = (
+            select(Outbox.id)
+            .where(
+                *self._dead_filter(
+                    event_type, created_from, created_to, event_ids, payload_contains
+                )
+            )
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        result = await self.session.execute(
+            update(Outbox)
+            .where(Outbox.id.in_(requeue.scalar_subquery()))
+            .where(status_in(Outbox.status, OutboxStatus.DEAD))
+            .values(
+                status=OutboxStatus.PENDING.value,
+                attempts=0,
+                next_attempt_at=func.now()
+                + func.make_interval(0, 0, 0, 0, 0, 0, func.random() * spread_seconds),
+                claimed_by=None,
+                lease_until=None,
+            )
+            .returning(Outbox.event_type)
+            .execution_options(synchronize_session=False)
+        )
+        return list(result.scalars().all())
 
+    async def count_dead_events(
+        self,
+        event_type: str | None = None,
+        created_from: datetime | None = None,
+        created_to: datetime | None = None,
+        event_ids: Sequence[uuid.UUID] | None = None,
+        payload_contains: dict[str, Any] | None = None,
+    ) -> int:
+        """Count dead events matching the filters of `requeue_dead_events`."""
+        result = await self.session.execute(
+            select(func.count())
+            .select_from(Outbox)
+            .where(
+                *self._dead_filter(
+                    event_type, created_from, created_to, event_ids, payload_contains
+                )
+            )
+        )
+        return result.scalar_one()
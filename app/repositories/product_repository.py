@@ -1,11 +1,12 @@
 """Product repository."""
 import uuid
+from decimal import Decimal
 from typing import Sequence
 
-from sqlalchemy import or_, select
+from sqlalchemy import case, func, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.product import Product
+from app.models.product import Product, ProductStockShard
 
 
 class ProductRepository:
@@ -18,7 +19,6 @@ class ProductRepository:
         """Create a new product."""
         self.session.add(product)
         await self.session.flush()
-        await self.session.refresh(product)
         return product
 
     async def get_by_id(self, product_id: uuid.UUID) -> Product | None:
@@ -27,18 +27,103 @@ class ProductRepository:
         return result.scalar_one_or_none()
 
     async def get_by_id_for_update(self, product_id: uuid.UUID) -> Product | None:
-        """Get product by ID with row lock for update."""
+        """Get product by ID with row lock for update, refreshing an already loaded instance."""
         result = await self.session.execute(
-            select(Product).where(Product.id == product_id).with_for_update()
+            select(Product)
+            .where(Product.id == product_id)
+            .with_for_update()
+            .execution_options(populate_existing=True)
         )
         return result.scalar_one_or_none()
 
-    async def get_by_ids_for_update(self, product_ids: list[uuid.UUID]) -> Sequence[Product]:
-        """Get multiple products by IDs with row locks for update."""
+    async def get_by_ids(self, product_ids: list[uuid.UUID]) -> Sequence[Product]:
+        """Get multiple products by IDs without locking."""
+        result = await self.session.execute(select(Product).where(Product.id.in_(product_ids)))
+        return result.scalars().all()
+
+    async def get_by_ids_for_update(
+        self, product_ids: list[uuid.UUID], skip_sharded: bool = False
+    ) -> Sequence[Product]:
+        """
+        Get multiple products by IDs with row locks for update.
+
+        Rows are locked in ascending id order so that concurrent transactions touching
+        overlapping product sets always acquire locks in the same order. With
+        `skip_sharded` products whose stock lives in shards are neither locked nor returned.
+        """
+        query = select(Product).where(Product.id.in_(product_ids))
+        if skip_sharded:
+            query = query.where(Product.stock_shards == 0)
+        result = await self.session.execute(query.order_by(Product.id).with_for_update())
+        return result.scalars().all()
+
+    async def reserve_stock(
+        self, product_id: uuid.UUID, quantity: int
+    ) -> tuple[Decimal, str] | None:
+        """
+        Atomically decrement stock with a single guarded UPDATE.
+
+        Returns (price, name) of the product, or None if the product does not exist,
+        is inactive, has insufficient stock or keeps its stock in shards.
+        """
         result = await self.session.execute(
-            select(Product).where(Product.id.in_(product_ids)).with_for_update()
+            update(Product)
+            .where(Product.id == product_id)
+            .where(Product.stock >= quantity)
+            .where(Product.is_active.is_(True))
+            .where(Product.stock_shards == 0)
+            .values(stock=Product.stock - quantity)
+            .returning(Product.price, Product.name)
+            .execution_options(synchronize_session=False)
         )
-        return result.scalars().all()
+        row = result.one_or_none()
+        if row is None:
+            return None
+        return row.price, row.name
+
+    async def release_stock(self, product_id: uuid.UUID, quantity: int) -> int | None:
+        """
+        Atomically increment stock.
+
+        Returns new stock, or None if the product is missing or keeps its stock in shards.
+        """
+        result = await self.session.execute(
+            update(Product)
+            .where(Product.id == product_id)
+            .where(Product.stock_shards == 0)
+            .values(stock=Product.stock + quantity)
+            .returning(Product.stock)
+            .execution_options(synchronize_session=False)
+        )
+        return result.scalar_one_or_none()
+
+    async def get_available_stock(
+        self, after_id: uuid.UUID | None = None, limit: int = 500
+    ) -> list[tuple[uuid.UUID, bool, int]]:
+        """
+        Page through (id, is_active, available stock) ordered by id.
+
+        Available stock of sharded products is the sum of their shards.
+        """
+        shard_total = (
+            select(func.coalesce(func.sum(ProductStockShard.stock), 0))
+            .where(ProductStockShard.product_id == Product.id)
+            .scalar_subquery()
+        )
+        query = (
+            select(
+                Product.id,
+                Product.is_active,
+                case((Product.stock_shards > 0, shard_total), else_=Product.stock),
+            )
+            .order_by(Product.id)
+            .limit(limit)
+        )
+        if after_id is not None:
+            query = query.where(Product.id > after_id)
+
+        result = await self.session.execute(query)
+        return [(row[0], row[1], int(row[2])) for row in result.all()]
 
     async def get_by_name(self, name: str) -> Product | None:
         """Get product by name."""
@@ -48,7 +133,6 @@ class ProductRepository:
     async def update(self, product: Product) -> Product:
         """Update product."""
         await self.session.flush()
-        await self.session.refresh(product)
         return product
 
     async def list_products(
@@ -0,0 +1,109 @@
+"""Product stock shard repository."""
+import uuid
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.product import ProductStockShard
+
+
+class StockShardRepository:
+    """Repository for sharded product stock operations."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def reserve_from_shard(self, product_id: uuid.UUID, quantity: int) -> int | None:
+        """
+        Decrement a random shard that can cover the whole quantity.
+
+        Shards currently locked by other transactions are skipped, so concurrent
+        reservations spread over the buckets instead of queueing on one row.
+        Returns the shard number, or None if no unlocked shard has enough stock.
+        """
+        shard_no = (
+            select(ProductStockShard.shard_no)
+            .where(ProductStockShard.product_id == product_id)
+            .where(ProductStockShard.stock >= quantity)
+            .order_by(func.random())
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        result = await self.session.execute(
+            update(ProductStockShard)
+            .where(ProductStockShard.product_id == product_id)
+            .where(ProductStockShard.shard_no == shard_no)
+            .values(stock=ProductStockShard.stock - quantity)
+            .returning(ProductStockShard.shard_no)
+            .execution_options(synchronize_session=False)
+        )
+        return result.scalar_one_or_none()
+
+    async def get_shards_for_update(self, product_id: uuid.UUID) -> list[ProductStockShard]:
+        """Lock all shards of a product in shard order."""
+        result = await self.session.execute(
+            select(ProductStockShard)
+            .where(ProductStockShard.product_id == product_id)
+            .order_by(ProductStockShard.shard_no)
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        )
+        return list(result.scalars().all())
+
+    async def release(self, product_id: uuid.UUID, quantity: int) -> bool:
+        """
+        Return stock to a random one of the product's existing shards.
+
+        Returns False if no shard took it: the product has no shards, or the
+        chosen one was deleted by a concurrent re-shard.
+        """
+        shard_no = (
+            select(ProductStockShard.shard_no)
+            .where(ProductStockShard.product_id == product_id)
+            .order_by(func.random())
+            .limit(1)
+            .scalar_subquery()
+        )
+        result = await self.session.execute(
+            update(ProductStockShard)
+            .where(ProductStockShard.product_id == product_id)
+            .where(ProductStockShard.shard_no == shard_no)
+            .values(stock=ProductStockShard.stock + quantity)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount == 1
+
+    async def get_totals(self, product_ids: list[uuid.UUID]) -> dict[uuid.UUID, int]:
+        """Get aggregated stock for sharded products."""
+        if not product_ids:
+            return {}
+        result = await self.session.execute(
+            select(ProductStockShard.product_id, func.sum(ProductStockShard.stock))
+            .where(ProductStockShard.product_id.in_(product_ids))
+            .group_by(ProductStockShard.product_id)
+        )
+        return {product_id: int(total) for product_id, total in result.all()}
+
+    async def replace_shards(self, product_id: uuid.UUID, shard_count: int, total: int) -> None:
+        """Replace a product's shards with `shard_count` buckets evenly holding `total`."""
+        await self.session.execute(
+            delete(ProductStockShard)
+            .where(ProductStockShard.product_id == product_id)
+            .execution_options(synchronize_session=False)
+        )
+        if shard_count == 0:
+            return
+
+        base, remainder = divmod(total, shard_count)
+        await self.session.execute(
+            insert(ProductStockShard),
+            [
+                {
+                    "product_id": product_id,
+                    "shard_no": shard_no,
+                    "stock": base + (1 if shard_no < remainder else 0),
+                }
+                for shard_no in range(shard_count)
+            ],
+        )
@@ -1,13 +1,21 @@
 """Admin API routes."""
 import uuid
+from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.logging_config import get_logger
 from app.core.security import verify_admin_secret
 from app.db import get_db
+from app.schemas.outbox import (
+    DeadEventPage,
+    DeadEventReplay,
+    DeadEventReplayResponse,
+    DeadEventResponse,
+)
 from app.schemas.product import ProductCreate, ProductResponse, ProductUpdate
+from app.services.dead_letter_service import DeadLetterService, decode_payload_filter
 from app.services.product_service import ProductService
 
 logger = get_logger(__name__)
@@ -28,6 +36,7 @@ async def create_product(
             price=product_data.price,
             stock=product_data.stock,
             is_active=product_data.is_active,
+            stock_shards=product_data.stock_shards,
         )
         return ProductResponse.model_validate(product)
     except ValueError as e:
@@ -48,10 +57,61 @@ async def update_product(
             price=product_data.price,
             stock=product_data.stock,
             is_active=product_data.is_active,
+            stock_shards=product_data.stock_shards,
         )
         return ProductResponse.model_validate(product)
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
 
 
+@router.get("/outbox/dead", response_model=DeadEventPage)
+async def list_dead_events(
+    event_type: str | None = Query(None, description="Filter by event type"),
+    created_from: datetime | None = Query(None, description="Events created at or after"),
+    created_to: datetime | None = Query(None, description="Events created before"),
+    payload: str | None = Query(None, description="Events whose payload contains this JSON object"),
+    cursor: str | None = Query(None, description="Cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=500, description="Number of events per page"),
+    db: AsyncSession = Depends(get_db),
+) -> DeadEventPage:
+    """Page through dead outbox events, newest first (admin only)."""
+    try:
+        service = DeadLetterService(db)
+        events, next_cursor = await service.list_dead_events(
+            limit=limit,
+            event_type=event_type,
+            created_from=created_from,
+            created_to=created_to,
+            cursor=cursor,
+            payload_contains=decode_payload_filter(payload) if payload else None,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return DeadEventPage(
+        items=[DeadEventResponse.model_validate(event) for event in events],
+        next_cursor=next_cursor,
+    )
 
+
+@router.post("/outbox/dead/replay", response_model=DeadEventReplayResponse)
+async def replay_dead_events(
+    replay: DeadEventReplay,
+    db: AsyncSession = Depends(get_db),
+) -> DeadEventReplayResponse:
+    """Requeue dead outbox events by id list, filter, or all of them (admin only)."""
+    try:
+        service = DeadLetterService(db)
+        requeued = await service.replay(
+            event_ids=replay.event_ids,
+            event_type=replay.event_type,
+            created_from=replay.created_from,
+            created_to=replay.created_to,
+            spread_seconds=replay.spread_seconds,
+            payload_contains=replay.payload_contains,
+            replay_all=replay.all,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    logger.info(f"Dead event replay requested: {replay.model_dump_json()}, requeued {requeued}")
+    return DeadEventReplayResponse(requeued=requeued)
@@ -1,13 +1,21 @@
 """Order API routes."""
 import uuid
 
-from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
 from app.core.logging_config import get_logger
 from app.core.rate_limiter import check_rate_limit
 from app.db import get_db
-from app.schemas.order import OrderCreate, OrderResponse
+from app.schemas.order import (
+    OrderBatchCreate,
+    OrderBatchResponse,
+    OrderBatchResult,
+    OrderCreate,
+    OrderResponse,
+)
+from app.services.order_group_commit import order_group_committer
 from app.services.order_service import OrderService
 
 logger = get_logger(__name__)
@@ -21,33 +29,93 @@ async def create_order(
     request: Request,
     idempotency_key: str = Header(..., alias="Idempotency-Key"),
     db: AsyncSession = Depends(get_db),
-) -> OrderResponse:
+) -> OrderResponse | Response:
     """
     Create a new order with idempotency.
 
-    Requires Idempotency-Key header to prevent duplicate orders.
+    Requires Idempotency-Key header to prevent duplicate orders. Duplicates get
+    the stored response of the original request.
     """
     await check_rate_limit(request, order_data.user_email, limit=5, window=60)
 
     try:
-        service = OrderService(db)
-        order, is_duplicate = await service.create_order(order_data, idempotency_key)
+        if settings.order_group_commit_enabled:
+            stored, is_duplicate = await order_group_committer.submit(order_data, idempotency_key)
+        else:
+            service = OrderService(db)
+            stored, is_duplicate = await service.place_order(order_data, idempotency_key)
 
         if is_duplicate:
             logger.info(f"Returning existing order for idempotency key: {idempotency_key}")
 
-        return OrderResponse.model_validate(order)
+        return Response(
+            content=stored.body, status_code=stored.status_code, media_type="application/json"
+        )
 
     except ValueError as e:
         error_msg = str(e)
-        if "Idempotency key conflict" in error_msg:
-            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=error_msg)
-        elif "not found" in error_msg or "not active" in error_msg:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=error_msg)
-        elif "Insufficient stock" in error_msg:
-            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=error_msg)
+        raise HTTPException(status_code=_create_error_status(error_msg), detail=error_msg)
+
+
+@router.post("/batch", response_model=OrderBatchResponse)
+async def create_orders_batch(
+    batch: OrderBatchCreate,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+) -> OrderBatchResponse:
+    """
+    Create many orders in one request.
+
+    Each order carries its own idempotency key. Orders fail independently: the
+    result list reports a status code and either the order or an error for each
+    submitted order, in submission order.
+    """
+    if len(batch.orders) > settings.order_batch_max_size:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Batch too large: max {settings.order_batch_max_size} orders",
+        )
+
+    client_ip = request.client.host if request.client else "unknown"
+    await check_rate_limit(
+        request, f"batch:{client_ip}", limit=settings.rate_limit_order_batches_per_minute
+    )
+
+    service = OrderService(db)
+    outcomes = await service.create_orders_batch(batch.orders)
+
+    results = []
+    for entry, (stored, _is_duplicate, error) in zip(batch.orders, outcomes, strict=True):
+        if stored is None:
+            error_msg = error or "Order was not created"
+            results.append(
+                OrderBatchResult(
+                    idempotency_key=entry.idempotency_key,
+                    status_code=_create_error_status(error_msg),
+                    error=error_msg,
+                )
+            )
         else:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=error_msg)
+            results.append(
+                OrderBatchResult(
+                    idempotency_key=entry.idempotency_key,
+                    status_code=status.HTTP_201_CREATED,
+                    order=OrderResponse.model_validate_json(stored.body),
+                )
+            )
+
+    return OrderBatchResponse(results=results)
+
+
+def _create_error_status(error_msg: str) -> int:
+    """Map an order creation error to an HTTP status code."""
+    if "Idempotency key conflict" in error_msg or "Idempotency key in progress" in error_msg:
+        return status.HTTP_409_CONFLICT
+    elif "not found" in error_msg or "not active" in error_msg:
+        return status.HTTP_400_BAD_REQUEST
+    elif "Insufficient stock" in error_msg:
+        return status.HTTP_409_CONFLICT
+    return status.HTTP_400_BAD_REQUEST
 
 
 @router.get("/{order_id}", response_model=OrderResponse)
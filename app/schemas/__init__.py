@@ -1,12 +1,22 @@
 """Pydantic schemas."""
 from app.schemas.order import (
     CursorPaginationParams,
+    OrderBatchCreate,
+    OrderBatchEntry,
+    OrderBatchResponse,
+    OrderBatchResult,
     OrderCreate,
     OrderItemCreate,
     OrderItemResponse,
     OrderResponse,
     ProductFilter,
 )
+from app.schemas.outbox import (
+    DeadEventPage,
+    DeadEventReplay,
+    DeadEventReplayResponse,
+    DeadEventResponse,
+)
 from app.schemas.product import ProductCreate, ProductResponse, ProductUpdate
 from app.schemas.webhook import FakePaymentRequest, FakePaymentResponse, PaymentWebhook
 
@@ -18,11 +28,19 @@ __all__ = [
     "OrderItemCreate",
     "OrderItemResponse",
     "OrderResponse",
+    "OrderBatchEntry",
+    "OrderBatchCreate",
+    "OrderBatchResult",
+    "OrderBatchResponse",
     "CursorPaginationParams",
     "ProductFilter",
     "PaymentWebhook",
     "FakePaymentRequest",
     "FakePaymentResponse",
+    "DeadEventResponse",
+    "DeadEventPage",
+    "DeadEventReplay",
+    "DeadEventReplayResponse",
 ]
 
 
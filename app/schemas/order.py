@@ -45,6 +45,35 @@ class OrderResponse(BaseModel):
     updated_at: datetime
 
 
+class OrderBatchEntry(OrderCreate):
+    """Schema for one order inside a batch."""
+
+    idempotency_key: str = Field(
+        ..., min_length=1, max_length=255, description="Idempotency key for this order"
+    )
+
+
+class OrderBatchCreate(BaseModel):
+    """Schema for creating many orders at once."""
+
+    orders: list[OrderBatchEntry] = Field(..., min_length=1, description="Orders to create")
+
+
+class OrderBatchResult(BaseModel):
+    """Outcome of one order inside a batch."""
+
+    idempotency_key: str
+    status_code: int
+    order: OrderResponse | None = None
+    error: str | None = None
+
+
+class OrderBatchResponse(BaseModel):
+    """Schema for batch order response, one result per submitted order in order."""
+
+    results: list[OrderBatchResult]
+
+
 class CursorPaginationParams(BaseModel):
     """Cursor-based pagination parameters."""
 
@@ -0,0 +1,68 @@
+"""Outbox dead-letter schemas."""
+import uuid
+from datetime import datetime
+from typing import Any
+
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+
+
+class DeadEventResponse(BaseModel):
+    """Schema for a dead outbox event."""
+
+    model_config = ConfigDict(from_attributes=True)
+
+    id: uuid.UUID
+    event_type: str
+    partition_key: str
+    payload_json: dict[str, Any]
+    attempts: int
+    next_attempt_at: datetime
+    created_at: datetime
+
+
+class DeadEventPage(BaseModel):
+    """Schema for a page of dead events, newest first."""
+
+    items: list[DeadEventResponse]
+    next_cursor: str | None = Field(None, description="Cursor of the next page, if any")
+
+
+class DeadEventReplay(BaseModel):
+    """Schema for requeuing dead events by id, by filter, or all of them with `all`."""
+
+    event_ids: list[uuid.UUID] | None = Field(
+        None, min_length=1, max_length=10000, description="Requeue exactly these events"
+    )
+    event_type: str | None = Field(None, description="Requeue events of this type")
+    created_from: datetime | None = Field(None, description="Requeue events created at or after")
+    created_to: datetime | None = Field(None, description="Requeue events created before")
+    payload_contains: dict[str, Any] | None = Field(
+        None, description="Requeue events whose payload contains this JSON object"
+    )
+    spread_seconds: float | None = Field(
+        None, ge=0, description="Window the next attempts are spread over (default from settings)"
+    )
+    all: bool = Field(False, description="Requeue every dead event; excludes ids and filters")
+
+    @model_validator(mode="after")
+    def check_selection(self) -> "DeadEventReplay":
+        """Require ids, a filter, or an explicit `all`, but not `all` with either."""
+        selectors = (
+            self.event_ids,
+            self.event_type,
+            self.created_from,
+            self.created_to,
+            self.payload_contains,
+        )
+        has_selector = any(selector is not None for selector in selectors)
+        if not has_selector and not self.all:
+            raise ValueError("Pass event_ids, at least one filter, or all=true")
+        if has_selector and self.all:
+            raise ValueError("all=true cannot be combined with event_ids or filters")
+        return self
+
+
+class DeadEventReplayResponse(BaseModel):
+    """Schema for the result of a dead event replay."""
+
+    requeued: int = Field(..., description="Events put back to pending")
@@ -13,6 +13,9 @@ class ProductCreate(BaseModel):
     price: Decimal = Field(..., ge=0, decimal_places=2, description="Product price")
     stock: int = Field(default=0, ge=0, description="Stock quantity")
     is_active: bool = Field(default=True, description="Whether product is active")
+    stock_shards: int = Field(
+        default=0, ge=0, le=256, description="Number of stock shards (0 = not sharded)"
+    )
 
 
 class ProductUpdate(BaseModel):
@@ -21,6 +24,9 @@ class ProductUpdate(BaseModel):
     price: Decimal | None = Field(None, ge=0, decimal_places=2, description="Product price")
     stock: int | None = Field(None, ge=0, description="Stock quantity")
     is_active: bool | None = Field(None, description="Whether product is active")
+    stock_shards: int | None = Field(
+        None, ge=0, le=256, description="Number of stock shards (0 = not sharded)"
+    )
 
 
 class ProductResponse(BaseModel):
@@ -33,6 +39,7 @@ class ProductResponse(BaseModel):
     price: Decimal
     stock: int
     is_active: bool
+    stock_shards: int
     created_at: datetime
     updated_at: datetime
 
@@ -1,9 +1,17 @@
 """Service layer."""
+from app.services.inventory_service import InventoryService
+from app.services.order_group_commit import OrderGroupCommitter
 from app.services.order_service import OrderService
 from app.services.payment_service import PaymentService
 from app.services.product_service import ProductService
 
-__all__ = ["ProductService", "OrderService", "PaymentService"]
+__all__ = [
+    "ProductService",
+    "OrderService",
+    "PaymentService",
+    "InventoryService",
+    "OrderGroupCommitter",
+]
 
 
 
@@ -0,0 +1,146 @@
+"""Dead-letter service for inspecting and replaying dead outbox events."""
+import base64
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Any, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import json_codec
+from app.core.config import settings
+from app.core.logging_config import get_logger
+from app.core.metrics import outbox_dead_events_requeued_total, outbox_dead_replay_remaining
+from app.models.outbox import Outbox
+from app.repositories.outbox_repository import OutboxRepository
+
+logger = get_logger(__name__)
+
+
+def encode_cursor(event: Outbox) -> str:
+    """Cursor pointing after `event` in the newest-first order of dead events."""
+    raw = f"{event.created_at.isoformat()}|{event.id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    """Decode a cursor made by `encode_cursor`, raising ValueError if it is malformed."""
+    try:
+        created_at, event_id = base64.urlsafe_b64decode(cursor).decode("utf-8").split("|")
+        return datetime.fromisoformat(created_at), uuid.UUID(event_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def decode_payload_filter(raw: str) -> dict[str, Any]:
+    """Parse a JSON object to match payloads against, raising ValueError if it is not one."""
+    try:
+        payload = json_codec.loads(raw)
+    except Exception as e:
+        raise ValueError(f"Invalid payload filter: {raw}") from e
+    if not isinstance(payload, dict):
+        raise ValueError(f"Payload filter must be a JSON object: {raw}")
+    return payload
+
+
+class DeadLetterService:
+    """Service for dead outbox events."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.outbox_repo = OutboxRepository(session)
+
+    async def list_dead_events(
+        self,
+        limit: int,
+        event_type: str | None = None,
+        created_from: datetime | None = None,
+        created_to: datetime | None = None,
+        cursor: str | None = None,
+        payload_contains: dict[str, Any] | None = None,
+    ) -> tuple[Sequence[Outbox], str | None]:
+        """
+        Get a page of dead events, newest first.
+
+        Returns:
+            tuple: the events and the cursor of the next page (None on the last page)
+        """
+        before = decode_cursor(cursor) if cursor else None
+        events = await self.outbox_repo.get_dead_events(
+            limit=limit + 1,
+            event_type=event_type,
+            created_from=created_from,
+            created_to=created_to,
+            before=before,
+            payload_contains=payload_contains,
+        )
+        if len(events) <= limit:
+            return events, None
+        return events[:limit], encode_cursor(events[limit - 1])
+
+    async def replay(
+        self,
+        event_ids: Sequence[uuid.UUID] | None = None,
+        event_type: str | None = None,
+        created_from: datetime | None = None,
+        created_to: datetime | None = None,
+        spread_seconds: float | None = None,
+        payload_contains: dict[str, Any] | None = None,
+        replay_all: bool = False,
+    ) -> int:
+        """
+        Requeue the matching dead events in batches, one transaction per batch.
+
+        Without ids or filters nothing matches unless `replay_all` is set, so a
+        missing filter cannot requeue the whole dead letter queue by accident.
+
+        Returns:
+            int: number of events requeued
+
+        Raises:
+            ValueError: if no ids or filters are given and `replay_all` is not set
+        """
+        selectors = (event_ids, event_type, created_from, created_to, payload_contains)
+        has_selector = any(selector is not None for selector in selectors)
+        if not has_selector and not replay_all:
+            raise ValueError("Pass event_ids, at least one filter, or all=true")
+        if has_selector and replay_all:
+            raise ValueError("all=true cannot be combined with event_ids or filters")
+        if spread_seconds is None:
+            spread_seconds = settings.outbox_replay_spread_seconds
+        batch_size = settings.outbox_replay_batch_size
+
+        total = await self.outbox_repo.count_dead_events(
+            event_type=event_type,
+            created_from=created_from,
+            created_to=created_to,
+            event_ids=event_ids,
+            payload_contains=payload_contains,
+        )
+        outbox_dead_replay_remaining.set(total)
+        requeued = 0
+        try:
+            while True:
+                event_types = await self.outbox_repo.requeue_dead_events(
+                    limit=batch_size,
+                    spread_seconds=spread_seconds,
+                    event_type=event_type,
+                    created_from=created_from,
+                    created_to=created_to,
+                    event_ids=event_ids,
+                    payload_contains=payload_contains,
+                )
+                await self.session.commit()
+
+                for requeued_type, count in Counter(event_types).items():
+                    outbox_dead_events_requeued_total.labels(event_type=requeued_type).inc(count)
+                requeued += len(event_types)
+                outbox_dead_replay_remaining.set(max(total - requeued, 0))
+                # Fewer than a batch means nothing is left, or the rest is locked
+                if len(event_types) < batch_size:
+                    break
+        finally:
+            outbox_dead_replay_remaining.set(0)
+
+        logger.info(f"Requeued {requeued} of {total} dead outbox events over {spread_seconds}s")
+        return requeued
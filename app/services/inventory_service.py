@@ -0,0 +1,353 @@
+"""Inventory service with pluggable stock reservation engines."""
+import uuid
+from collections import defaultdict
+from decimal import Decimal
+from typing import NoReturn
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.logging_config import get_logger
+from app.models.order import OrderItem
+from app.models.product import Product, ProductStockShard
+from app.repositories.product_repository import ProductRepository
+from app.repositories.stock_shard_repository import StockShardRepository
+from app.schemas.order import OrderItemCreate
+
+logger = get_logger(__name__)
+
+
+class StockAllocation:
+    """
+    Stock of a set of locked products, allocated to orders in memory.
+
+    Used when many orders are placed in one transaction: each order either gets
+    all of its items or none, and the consumed quantities are written back to
+    products and shards once with `apply`.
+    """
+
+    def __init__(
+        self,
+        products: dict[uuid.UUID, Product],
+        shards: dict[uuid.UUID, list[ProductStockShard]],
+    ):
+        self.products = products
+        self.shards = shards
+        self.available = {
+            product_id: (
+                sum(shard.stock for shard in shards[product_id])
+                if product_id in shards
+                else product.stock
+            )
+            for product_id, product in products.items()
+        }
+        self.consumed: dict[uuid.UUID, int] = defaultdict(int)
+
+    def allocate(self, items: list[OrderItemCreate]) -> tuple[list[OrderItem], Decimal]:
+        """
+        Allocate stock for one order's items.
+
+        Raises:
+            ValueError: if a product is missing, inactive or has insufficient stock;
+            nothing is allocated in that case
+        """
+        requested: dict[uuid.UUID, int] = defaultdict(int)
+        for item_data in items:
+            requested[item_data.product_id] += item_data.quantity
+
+        missing = set(requested) - set(self.products)
+        if missing:
+            raise ValueError(f"Products not found: {missing}")
+
+        for product_id, quantity in requested.items():
+            product = self.products[product_id]
+            if not product.is_active:
+                raise ValueError(f"Product {product.name} is not active")
+            if self.available[product_id] < quantity:
+                raise ValueError(
+                    f"Insufficient stock for {product.name}: "
+                    f"requested {quantity}, available {self.available[product_id]}"
+                )
+
+        for product_id, quantity in requested.items():
+            self.available[product_id] -= quantity
+            self.consumed[product_id] += quantity
+
+        items_total = Decimal("0")
+        order_items = []
+        for item_data in items:
+            price = self.products[item_data.product_id].price
+            items_total += price * item_data.quantity
+            order_items.append(
+                OrderItem(
+                    product_id=item_data.product_id,
+                    quantity=item_data.quantity,
+                    price_snapshot=price,
+                )
+            )
+
+        return order_items, items_total
+
+    def apply(self) -> None:
+        """Write consumed quantities back to the locked products and shards."""
+        for product_id, quantity in self.consumed.items():
+            if product_id in self.shards:
+                drain_shards(self.shards[product_id], quantity)
+            else:
+                self.products[product_id].stock -= quantity
+
+
+def drain_shards(shards: list[ProductStockShard], quantity: int) -> None:
+    """Take `quantity` from locked shards, largest first."""
+    remaining = quantity
+    for shard in sorted(shards, key=lambda s: s.stock, reverse=True):
+        taken = min(shard.stock, remaining)
+        shard.stock -= taken
+        remaining -= taken
+        if remaining == 0:
+            break
+
+
+class InventoryService:
+    """
+    Service for reserving and releasing product stock.
+
+    Two engines are available, selected by `settings.stock_reservation_mode`:
+
+    * ``row_lock`` - lock product rows with SELECT ... FOR UPDATE, validate and
+      decrement stock in Python; locks are held until the transaction commits.
+    * ``conditional_update`` - decrement each product with a single guarded
+      ``UPDATE ... WHERE stock >= :q AND is_active RETURNING price, name``;
+      zero affected rows means the product is missing, inactive or sold out.
+
+    Products with `stock_shards > 0` keep their stock in `product_stock_shards`
+    under either engine: their product row is only read, never locked, and the
+    quantity is taken from a random unlocked shard.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.product_repo = ProductRepository(session)
+        self.shard_repo = StockShardRepository(session)
+
+    async def reserve(self, items: list[OrderItemCreate]) -> tuple[list[OrderItem], Decimal]:
+        """
+        Reserve stock for order items.
+
+        Products are processed in ascending id order regardless of engine, so
+        concurrent reservations acquire row locks in a canonical order.
+
+        Returns:
+            tuple: (order items with price snapshots, items total)
+
+        Raises:
+            ValueError: if a product is missing, inactive or has insufficient stock
+        """
+        if settings.stock_reservation_mode == "conditional_update":
+            prices = await self._reserve_conditional(items)
+        else:
+            prices = await self._reserve_row_lock(items)
+
+        items_total = Decimal("0")
+        order_items = []
+
+        for index, item_data in enumerate(items):
+            price = prices[index]
+            items_total += price * item_data.quantity
+            order_items.append(
+                OrderItem(
+                    product_id=item_data.product_id,
+                    quantity=item_data.quantity,
+                    price_snapshot=price,
+                )
+            )
+
+        return order_items, items_total
+
+    async def release(self, items: list[OrderItem], reason: str = "Restored") -> None:
+        """Return reserved stock for order items."""
+        sharded_items = []
+
+        if settings.stock_reservation_mode == "conditional_update":
+            for item in sorted(items, key=lambda i: i.product_id):
+                new_stock = await self.product_repo.release_stock(item.product_id, item.quantity)
+                if new_stock is None:
+                    sharded_items.append(item)
+                    continue
+                logger.info(
+                    f"{reason} stock for product {item.product_id}: +{item.quantity} "
+                    f"(new stock: {new_stock})"
+                )
+        else:
+            product_ids = [item.product_id for item in items]
+            products = await self.product_repo.get_by_ids_for_update(
+                product_ids, skip_sharded=True
+            )
+            product_map = {p.id: p for p in products}
+
+            for item in items:
+                product = product_map.get(item.product_id)
+                if not product:
+                    sharded_items.append(item)
+                    continue
+                product.stock += item.quantity
+                logger.info(
+                    f"{reason} stock for product {product.id}: +{item.quantity} "
+                    f"(new stock: {product.stock})"
+                )
+
+        if sharded_items:
+            await self._release_sharded(sharded_items, reason)
+
+    async def _reserve_row_lock(self, items: list[OrderItemCreate]) -> dict[int, Decimal]:
+        """Reserve stock under SELECT ... FOR UPDATE row locks."""
+        product_ids = list({item.product_id for item in items})
+        products = await self.product_repo.get_by_ids_for_update(product_ids, skip_sharded=True)
+        product_map = {p.id: p for p in products}
+
+        unlocked_ids = [product_id for product_id in product_ids if product_id not in product_map]
+        if unlocked_ids:
+            for product in await self.product_repo.get_by_ids(unlocked_ids):
+                product_map[product.id] = product
+
+        if len(product_map) != len(product_ids):
+            missing = set(product_ids) - set(product_map)
+            raise ValueError(f"Products not found: {missing}")
+
+        prices: dict[int, Decimal] = {}
+
+        for index, item_data in self._in_lock_order(items):
+            product = product_map[item_data.product_id]
+
+            if not product.is_active:
+                raise ValueError(f"Product {product.name} is not active")
+
+            if product.stock_shards > 0:
+                await self._reserve_sharded(product, item_data.quantity)
+            else:
+                if product.stock < item_data.quantity:
+                    raise ValueError(
+                        f"Insufficient stock for {product.name}: "
+                        f"requested {item_data.quantity}, available {product.stock}"
+                    )
+                product.stock -= item_data.quantity
+
+            prices[index] = product.price
+
+        return prices
+
+    async def _reserve_conditional(self, items: list[OrderItemCreate]) -> dict[int, Decimal]:
+        """Reserve stock with one guarded UPDATE per item, without explicit row locks."""
+        prices: dict[int, Decimal] = {}
+
+        for index, item_data in self._in_lock_order(items):
+            reserved = await self.product_repo.reserve_stock(
+                item_data.product_id, item_data.quantity
+            )
+            if reserved is not None:
+                prices[index], _name = reserved
+                continue
+
+            product = await self.product_repo.get_by_id(item_data.product_id)
+            if product is not None and product.is_active and product.stock_shards > 0:
+                await self._reserve_sharded(product, item_data.quantity)
+                prices[index] = product.price
+                continue
+
+            self._raise_reservation_error(product, item_data.product_id, item_data.quantity)
+
+        return prices
+
+    async def _reserve_sharded(self, product: Product, quantity: int) -> None:
+        """Take `quantity` from the shards of a sharded product."""
+        if await self.shard_repo.reserve_from_shard(product.id, quantity) is not None:
+            return
+
+        # No unlocked shard covers the quantity on its own: lock all shards
+        # and drain them largest first.
+        shards = await self.shard_repo.get_shards_for_update(product.id)
+        available = sum(shard.stock for shard in shards)
+        if available < quantity:
+            raise ValueError(
+                f"Insufficient stock for {product.name}: "
+                f"requested {quantity}, available {available}"
+            )
+
+        drain_shards(shards, quantity)
+
+    async def lock_for_allocation(self, product_ids: list[uuid.UUID]) -> StockAllocation:
+        """
+        Lock stock in id order for in-memory allocation across many orders.
+
+        Rows of unsharded products are locked; sharded products are only read,
+        like in `reserve`, and their shards are locked instead. A product found
+        un-sharded meanwhile (no shards left) has its row locked after all.
+        """
+        product_ids = sorted(set(product_ids))
+        products = await self.product_repo.get_by_ids_for_update(product_ids, skip_sharded=True)
+        product_map = {p.id: p for p in products}
+
+        unlocked_ids = [product_id for product_id in product_ids if product_id not in product_map]
+        unlocked = await self.product_repo.get_by_ids(unlocked_ids) if unlocked_ids else []
+        shards = {}
+        for product in sorted(unlocked, key=lambda p: p.id):
+            product_map[product.id] = product
+            if product.stock_shards > 0:
+                product_shards = await self.shard_repo.get_shards_for_update(product.id)
+                if product_shards:
+                    shards[product.id] = product_shards
+                    continue
+            locked = await self.product_repo.get_by_id_for_update(product.id)
+            if locked is not None:
+                product_map[product.id] = locked
+
+        return StockAllocation(product_map, shards)
+
+    async def _release_sharded(self, items: list[OrderItem], reason: str) -> None:
+        """
+        Return stock of sharded products to random shards.
+
+        A product re-sharded or un-sharded concurrently may have no shard left to
+        take the stock. It is then returned under the product row lock, which
+        waits for the re-shard to commit, to a new shard or to `products.stock`.
+        """
+        for item in sorted(items, key=lambda i: i.product_id):
+            if await self.shard_repo.release(item.product_id, item.quantity):
+                logger.info(
+                    f"{reason} stock for product {item.product_id}: +{item.quantity} (sharded)"
+                )
+                continue
+
+            product = await self.product_repo.get_by_id_for_update(item.product_id)
+            if product is None:
+                logger.error(f"Cannot return stock to missing product {item.product_id}")
+                continue
+            if product.stock_shards == 0:
+                product.stock += item.quantity
+                logger.info(
+                    f"{reason} stock for product {product.id}: +{item.quantity} "
+                    f"(new stock: {product.stock})"
+                )
+            elif await self.shard_repo.release(product.id, item.quantity):
+                logger.info(f"{reason} stock for product {product.id}: +{item.quantity} (sharded)")
+            else:
+                raise RuntimeError(f"Product {product.id} is sharded but has no stock shards")
+
+    @staticmethod
+    def _in_lock_order(items: list[OrderItemCreate]) -> list[tuple[int, OrderItemCreate]]:
+        """Pair items with their request index, ordered by product id."""
+        return sorted(enumerate(items), key=lambda pair: pair[1].product_id)
+
+    @staticmethod
+    def _raise_reservation_error(
+        product: Product | None, product_id: uuid.UUID, quantity: int
+    ) -> NoReturn:
+        """Explain why a guarded UPDATE matched no rows."""
+        if product is None:
+            raise ValueError(f"Products not found: {{{product_id!r}}}")
+        if not product.is_active:
+            raise ValueError(f"Product {product.name} is not active")
+        raise ValueError(
+            f"Insufficient stock for {product.name}: "
+            f"requested {quantity}, available {product.stock}"
+        )
@@ -0,0 +1,151 @@
+"""Group commit of concurrent orders for the same product."""
+import asyncio
+import uuid
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.idempotency_cache import StoredResponse
+from app.core.logging_config import get_logger
+from app.core.metrics import order_group_commit_size
+from app.db import AsyncSessionLocal
+from app.schemas.order import OrderBatchEntry, OrderCreate
+from app.services.order_service import KEY_IN_PROGRESS, OrderService
+
+logger = get_logger(__name__)
+
+
+class _Group:
+    """Orders waiting to be committed together."""
+
+    def __init__(self) -> None:
+        self.entries: list[OrderBatchEntry] = []
+        self.futures: list[asyncio.Future[tuple[StoredResponse, bool]]] = []
+        self.timer: asyncio.TimerHandle | None = None
+
+
+class OrderGroupCommitter:
+    """
+    Merge concurrent `create_order` calls into shared transactions.
+
+    Requests are grouped by the lowest product id they touch. The first request
+    of a group opens a window of `order_group_commit_window_ms`; requests arriving
+    within it join the group, and the group is committed when the window closes
+    or it reaches `order_group_commit_max_size`. A group is written with
+    `OrderService.create_orders_batch`, so products are locked once, stock is
+    allocated in arrival order and every caller gets its own result or error.
+
+    Idempotency works as with `OrderService.place_order`: cached responses are
+    replayed without joining a group, every created order stores and caches its
+    serialized response, and a duplicate of a request still in flight waits for
+    it through `place_order` instead of failing.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession] = AsyncSessionLocal):
+        self.session_factory = session_factory
+        self._groups: dict[uuid.UUID, _Group] = {}
+        self._flushes: set[asyncio.Task[None]] = set()
+
+    async def submit(
+        self, order_data: OrderCreate, idempotency_key: str
+    ) -> tuple[StoredResponse, bool]:
+        """
+        Create an order as part of a group commit.
+
+        Returns:
+            tuple: (StoredResponse, is_duplicate) - same contract as `OrderService.place_order`
+        """
+        cached = await OrderService.get_cached_response(order_data, idempotency_key)
+        if cached is not None:
+            return cached, True
+
+        loop = asyncio.get_running_loop()
+        group_key = min(item.product_id for item in order_data.items)
+        group = self._groups.get(group_key)
+        if group is None:
+            group = _Group()
+            self._groups[group_key] = group
+            group.timer = loop.call_later(
+                settings.order_group_commit_window_ms / 1000, self._flush, group_key
+            )
+
+        future: asyncio.Future[tuple[StoredResponse, bool]] = loop.create_future()
+        group.entries.append(
+            OrderBatchEntry(
+                idempotency_key=idempotency_key,
+                user_email=order_data.user_email,
+                items=order_data.items,
+            )
+        )
+        group.futures.append(future)
+
+        if len(group.entries) >= settings.order_group_commit_max_size:
+            self._flush(group_key)
+
+        return await future
+
+    async def close(self) -> None:
+        """Commit all open groups and wait for in-flight commits."""
+        for group_key in list(self._groups):
+            self._flush(group_key)
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+    def _flush(self, group_key: uuid.UUID) -> None:
+        """Close a group and commit it in the background."""
+        group = self._groups.pop(group_key, None)
+        if group is None:
+            return
+        if group.timer is not None:
+            group.timer.cancel()
+
+        task = asyncio.create_task(self._commit(group))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _commit(self, group: _Group) -> None:
+        """Write a group in one transaction and resolve each caller's future."""
+        order_group_commit_size.observe(len(group.entries))
+
+        try:
+            async with self.session_factory() as session:
+                outcomes = await OrderService(session).create_orders_batch(group.entries)
+        except Exception as e:
+            logger.error(f"Group commit of {len(group.entries)} orders failed: {e}")
+            for future in group.futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        waiting = []
+        for entry, future, (response, is_duplicate, error) in zip(
+            group.entries, group.futures, outcomes, strict=True
+        ):
+            if future.done():
+                continue
+            if error == KEY_IN_PROGRESS:
+                waiting.append(self._place(entry, future))
+            elif response is None:
+                future.set_exception(ValueError(error or "Order was not created"))
+            else:
+                future.set_result((response, is_duplicate))
+
+        if waiting:
+            await asyncio.gather(*waiting)
+
+    async def _place(
+        self, entry: OrderBatchEntry, future: asyncio.Future[tuple[StoredResponse, bool]]
+    ) -> None:
+        """Wait for the request holding a key, then replay it or take over its claim."""
+        try:
+            async with self.session_factory() as session:
+                result = await OrderService(session).place_order(entry, entry.idempotency_key)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(result)
+
+
+order_group_committer = OrderGroupCommitter()
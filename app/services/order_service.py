@@ -1,25 +1,36 @@
 """Order service with idempotency and stock reservation."""
+import asyncio
 import hashlib
 import json
+import time
 import uuid
 from datetime import datetime, timedelta
-from decimal import Decimal
+from http import HTTPStatus
 
-from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
+from app.core.idempotency_cache import StoredResponse, idempotency_cache
 from app.core.logging_config import get_logger
-from app.models.order import Order, OrderItem, OrderStatus
+from app.core.stock_ledger import stock_ledger
+from app.db.retry import retry_on_db_conflict
+from app.models.idempotency import IdempotencyKey, IdempotencyStatus
+from app.models.order import Order, OrderStatus
 from app.models.outbox import Outbox, OutboxStatus
 from app.repositories.idempotency_repository import IdempotencyRepository
 from app.repositories.order_repository import OrderRepository
 from app.repositories.outbox_repository import OutboxRepository
 from app.repositories.product_repository import ProductRepository
-from app.schemas.order import OrderCreate
+from app.schemas.order import OrderBatchEntry, OrderCreate, OrderResponse
+from app.services.inventory_service import InventoryService
 
 logger = get_logger(__name__)
 
+KEY_IN_PROGRESS = "Idempotency key in progress: a request with this key is still being processed"
+
+# (response, is_duplicate, error) of one order of a batch
+BatchOutcome = tuple[StoredResponse | None, bool, str | None]
+
 
 class OrderService:
     """Service for order operations."""
@@ -30,8 +41,10 @@ class OrderService:
         self.product_repo = ProductRepository(session)
         self.outbox_repo = OutboxRepository(session)
         self.idempotency_repo = IdempotencyRepository(session)
+        self.inventory_service = InventoryService(session)
 
-    def _compute_request_hash(self, order_data: OrderCreate) -> str:
+    @staticmethod
+    def _compute_request_hash(order_data: OrderCreate) -> str:
         """Compute hash of request payload for idempotency check."""
         payload = {
             "user_email": order_data.user_email,
@@ -49,114 +62,440 @@ class OrderService:
         """
         Create order with idempotency, stock reservation, and outbox event.
 
+        The idempotency key is claimed first, in its own short transaction, so a
+        duplicate request never locks products: it waits for the in-flight
+        request holding the claim and replays its order. If the request fails,
+        the claim is released and a retry starts over.
+
         Returns:
             tuple: (Order, is_duplicate) - Order object and whether it's a duplicate request
         """
         request_hash = self._compute_request_hash(order_data)
+        order_id = uuid.uuid4()
 
-        existing_key = await self.idempotency_repo.get_by_key(idempotency_key)
-        if existing_key:
-            if existing_key.request_hash != request_hash:
-                raise ValueError("Idempotency key conflict: different payload for same key")
-
+        existing_key = await self._claim(idempotency_key, request_hash, order_id)
+        if existing_key is not None:
             order = await self.order_repo.get_by_id(existing_key.order_id)
             if not order:
                 raise ValueError("Referenced order not found")
             logger.info(f"Duplicate request detected for order: {order.id}")
             return order, True
 
-        product_ids = [item.product_id for item in order_data.items]
-        products = await self.product_repo.get_by_ids_for_update(product_ids)
+        order, _response = await self._create_claimed_order(
+            order_data, idempotency_key, request_hash, order_id
+        )
+        return order, False
+
+    async def place_order(
+        self, order_data: OrderCreate, idempotency_key: str
+    ) -> tuple[StoredResponse, bool]:
+        """
+        Create order like `create_order`, returning the serialized response.
+
+        Duplicates are replayed from the idempotency cache, or from the response
+        stored with the key, without loading or re-serializing the order.
+
+        Returns:
+            tuple: (StoredResponse, is_duplicate)
+        """
+        cached = await self.get_cached_response(order_data, idempotency_key)
+        if cached is not None:
+            return cached, True
+
+        request_hash = self._compute_request_hash(order_data)
+        order_id = uuid.uuid4()
+        existing_key = await self._claim(idempotency_key, request_hash, order_id)
+        if existing_key is not None:
+            response = await self._stored_response(existing_key)
+            logger.info(f"Duplicate request detected for order: {existing_key.order_id}")
+            await idempotency_cache.put(idempotency_key, response)
+            return response, True
+
+        _order, response = await self._create_claimed_order(
+            order_data, idempotency_key, request_hash, order_id
+        )
+        await idempotency_cache.put(idempotency_key, response)
+        return response, False
 
-        if len(products) != len(product_ids):
-            found_ids = {p.id for p in products}
-            missing = set(product_ids) - found_ids
-            raise ValueError(f"Products not found: {missing}")
+    @classmethod
+    async def get_cached_response(
+        cls, order_data: OrderCreate, idempotency_key: str
+    ) -> StoredResponse | None:
+        """
+        Look up the response of a completed request in the idempotency cache.
+
+        Raises:
+            ValueError: if the key was used with a different payload
+        """
+        cached = await idempotency_cache.get(idempotency_key)
+        if cached is not None and cached.request_hash != cls._compute_request_hash(order_data):
+            raise ValueError("Idempotency key conflict: different payload for same key")
+        return cached
+
+    async def _claim(
+        self, idempotency_key: str, request_hash: str, order_id: uuid.UUID
+    ) -> IdempotencyKey | None:
+        """
+        Claim an idempotency key for a new order.
 
-        product_map = {p.id: p for p in products}
+        Returns:
+            IdempotencyKey | None: the completed key of the original request for a
+            duplicate, or None if this request holds the claim
+        """
+        claimed = await self.idempotency_repo.claim(
+            idempotency_key, request_hash, order_id, settings.idempotency_claim_lease_seconds
+        )
+        await self.session.commit()
 
-        items_total = Decimal("0")
-        order_items = []
+        if claimed:
+            return None
+        return await self._await_claim(idempotency_key, request_hash, order_id)
 
-        for item_data in order_data.items:
-            product = product_map[item_data.product_id]
+    async def _await_claim(
+        self, idempotency_key: str, request_hash: str, order_id: uuid.UUID
+    ) -> IdempotencyKey | None:
+        """
+        Wait for the request holding an idempotency key to finish.
 
-            if not product.is_active:
-                raise ValueError(f"Product {product.name} is not active")
+        The session is rolled back between polls so waiting requests do not hold
+        database connections.
 
-            if product.stock < item_data.quantity:
-                raise ValueError(
-                    f"Insufficient stock for {product.name}: "
-                    f"requested {item_data.quantity}, available {product.stock}"
-                )
+        Returns:
+            IdempotencyKey | None: the key of the completed original request, or
+            None if this request now holds the claim (the original released it or
+            its lease expired)
+
+        Raises:
+            ValueError: on a payload conflict, or if the original is still in
+            progress after `idempotency_wait_timeout_seconds`
+        """
+        deadline = time.monotonic() + settings.idempotency_wait_timeout_seconds
+
+        while True:
+            existing_key = await self.idempotency_repo.get_by_key(idempotency_key)
+
+            if existing_key is None:
+                # The original failed and released its claim
+                if await self.idempotency_repo.claim(
+                    idempotency_key,
+                    request_hash,
+                    order_id,
+                    settings.idempotency_claim_lease_seconds,
+                ):
+                    await self.session.commit()
+                    return None
+                continue
+
+            if existing_key.request_hash != request_hash:
+                raise ValueError("Idempotency key conflict: different payload for same key")
 
-            product.stock -= item_data.quantity
+            if existing_key.status == IdempotencyStatus.COMPLETED.value:
+                return existing_key
 
-            item_total = product.price * item_data.quantity
-            items_total += item_total
+            if await self.idempotency_repo.take_over_stale_claim(
+                idempotency_key, request_hash, order_id, settings.idempotency_claim_lease_seconds
+            ):
+                await self.session.commit()
+                logger.warning(f"Took over abandoned idempotency claim: {idempotency_key}")
+                return None
 
-            order_item = OrderItem(
-                product_id=product.id,
-                quantity=item_data.quantity,
-                price_snapshot=product.price,
+            await self.session.rollback()
+            if time.monotonic() >= deadline:
+                raise ValueError(KEY_IN_PROGRESS)
+            await asyncio.sleep(settings.idempotency_poll_interval_ms / 1000)
+
+    async def _stored_response(self, existing_key: IdempotencyKey) -> StoredResponse:
+        """Response of a completed key; keys stored without one are re-serialized."""
+        if existing_key.response_body is not None and existing_key.response_status is not None:
+            return StoredResponse(
+                existing_key.request_hash, existing_key.response_status, existing_key.response_body
             )
-            order_items.append(order_item)
+
+        order = await self.order_repo.get_by_id(existing_key.order_id)
+        if not order:
+            raise ValueError("Referenced order not found")
+        return self._serialize_order(order, existing_key.request_hash)
+
+    async def _create_claimed_order(
+        self,
+        order_data: OrderCreate,
+        idempotency_key: str,
+        request_hash: str,
+        order_id: uuid.UUID,
+    ) -> tuple[Order, StoredResponse]:
+        """Create the order for a claimed key, releasing the claim on failure."""
+        quantities = [(item.product_id, item.quantity) for item in order_data.items]
+        try:
+            held = await stock_ledger.hold(quantities)
+            try:
+                return await self._persist_order(
+                    order_data, idempotency_key, request_hash, order_id
+                )
+            except BaseException:
+                if held:
+                    await stock_ledger.release(quantities)
+                raise
+        except BaseException:
+            await self._release_claim(idempotency_key, order_id)
+            raise
+
+    async def _release_claim(self, idempotency_key: str, order_id: uuid.UUID) -> None:
+        """Delete this request's pending claim after a failure."""
+        try:
+            await self.session.rollback()
+            await self.idempotency_repo.release_claim(idempotency_key, order_id)
+            await self.session.commit()
+        except Exception as e:
+            # The claim stays pending until its lease expires and a retry takes it over
+            logger.error(f"Failed to release idempotency claim {idempotency_key}: {e}")
+
+    @retry_on_db_conflict("create_order")
+    async def _persist_order(
+        self,
+        order_data: OrderCreate,
+        idempotency_key: str,
+        request_hash: str,
+        order_id: uuid.UUID,
+    ) -> tuple[Order, StoredResponse]:
+        """
+        Reserve stock in the database, write the order and outbox event, and
+        complete the claim with a snapshot of the response.
+        """
+        order_items, items_total = await self.inventory_service.reserve(order_data.items)
 
         order = Order(
+            id=order_id,
             user_email=order_data.user_email,
             status=OrderStatus.RESERVED.value,
             items_total=items_total,
             items=order_items,
         )
         order = await self.order_repo.create(order)
+        response = self._serialize_order(order, request_hash)
 
-        try:
-            await self.idempotency_repo.create(idempotency_key, request_hash, order.id)
-        except IntegrityError:
-            await self.session.rollback()
-            existing_key = await self.idempotency_repo.get_by_key(idempotency_key)
-            if existing_key and existing_key.request_hash == request_hash:
-                order = await self.order_repo.get_by_id(existing_key.order_id)
-                if order:
-                    logger.info(f"Race condition: returning existing order {order.id}")
-                    return order, True
-            raise
+        if not await self.idempotency_repo.complete(
+            idempotency_key, order_id, response.status_code, response.body
+        ):
+            raise ValueError(
+                "Idempotency key in progress: the claim was taken over by another request"
+            )
+
+        await self.outbox_repo.create(self._build_order_created_event(order))
+
+        await self.session.commit()
 
+        logger.info(
+            f"Created order: {order.id}, total: {order.items_total}, "
+            f"items: {len(order.items)}, user: {order.user_email}"
+        )
+
+        return order, response
+
+    @retry_on_db_conflict("create_orders_batch")
+    async def create_orders_batch(self, entries: list[OrderBatchEntry]) -> list[BatchOutcome]:
+        """
+        Create many orders in one transaction with per-order outcomes.
+
+        Idempotency keys are claimed up front with one multi-row INSERT; keys that
+        already exist are replayed as duplicates. Products touched by the batch are
+        locked once in id order and allocated to orders in submission order: an
+        order either gets all of its items or fails on its own without affecting
+        the others. Orders, items and outbox events are written with multi-row
+        INSERTs, and each new key stores its serialized response like
+        `place_order` does, so every later duplicate replays the same bytes.
+
+        A key still pending for a request in flight elsewhere fails with
+        `KEY_IN_PROGRESS`; callers that can wait retry it with `place_order`.
+
+        Returns:
+            list: (response, is_duplicate, error) for each entry, in submission order
+        """
+        results: list[BatchOutcome] = [(None, False, None)] * len(entries)
+        hashes = [self._compute_request_hash(entry) for entry in entries]
+
+        first_index: dict[str, int] = {}
+        repeats: dict[int, int] = {}
+        for index, entry in enumerate(entries):
+            if entry.idempotency_key in first_index:
+                repeats[index] = first_index[entry.idempotency_key]
+            else:
+                first_index[entry.idempotency_key] = index
+
+        order_ids = {index: uuid.uuid4() for index in first_index.values()}
+        claimed = await self.idempotency_repo.create_many_if_absent(
+            [
+                {
+                    "key": entries[index].idempotency_key,
+                    "request_hash": hashes[index],
+                    "order_id": order_ids[index],
+                }
+                for index in first_index.values()
+            ]
+        )
+        new_indexes = [i for i in first_index.values() if entries[i].idempotency_key in claimed]
+        existing_indexes = [
+            i for i in first_index.values() if entries[i].idempotency_key not in claimed
+        ]
+
+        allocation = None
+        created: dict[int, StoredResponse] = {}
+        if new_indexes:
+            allocation = await self.inventory_service.lock_for_allocation(
+                [item.product_id for index in new_indexes for item in entries[index].items]
+            )
+
+            orders: dict[int, Order] = {}
+            failed_keys = []
+            for index in new_indexes:
+                entry = entries[index]
+                try:
+                    order_items, items_total = allocation.allocate(entry.items)
+                except ValueError as e:
+                    results[index] = (None, False, str(e))
+                    failed_keys.append(entry.idempotency_key)
+                    continue
+
+                orders[index] = Order(
+                    id=order_ids[index],
+                    user_email=entry.user_email,
+                    status=OrderStatus.RESERVED.value,
+                    items_total=items_total,
+                    items=order_items,
+                )
+
+            if failed_keys:
+                await self.idempotency_repo.delete_many(failed_keys)
+            allocation.apply()
+            if orders:
+                await self.order_repo.create_many(list(orders.values()))
+                created = {
+                    index: self._serialize_order(order, hashes[index])
+                    for index, order in orders.items()
+                }
+                await self.idempotency_repo.store_responses(
+                    [
+                        (entries[index].idempotency_key, response.status_code, response.body)
+                        for index, response in created.items()
+                    ]
+                )
+                await self.outbox_repo.create_many(
+                    [self._build_order_created_event(order) for order in orders.values()]
+                )
+
+        await self.session.commit()
+
+        for index, response in created.items():
+            results[index] = (response, False, None)
+            await idempotency_cache.put(entries[index].idempotency_key, response)
+
+        if existing_indexes:
+            await self._replay_batch_duplicates(entries, hashes, existing_indexes, results)
+
+        for index, first in repeats.items():
+            first_response, _is_duplicate, error = results[first]
+            if hashes[index] != hashes[first]:
+                error = "Idempotency key conflict: different payload for same key"
+            results[index] = (None, False, error) if error else (first_response, True, None)
+
+        if allocation is not None:
+            await stock_ledger.set_levels(
+                {product_id: allocation.available[product_id] for product_id in allocation.consumed}
+            )
+
+        logger.info(f"Created order batch: {len(created)} created, {len(entries)} submitted")
+
+        return results
+
+    async def _replay_batch_duplicates(
+        self,
+        entries: list[OrderBatchEntry],
+        hashes: list[str],
+        indexes: list[int],
+        results: list[BatchOutcome],
+    ) -> None:
+        """Fill in the outcomes of batch entries whose keys already existed."""
+        existing_keys = {
+            key.key: key
+            for key in await self.idempotency_repo.get_by_keys(
+                [entries[index].idempotency_key for index in indexes]
+            )
+        }
+        # Keys completed before responses were stored with them are re-serialized
+        existing_orders = {
+            order.id: order
+            for order in await self.order_repo.get_by_ids(
+                [key.order_id for key in existing_keys.values() if key.response_body is None]
+            )
+        }
+
+        for index in indexes:
+            key = entries[index].idempotency_key
+            existing_key = existing_keys.get(key)
+            if existing_key is None:
+                results[index] = (None, False, "Referenced order not found")
+                continue
+
+            status_code, body = existing_key.response_status, existing_key.response_body
+            if existing_key.request_hash != hashes[index]:
+                results[index] = (
+                    None,
+                    False,
+                    "Idempotency key conflict: different payload for same key",
+                )
+            elif existing_key.status == IdempotencyStatus.PENDING.value:
+                results[index] = (None, False, KEY_IN_PROGRESS)
+            elif status_code is not None and body is not None:
+                response = StoredResponse(existing_key.request_hash, status_code, body)
+                results[index] = (response, True, None)
+                await idempotency_cache.put(key, response)
+            elif existing_key.order_id in existing_orders:
+                response = self._serialize_order(
+                    existing_orders[existing_key.order_id], existing_key.request_hash
+                )
+                results[index] = (response, True, None)
+                await idempotency_cache.put(key, response)
+            else:
+                results[index] = (None, False, "Referenced order not found")
+
+    @staticmethod
+    def _serialize_order(order: Order, request_hash: str) -> StoredResponse:
+        """Serialize an order the way POST /orders returns it."""
+        return StoredResponse(
+            request_hash,
+            HTTPStatus.CREATED.value,
+            OrderResponse.model_validate(order).model_dump_json().encode(),
+        )
+
+    def _build_order_created_event(self, order: Order) -> Outbox:
+        """Build the order.created outbox event for a new order."""
+        # UUIDs and Decimals are written as strings by the JSON codec of the engine
         outbox_payload = {
-            "order_id": str(order.id),
-            "total": str(order.items_total),
+            "order_id": order.id,
+            "total": order.items_total,
             "items": [
                 {
-                    "product_id": str(item.product_id),
+                    "product_id": item.product_id,
                     "quantity": item.quantity,
-                    "price": str(item.price_snapshot),
+                    "price": item.price_snapshot,
                 }
                 for item in order.items
             ],
         }
 
-        outbox = Outbox(
+        return Outbox(
             event_type="order.created",
-            payload_json=json.dumps(outbox_payload),
+            partition_key=str(order.id),
+            payload_json=outbox_payload,
             status=OutboxStatus.PENDING.value,
             attempts=0,
             next_attempt_at=datetime.utcnow(),
         )
-        await self.outbox_repo.create(outbox)
-
-        await self.session.commit()
-
-        logger.info(
-            f"Created order: {order.id}, total: {order.items_total}, "
-            f"items: {len(order.items)}, user: {order.user_email}"
-        )
-
-        return order, False
 
     async def get_order(self, order_id: uuid.UUID) -> Order | None:
         """Get order by ID."""
         return await self.order_repo.get_by_id(order_id)
 
+    @retry_on_db_conflict("cancel_order")
     async def cancel_order(self, order_id: uuid.UUID) -> Order:
         """Cancel order and restore stock if not paid."""
         order = await self.order_repo.get_by_id(order_id)
@@ -172,24 +511,20 @@ class OrderService:
         if order.status not in cancellable_statuses:
             raise ValueError(f"Order {order_id} cannot be canceled (status: {order.status})")
 
-        if order.status in [OrderStatus.RESERVED.value, OrderStatus.PAYMENT_PENDING.value]:
-            product_ids = [item.product_id for item in order.items]
-            products = await self.product_repo.get_by_ids_for_update(product_ids)
-            product_map = {p.id: p for p in products}
-
-            for item in order.items:
-                product = product_map.get(item.product_id)
-                if product:
-                    product.stock += item.quantity
-                    logger.info(
-                        f"Restored stock for product {product.id}: +{item.quantity} "
-                        f"(new stock: {product.stock})"
-                    )
+        restore_stock = order.status in [
+            OrderStatus.RESERVED.value,
+            OrderStatus.PAYMENT_PENDING.value,
+        ]
+        if restore_stock:
+            await self.inventory_service.release(order.items)
 
         order.status = OrderStatus.CANCELED.value
         order = await self.order_repo.update(order)
         await self.session.commit()
 
+        if restore_stock:
+            await stock_ledger.release((item.product_id, item.quantity) for item in order.items)
+
         logger.info(f"Canceled order: {order.id}")
         return order
 
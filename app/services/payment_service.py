@@ -4,10 +4,13 @@ import uuid
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.logging_config import get_logger
+from app.core.stock_ledger import stock_ledger
+from app.db.retry import retry_on_db_conflict
 from app.models.order import OrderStatus
 from app.repositories.order_repository import OrderRepository
 from app.repositories.product_repository import ProductRepository
 from app.schemas.webhook import PaymentStatus
+from app.services.inventory_service import InventoryService
 
 logger = get_logger(__name__)
 
@@ -19,7 +22,9 @@ class PaymentService:
         self.session = session
         self.order_repo = OrderRepository(session)
         self.product_repo = ProductRepository(session)
+        self.inventory_service = InventoryService(session)
 
+    @retry_on_db_conflict("process_payment_webhook")
     async def process_payment_webhook(
         self, payment_id: str, order_id: uuid.UUID, status: PaymentStatus
     ) -> None:
@@ -39,18 +44,7 @@ class PaymentService:
             logger.info(f"Order {order_id} marked as PAID")
 
         elif status == PaymentStatus.FAILED:
-            product_ids = [item.product_id for item in order.items]
-            products = await self.product_repo.get_by_ids_for_update(product_ids)
-            product_map = {p.id: p for p in products}
-
-            for item in order.items:
-                product = product_map.get(item.product_id)
-                if product:
-                    product.stock += item.quantity
-                    logger.info(
-                        f"Compensating: restored stock for product {product.id}: "
-                        f"+{item.quantity} (new stock: {product.stock})"
-                    )
+            await self.inventory_service.release(order.items, reason="Compensating: restored")
 
             order.status = OrderStatus.CANCELED.value
             await self.order_repo.update(order)
@@ -58,3 +52,6 @@ class PaymentService:
 
         await self.session.commit()
 
+        if status == PaymentStatus.FAILED:
+            await stock_ledger.release((item.product_id, item.quantity) for item in order.items)
+
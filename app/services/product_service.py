@@ -4,10 +4,13 @@ from decimal import Decimal
 from typing import Sequence
 
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
 
 from app.core.logging_config import get_logger
+from app.core.stock_ledger import stock_ledger
 from app.models.product import Product
 from app.repositories.product_repository import ProductRepository
+from app.repositories.stock_shard_repository import StockShardRepository
 
 logger = get_logger(__name__)
 
@@ -18,18 +21,34 @@ class ProductService:
     def __init__(self, session: AsyncSession):
         self.session = session
         self.product_repo = ProductRepository(session)
+        self.shard_repo = StockShardRepository(session)
 
     async def create_product(
-        self, name: str, price: Decimal, stock: int = 0, is_active: bool = True
+        self,
+        name: str,
+        price: Decimal,
+        stock: int = 0,
+        is_active: bool = True,
+        stock_shards: int = 0,
     ) -> Product:
-        """Create a new product."""
+        """Create a new product, optionally with its stock split across shards."""
         existing = await self.product_repo.get_by_name(name)
         if existing:
             raise ValueError(f"Product with name '{name}' already exists")
 
-        product = Product(name=name, price=price, stock=stock, is_active=is_active)
+        product = Product(
+            name=name,
+            price=price,
+            stock=0 if stock_shards else stock,
+            is_active=is_active,
+            stock_shards=stock_shards,
+        )
         product = await self.product_repo.create(product)
+        if stock_shards:
+            await self.shard_repo.replace_shards(product.id, stock_shards, stock)
         await self.session.commit()
+        await self._load_sharded_stock([product])
+        await stock_ledger.set_levels({product.id: product.stock if product.is_active else None})
 
         logger.info(f"Created product: {product.id} ({product.name})")
         return product
@@ -40,28 +59,51 @@ class ProductService:
         price: Decimal | None = None,
         stock: int | None = None,
         is_active: bool | None = None,
+        stock_shards: int | None = None,
     ) -> Product:
-        """Update product."""
-        product = await self.product_repo.get_by_id(product_id)
+        """
+        Update product.
+
+        Setting `stock` on a sharded product redistributes it evenly across the
+        shards; changing `stock_shards` re-shards the current (or given) stock.
+        """
+        reshard = stock_shards is not None
+        if stock is not None or reshard:
+            product = await self.product_repo.get_by_id_for_update(product_id)
+        else:
+            product = await self.product_repo.get_by_id(product_id)
         if not product:
             raise ValueError(f"Product {product_id} not found")
 
         if price is not None:
             product.price = price
-        if stock is not None:
-            product.stock = stock
         if is_active is not None:
             product.is_active = is_active
 
+        if reshard or (stock is not None and product.stock_shards > 0):
+            new_shards = stock_shards if stock_shards is not None else product.stock_shards
+            if stock is None:
+                stock = await self._current_stock(product)
+            await self.shard_repo.replace_shards(product.id, new_shards, stock)
+            product.stock_shards = new_shards
+            product.stock = 0 if new_shards else stock
+        elif stock is not None:
+            product.stock = stock
+
         product = await self.product_repo.update(product)
         await self.session.commit()
+        await self._load_sharded_stock([product])
+        await stock_ledger.set_levels({product.id: product.stock if product.is_active else None})
 
         logger.info(f"Updated product: {product.id}")
         return product
 
     async def get_product(self, product_id: uuid.UUID) -> Product | None:
         """Get product by ID."""
-        return await self.product_repo.get_by_id(product_id)
+        product = await self.product_repo.get_by_id(product_id)
+        if product:
+            await self._load_sharded_stock([product])
+        return product
 
     async def list_products(
         self,
@@ -73,7 +115,7 @@ class ProductService:
         limit: int = 20,
     ) -> Sequence[Product]:
         """List products with cursor pagination."""
-        return await self.product_repo.list_products(
+        products = await self.product_repo.list_products(
             search_query=search_query,
             is_active=is_active,
             sort_by=sort_by,
@@ -81,4 +123,23 @@ class ProductService:
             cursor_value=cursor,
             limit=limit,
         )
+        await self._load_sharded_stock(products)
+        return products
+
+    async def _current_stock(self, product: Product) -> int:
+        """Get total stock of a product, locking its shards if it is sharded."""
+        if product.stock_shards == 0:
+            return product.stock
+        shards = await self.shard_repo.get_shards_for_update(product.id)
+        return sum(shard.stock for shard in shards)
+
+    async def _load_sharded_stock(self, products: Sequence[Product]) -> None:
+        """Expose aggregated shard stock as `stock` on sharded products."""
+        sharded_ids = [p.id for p in products if p.stock_shards > 0]
+        if not sharded_ids:
+            return
+        totals = await self.shard_repo.get_totals(sharded_ids)
+        for product in products:
+            if product.stock_shards > 0:
+                set_committed_value(product, "stock", totals.get(product.id, 0))
 
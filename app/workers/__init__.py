@@ -1,7 +1,10 @@
 """Worker modules."""
+from app.workers.idempotency_purger import idempotency_purger
+from app.workers.outbox_archiver import outbox_archiver
 from app.workers.outbox_worker import outbox_worker
+from app.workers.stock_ledger_reconciler import stock_ledger_reconciler
 
-__all__ = ["outbox_worker"]
+__all__ = ["outbox_worker", "outbox_archiver", "stock_ledger_reconciler", "idempotency_purger"]
 
 
 
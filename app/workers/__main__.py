@@ -0,0 +1,25 @@
+"""Run the outbox worker pool: python -m app.workers [--processes N] [--concurrency M]."""
+import argparse
+import asyncio
+
+from app.core.logging_config import setup_logging
+from app.workers.pool import OutboxWorkerPool
+
+
+def main() -> None:
+    """Parse arguments and run the pool until SIGTERM/SIGINT."""
+    parser = argparse.ArgumentParser(prog="python -m app.workers", description=__doc__)
+    parser.add_argument("--processes", type=int, help="worker processes to run")
+    parser.add_argument("--concurrency", type=int, help="events processed at once per process")
+    parser.add_argument("--health-port", type=int, help="port of the GET /healthz endpoint")
+    args = parser.parse_args()
+
+    setup_logging()
+    pool = OutboxWorkerPool(
+        processes=args.processes, concurrency=args.concurrency, health_port=args.health_port
+    )
+    asyncio.run(pool.run())
+
+
+if __name__ == "__main__":
+    main()
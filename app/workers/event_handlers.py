@@ -0,0 +1,251 @@
+"""Registry of outbox event handlers."""
+import math
+import random
+import uuid
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Iterator
+
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.circuit_breaker import CircuitBreaker
+from app.core.config import settings
+from app.core.logging_config import get_logger
+from app.core.metrics import order_payment_initiation_latency_seconds
+from app.core.scheduler import DelayedTaskScheduler
+from app.models.order import OrderStatus
+from app.models.outbox import Outbox
+from app.repositories.order_repository import OrderRepository
+
+logger = get_logger(__name__)
+
+
+class EventContext:
+    """Resources of the worker that handlers may use."""
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        http_client: httpx.AsyncClient | None,
+        scheduler: DelayedTaskScheduler,
+    ):
+        self.session_factory = session_factory
+        self.http_client = http_client
+        self.scheduler = scheduler
+
+
+HandlerFunc = Callable[[Outbox, EventContext], Awaitable[None]]
+
+
+class EventHandler:
+    """
+    A handler registered for one event type, with its own limits.
+
+    `concurrency` caps the events of this type in flight per worker and
+    `batch_size` the events claimed per dispatch round, so a slow type cannot
+    occupy every slot of the worker. `timeout_seconds`, `max_attempts` and
+    `retry_base_delay_seconds` make up its retry policy. With a `breaker`,
+    events are not claimed while the circuit of their dependency is open.
+    `coalesce` marks events that carry the latest state of their aggregate,
+    so that of several pending ones for a key only the newest is delivered.
+    """
+
+    def __init__(
+        self,
+        event_type: str,
+        func: HandlerFunc,
+        concurrency: int,
+        batch_size: int,
+        timeout_seconds: float,
+        max_attempts: int,
+        retry_base_delay_seconds: float,
+        breaker: CircuitBreaker | None = None,
+        coalesce: bool = False,
+    ):
+        self.event_type = event_type
+        self.func = func
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.timeout_seconds = timeout_seconds
+        self.max_attempts = max_attempts
+        self.retry_base_delay_seconds = retry_base_delay_seconds
+        self.breaker = breaker
+        self.coalesce = coalesce
+
+    @property
+    def lease_seconds(self) -> float:
+        """Claim lease long enough for the handler to time out before it expires."""
+        return max(float(settings.outbox_lease_seconds), 2 * self.timeout_seconds)
+
+    def retry_delay(self, attempts: int) -> float:
+        """Jittered exponential backoff before attempt `attempts + 1`."""
+        return float(self.retry_base_delay_seconds * (2 ** (attempts - 1)) + random.uniform(0, 1))
+
+
+class EventHandlerRegistry:
+    """Event handlers by event type; events of unregistered types are never claimed."""
+
+    def __init__(self) -> None:
+        self._handlers: dict[str, EventHandler] = {}
+
+    def register(
+        self,
+        event_type: str,
+        *,
+        concurrency: int | None = None,
+        batch_size: int | None = None,
+        timeout_seconds: float | None = None,
+        max_attempts: int | None = None,
+        retry_base_delay_seconds: float | None = None,
+        breaker: CircuitBreaker | None = None,
+        coalesce: bool = False,
+    ) -> Callable[[HandlerFunc], HandlerFunc]:
+        """Register the decorated function as the handler of `event_type`."""
+
+        def decorator(func: HandlerFunc) -> HandlerFunc:
+            if event_type in self._handlers:
+                raise ValueError(f"Handler for {event_type} is already registered")
+
+            handler_concurrency = concurrency or settings.outbox_worker_concurrency
+            self._handlers[event_type] = EventHandler(
+                event_type=event_type,
+                func=func,
+                concurrency=handler_concurrency,
+                batch_size=batch_size or handler_concurrency,
+                timeout_seconds=timeout_seconds or settings.outbox_handler_timeout_seconds,
+                max_attempts=max_attempts or settings.outbox_max_attempts,
+                retry_base_delay_seconds=(
+                    retry_base_delay_seconds or settings.outbox_retry_base_delay_seconds
+                ),
+                breaker=breaker,
+                coalesce=coalesce,
+            )
+            return func
+
+        return decorator
+
+    def get(self, event_type: str) -> EventHandler | None:
+        """Get the handler of `event_type`."""
+        return self._handlers.get(event_type)
+
+    @property
+    def event_types(self) -> list[str]:
+        """Registered event types."""
+        return list(self._handlers)
+
+    def __iter__(self) -> Iterator[EventHandler]:
+        return iter(self._handlers.values())
+
+
+event_handlers = EventHandlerRegistry()
+
+payment_provider_breaker = CircuitBreaker(
+    "payment_provider",
+    failure_rate=settings.payment_breaker_failure_rate,
+    window_size=settings.payment_breaker_window_size,
+    min_calls=settings.payment_breaker_min_calls,
+    open_seconds=settings.payment_breaker_open_seconds,
+    max_open_seconds=settings.payment_breaker_max_open_seconds,
+    half_open_max_calls=settings.payment_breaker_half_open_max_calls,
+)
+
+
+@event_handlers.register("order.created", breaker=payment_provider_breaker)
+async def handle_order_created(event: Outbox, context: EventContext) -> None:
+    """Handle order.created event by calling fake payment service."""
+    payload = event.payload_json
+    order_id = payload["order_id"]
+    total = float(payload["total"])
+
+    logger.info(f"Initiating payment for order {order_id}, amount: {total}")
+
+    async with context.session_factory() as session:
+        order_repo = OrderRepository(session)
+        order = await order_repo.get_by_id(uuid.UUID(order_id))
+        # A retry must not move a paid or canceled order back
+        if order and order.status == OrderStatus.RESERVED.value:
+            order.status = OrderStatus.PAYMENT_PENDING.value
+            await order_repo.update(order)
+        await session.commit()
+
+    if settings.fake_payment_enabled and context.http_client:
+        payment_response = await context.http_client.post(
+            "/_fake_payments",
+            json={"order_id": order_id, "amount": total},
+        )
+        payment_response.raise_for_status()
+        payment_data = payment_response.json()
+        payment_id = payment_data["payment_id"]
+
+        order_payment_initiation_latency_seconds.observe(
+            (datetime.now(timezone.utc) - event.created_at).total_seconds()
+        )
+        logger.info(f"Payment initiated: {payment_id} for order {order_id}")
+
+        success = random.random() < settings.fake_payment_success_rate
+        payment_status = "success" if success else "failed"
+
+        # The provider answers later; the event is done once the payment exists
+        http_client, scheduler = context.http_client, context.scheduler
+        scheduler.schedule(
+            fake_payment_latency(),
+            lambda: send_fake_payment_webhook(
+                http_client, scheduler, payment_id, order_id, payment_status
+            ),
+        )
+
+    else:
+        logger.warning("Fake payment service is disabled, skipping payment call")
+
+
+def fake_payment_latency() -> float:
+    """Draw a simulated payment provider latency from the configured distribution."""
+    if settings.fake_payment_latency_distribution == "uniform":
+        return random.uniform(
+            settings.fake_payment_latency_min_seconds, settings.fake_payment_latency_max_seconds
+        )
+    if settings.fake_payment_latency_distribution == "lognormal":
+        return random.lognormvariate(
+            math.log(settings.fake_payment_latency_seconds), settings.fake_payment_latency_sigma
+        )
+    return settings.fake_payment_latency_seconds
+
+
+async def send_fake_payment_webhook(
+    http_client: httpx.AsyncClient,
+    scheduler: DelayedTaskScheduler,
+    payment_id: str,
+    order_id: str,
+    payment_status: str,
+    attempt: int = 1,
+) -> None:
+    """Deliver the fake payment outcome to /payments/callback, retrying on failure."""
+    logger.info(
+        f"Simulating payment webhook: payment_id={payment_id}, "
+        f"order_id={order_id}, status={payment_status}"
+    )
+
+    try:
+        webhook_response = await http_client.post(
+            "/payments/callback",
+            json={
+                "payment_id": payment_id,
+                "order_id": order_id,
+                "status": payment_status,
+            },
+        )
+        webhook_response.raise_for_status()
+    except Exception as e:
+        if attempt >= settings.fake_payment_webhook_max_attempts:
+            raise
+
+        delay = settings.outbox_retry_base_delay_seconds * (2 ** (attempt - 1))
+        logger.warning(
+            f"Fake payment webhook for order {order_id} failed, retrying in {delay}s: {e!r}"
+        )
+        scheduler.schedule(
+            delay,
+            lambda: send_fake_payment_webhook(
+                http_client, scheduler, payment_id, order_id, payment_status, attempt + 1
+            ),
+        )
@@ -0,0 +1,145 @@
+"""Purger dropping expired idempotency keys."""
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, cast
+
+from sqlalchemy import CursorResult, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.logging_config import get_logger
+from app.core.metrics import (
+    idempotency_keys_deleted_total,
+    idempotency_keys_table_bytes,
+    idempotency_partitions_dropped_total,
+    idempotency_purge_duration_seconds,
+)
+from app.db import AsyncSessionLocal
+from app.db.locks import try_advisory_lock
+from app.db.partitions import (
+    default_partition_name,
+    drop_partitions_before,
+    ensure_daily_partitions,
+    is_partitioned,
+    table_size_bytes,
+)
+
+logger = get_logger(__name__)
+
+TABLE = "idempotency_keys"
+LOCK_NAME = "idempotency_purger"
+
+
+class IdempotencyPurger:
+    """
+    Worker enforcing the idempotency key retention period.
+
+    On a partitioned `idempotency_keys` it creates the daily partitions ahead of
+    time and drops whole partitions once all their keys have expired, so purging
+    costs no DELETEs, dead tuples or vacuum work. Expired rows outside the daily
+    partitions (the default partition, or an unpartitioned table) are deleted
+    in batches.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession] = AsyncSessionLocal):
+        self.running = False
+        self.session_factory = session_factory
+
+    async def start(self) -> None:
+        """Start the purger loop."""
+        self.running = True
+        logger.info("Idempotency purger started")
+
+        while self.running:
+            try:
+                # Several API processes or worker pools may run this loop
+                async with try_advisory_lock(self.session_factory.kw["bind"], LOCK_NAME) as locked:
+                    if locked:
+                        await self.purge()
+                    else:
+                        logger.info("Idempotency key purge is running in another process, skipping")
+            except Exception as e:
+                logger.error(f"Idempotency key purge failed: {e}")
+
+            await asyncio.sleep(settings.idempotency_purge_interval_seconds)
+
+    async def stop(self) -> None:
+        """Stop the purger."""
+        self.running = False
+        logger.info("Idempotency purger stopped")
+
+    async def purge(self) -> None:
+        """Drop or delete expired keys and report the table size."""
+        now = datetime.now(timezone.utc)
+        cutoff = now - timedelta(hours=settings.idempotency_key_retention_hours)
+
+        async with self.session_factory() as session:
+            if await is_partitioned(session, TABLE):
+                await self._maintain_partitions(session, now, cutoff)
+                # Daily partitions are dropped whole once expired; deleting their
+                # rows earlier would bring back the DELETE cost partitioning avoids
+                await self._delete_expired(session, cutoff, default_partition_name(TABLE))
+            else:
+                await self._delete_expired(session, cutoff, TABLE)
+
+            size = await table_size_bytes(session, TABLE)
+            idempotency_keys_table_bytes.set(size)
+            await session.commit()
+
+    async def _maintain_partitions(
+        self, session: AsyncSession, now: datetime, cutoff: datetime
+    ) -> None:
+        try:
+            await ensure_daily_partitions(
+                session, TABLE, now.date(), settings.idempotency_partitions_premake_days
+            )
+            await session.commit()
+        except Exception as e:
+            # e.g. the default partition already holds rows of that day
+            await session.rollback()
+            logger.error(f"Failed to create idempotency_keys partitions: {e}")
+
+        started = time.perf_counter()
+        dropped = await drop_partitions_before(session, TABLE, cutoff)
+        await session.commit()
+        idempotency_purge_duration_seconds.labels(method="drop_partitions").observe(
+            time.perf_counter() - started
+        )
+
+        if dropped:
+            idempotency_partitions_dropped_total.inc(len(dropped))
+            logger.info(f"Dropped expired idempotency_keys partitions: {', '.join(dropped)}")
+
+    async def _delete_expired(self, session: AsyncSession, cutoff: datetime, table: str) -> int:
+        """Delete expired keys of `table` (the whole table, or its default partition)."""
+        started = time.perf_counter()
+        deleted = 0
+
+        while True:
+            result = cast(
+                CursorResult[Any],
+                await session.execute(
+                    text(
+                        f"DELETE FROM {table} WHERE (key, created_at) IN ("
+                        f"SELECT key, created_at FROM {table} WHERE created_at < :cutoff "
+                        f"LIMIT :limit)"
+                    ),
+                    {"cutoff": cutoff, "limit": settings.idempotency_purge_batch_size},
+                ),
+            )
+            await session.commit()
+            deleted += result.rowcount
+            if result.rowcount < settings.idempotency_purge_batch_size:
+                break
+
+        idempotency_purge_duration_seconds.labels(method="delete").observe(
+            time.perf_counter() - started
+        )
+        if deleted:
+            idempotency_keys_deleted_total.inc(deleted)
+            logger.info(f"Deleted {deleted} expired idempotency keys")
+        return deleted
+
+
+idempotency_purger = IdempotencyPurger()
@@ -0,0 +1,270 @@
+"""Archiver moving sent outbox events out of the outbox table."""
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, cast
+
+from sqlalchemy import CursorResult, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.logging_config import get_logger
+from app.core.metrics import (
+    outbox_archive_duration_seconds,
+    outbox_events_archived_total,
+    outbox_partitions_dropped_total,
+    outbox_table_bytes,
+)
+from app.db import AsyncSessionLocal
+from app.db.locks import try_advisory_lock
+from app.db.partitions import (
+    day_bounds,
+    default_partition_name,
+    ensure_daily_partitions,
+    has_default_partition,
+    is_detach_pending,
+    is_partitioned,
+    list_detached_partitions,
+    list_partitions,
+    partition_day,
+    table_size_bytes,
+)
+
+logger = get_logger(__name__)
+
+TABLE = "outbox"
+ARCHIVE_TABLE = "outbox_archive"
+LOCK_NAME = "outbox_archiver"
+
+# `partition` is generated and cannot be copied
+COLUMNS = (
+    "id, sequence, partition_key, event_type, payload_json, status, attempts, "
+    "next_attempt_at, created_at, claimed_by, lease_until"
+)
+ARCHIVE_COLUMNS = "id, sequence, partition_key, event_type, payload_json, attempts, created_at"
+
+
+class OutboxArchiver:
+    """
+    Worker enforcing the retention period of sent outbox events.
+
+    On a partitioned `outbox` it creates the daily partitions ahead of time.
+    Once a whole partition is older than `outbox_retention_hours`, its sent
+    events are copied to `outbox_archive` in batches while it stays attached.
+    Then it is detached, the rest of its events (dead or still unfinished) are
+    put back into `outbox`, where they land in the default partition, and it
+    is dropped. Only the detach locks `outbox`, and only briefly. Old sent
+    events outside the daily partitions (the default partition, or an
+    unpartitioned table) are moved in batches.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession] = AsyncSessionLocal):
+        self.running = False
+        self.session_factory = session_factory
+
+    async def start(self) -> None:
+        """Start the archiver loop."""
+        self.running = True
+        logger.info("Outbox archiver started")
+
+        while self.running:
+            try:
+                # Several API processes or worker pools may run this loop
+                async with try_advisory_lock(self.session_factory.kw["bind"], LOCK_NAME) as locked:
+                    if locked:
+                        await self.archive()
+                    else:
+                        logger.info("Outbox archiving is running in another process, skipping")
+            except Exception as e:
+                logger.error(f"Outbox archiving failed: {e}")
+
+            await asyncio.sleep(settings.outbox_archive_interval_seconds)
+
+    async def stop(self) -> None:
+        """Stop the archiver."""
+        self.running = False
+        logger.info("Outbox archiver stopped")
+
+    async def archive(self) -> None:
+        """Archive sent events past the retention period and report the table size."""
+        now = datetime.now(timezone.utc)
+        cutoff = now - timedelta(hours=settings.outbox_retention_hours)
+
+        async with self.session_factory() as session:
+            if await is_partitioned(session, TABLE):
+                await self._maintain_partitions(session, now, cutoff)
+                # Daily partitions are archived whole once past the retention
+                # period; moving their rows earlier would bring back the DELETEs
+                await self._move_sent(session, cutoff, default_partition_name(TABLE))
+            else:
+                await self._move_sent(session, cutoff, TABLE)
+
+            size = await table_size_bytes(session, TABLE)
+            outbox_table_bytes.set(size)
+            await session.commit()
+
+    async def _maintain_partitions(
+        self, session: AsyncSession, now: datetime, cutoff: datetime
+    ) -> None:
+        try:
+            await ensure_daily_partitions(
+                session, TABLE, now.date(), settings.outbox_partitions_premake_days
+            )
+            await session.commit()
+        except Exception as e:
+            # e.g. the default partition already holds rows of that day
+            await session.rollback()
+            logger.error(f"Failed to create outbox partitions: {e}")
+
+        # Partitions detached by an interrupted run
+        for name in await list_detached_partitions(session, TABLE):
+            archived = await self._finish_partition(session, name)
+            outbox_events_archived_total.inc(archived)
+            outbox_partitions_dropped_total.inc()
+            logger.info(f"Archived {archived} events and dropped detached outbox partition {name}")
+
+        for name in await list_partitions(session, TABLE):
+            day = partition_day(TABLE, name)
+            if day is None or day_bounds(day)[1] > cutoff:
+                continue
+
+            started = time.perf_counter()
+            try:
+                archived = await self._archive_partition(session, name)
+            except Exception as e:
+                # e.g. the detach timed out waiting for the lock; retried next run
+                await session.rollback()
+                logger.error(f"Failed to archive outbox partition {name}: {e}")
+                continue
+            outbox_archive_duration_seconds.labels(method="drop_partitions").observe(
+                time.perf_counter() - started
+            )
+            outbox_events_archived_total.inc(archived)
+            outbox_partitions_dropped_total.inc()
+            logger.info(f"Archived {archived} events and dropped outbox partition {name}")
+
+    async def _archive_partition(self, session: AsyncSession, name: str) -> int:
+        """Archive the sent events of partition `name`, then detach and drop it."""
+        archived = await self._copy_sent(session, name)
+        await self._detach(session, name)
+        return archived + await self._finish_partition(session, name)
+
+    async def _copy_sent(self, session: AsyncSession, name: str) -> int:
+        """
+        Copy the sent events of attached partition `name` to the archive in batches.
+
+        Each batch is its own short transaction that locks nothing but the rows
+        it reads, and copying is idempotent, so an interrupted run just resumes.
+        """
+        archived = 0
+        after = 0
+        while True:
+            result = await session.execute(
+                text(
+                    f"WITH batch AS ("
+                    f"SELECT {ARCHIVE_COLUMNS} FROM {name} "
+                    f"WHERE status = 'sent' AND sequence > :after "
+                    f"ORDER BY sequence LIMIT :limit), "
+                    f"copied AS ("
+                    f"INSERT INTO {ARCHIVE_TABLE} ({ARCHIVE_COLUMNS}) "
+                    f"SELECT {ARCHIVE_COLUMNS} FROM batch "
+                    f"ON CONFLICT (id) DO NOTHING RETURNING 1) "
+                    f"SELECT count(*), max(sequence), (SELECT count(*) FROM copied) FROM batch"
+                ),
+                {"after": after, "limit": settings.outbox_archive_batch_size},
+            )
+            rows, last, copied = result.one()
+            await session.commit()
+            archived += copied
+            if rows < settings.outbox_archive_batch_size:
+                return archived
+            after = last
+
+    async def _detach(self, session: AsyncSession, name: str) -> None:
+        if await is_detach_pending(session, name):
+            await self._execute_outside_transaction(
+                session, f"ALTER TABLE {TABLE} DETACH PARTITION {name} FINALIZE"
+            )
+        elif await has_default_partition(session, TABLE):
+            # CONCURRENTLY is not allowed next to a default partition. A plain
+            # DETACH is brief with nothing else in its transaction, and the lock
+            # timeout keeps a long wait for the lock from queueing writers
+            await session.execute(
+                text(f"SET LOCAL lock_timeout = {settings.outbox_archive_lock_timeout_ms}")
+            )
+            await session.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {name}"))
+            await session.commit()
+        else:
+            await self._execute_outside_transaction(
+                session, f"ALTER TABLE {TABLE} DETACH PARTITION {name} CONCURRENTLY"
+            )
+
+    async def _execute_outside_transaction(self, session: AsyncSession, statement: str) -> None:
+        """Run `statement`, which cannot run in a transaction block, in autocommit mode."""
+        await session.commit()
+        connection = await session.connection(execution_options={"isolation_level": "AUTOCOMMIT"})
+        await connection.execute(text(statement))
+        # Releases the connection, restoring its isolation level
+        await session.commit()
+
+    async def _finish_partition(self, session: AsyncSession, name: str) -> int:
+        """
+        Archive what is left of detached partition `name`, put back the rest and drop it.
+
+        Returns:
+            int: number of events archived, i.e. those marked sent during the copy
+        """
+        result = cast(
+            CursorResult[Any],
+            await session.execute(
+                text(
+                    f"INSERT INTO {ARCHIVE_TABLE} ({ARCHIVE_COLUMNS}) "
+                    f"SELECT {ARCHIVE_COLUMNS} FROM {name} WHERE status = 'sent' "
+                    f"ON CONFLICT (id) DO NOTHING"
+                )
+            ),
+        )
+        await session.execute(
+            text(
+                f"INSERT INTO {TABLE} ({COLUMNS}) "
+                f"SELECT {COLUMNS} FROM {name} WHERE status <> 'sent'"
+            )
+        )
+        await session.execute(text(f"DROP TABLE {name}"))
+        await session.commit()
+        return result.rowcount
+
+    async def _move_sent(self, session: AsyncSession, cutoff: datetime, table: str) -> int:
+        """Move old sent events of `table` (the whole table, or its default partition)."""
+        started = time.perf_counter()
+        moved = 0
+
+        while True:
+            result = cast(
+                CursorResult[Any],
+                await session.execute(
+                    text(
+                        f"WITH moved AS ("
+                        f"DELETE FROM {table} WHERE (id, created_at) IN ("
+                        f"SELECT id, created_at FROM {table} "
+                        f"WHERE status = 'sent' AND created_at < :cutoff LIMIT :limit) "
+                        f"RETURNING {ARCHIVE_COLUMNS}) "
+                        f"INSERT INTO {ARCHIVE_TABLE} ({ARCHIVE_COLUMNS}) "
+                        f"SELECT {ARCHIVE_COLUMNS} FROM moved"
+                    ),
+                    {"cutoff": cutoff, "limit": settings.outbox_archive_batch_size},
+                ),
+            )
+            await session.commit()
+            moved += result.rowcount
+            if result.rowcount < settings.outbox_archive_batch_size:
+                break
+
+        outbox_archive_duration_seconds.labels(method="move").observe(time.perf_counter() - started)
+        if moved:
+            outbox_events_archived_total.inc(moved)
+            logger.info(f"Archived {moved} sent outbox events")
+        return moved
+
+
+outbox_archiver = OutboxArchiver()
@@ -1,160 +1,670 @@
 """Outbox worker for processing events with retry logic."""
 import asyncio
-import json
-import random
+import os
+import socket
+import time
 import uuid
-from datetime import datetime, timedelta
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any
 
+import asyncpg
 import httpx
-from sqlalchemy.ext.asyncio import AsyncSession
+import redis.asyncio as redis
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from app.core.circuit_breaker import CircuitOpenError, CircuitState, is_upstream_failure
 from app.core.config import settings
+from app.core.event_stream import ensure_consumer_group, publish_events
+from app.core.http_client import create_payment_http_client
 from app.core.logging_config import get_logger, request_id_ctx_var
+from app.core.metrics import (
+    outbox_claim_batch_size,
+    outbox_dispatch_overhead_seconds,
+    outbox_event_processing_seconds,
+    outbox_events_coalesced_total,
+    outbox_events_in_flight,
+    outbox_events_relayed_total,
+    outbox_finish_batch_size,
+    outbox_handler_seconds,
+    outbox_partitions_owned,
+    outbox_relay_batch_seconds,
+    outbox_unhandled_events,
+)
+from app.core.scheduler import DelayedTaskScheduler
 from app.db import AsyncSessionLocal
-from app.models.order import OrderStatus
-from app.models.outbox import OutboxStatus
-from app.repositories.order_repository import OrderRepository
-from app.repositories.outbox_repository import OutboxRepository
+from app.models.outbox import OUTBOX_NOTIFY_CHANNEL, Outbox, OutboxStatus
+from app.repositories.outbox_partition_repository import OutboxPartitionRepository
+from app.repositories.outbox_repository import EventOutcome, OutboxRepository
+from app.workers.event_handlers import (
+    EventContext,
+    EventHandler,
+    EventHandlerRegistry,
+    event_handlers,
+)
 
 logger = get_logger(__name__)
 
 
-class OutboxWorker:
-    """Worker for processing outbox events."""
+class AdaptiveBatchSize:
+    """
+    Claim batch size of one event type, adapted to backlog depth and handler latency.
+
+    A claim that comes back full means the backlog is deeper than the batch,
+    so the batch doubles up to `max_size`; a short claim shrinks it to what
+    was found. Waiting for free slots to fill a batch is only worth it while
+    handlers finish quickly: once the expected wait exceeds
+    `outbox_claim_linger_seconds`, whatever slots are free are claimed.
+    """
+
+    def __init__(self, event_type: str, max_size: int):
+        self.event_type = event_type
+        self.max_size = max_size
+        self.size = max_size
+        self.latency = 0.0
+        outbox_claim_batch_size.labels(event_type=event_type).set(self.size)
+
+    def observe_claim(self, limit: int, claimed: int) -> None:
+        """Adapt the size to a claim of `claimed` events out of `limit` asked for."""
+        if claimed >= limit:
+            if limit >= self.size:
+                self.size = min(self.size * 2, self.max_size)
+        else:
+            self.size = max(claimed, 1)
+        outbox_claim_batch_size.labels(event_type=self.event_type).set(self.size)
+
+    def observe_latency(self, seconds: float) -> None:
+        """Fold one handler run time into the moving average."""
+        self.latency = seconds if not self.latency else 0.8 * self.latency + 0.2 * seconds
+
+    def should_claim(self, free: int, in_flight: int) -> bool:
+        """Whether to claim with `free` slots now rather than wait for running events."""
+        if free >= self.size or in_flight == 0:
+            return True
+        expected_wait = (self.size - free) * self.latency / in_flight
+        return expected_wait > settings.outbox_claim_linger_seconds
 
-    def __init__(self) -> None:
+
+class OutboxWorker:
+    """
+    Worker for processing outbox events.
+
+    The worker holds a dedicated asyncpg connection listening on
+    `OUTBOX_NOTIFY_CHANNEL`, which a trigger on `outbox` notifies when producers
+    commit new events, and processes events as soon as it is woken. Polling is
+    kept as a safety net with a long interval, and with the regular interval
+    while the listener is disabled or disconnected.
+
+    Events are claimed in a short transaction that marks them `processing`
+    under a lease held by `worker_id`. Handlers run with no transaction open
+    and the outcome is written in a second short transaction, so no row lock
+    or pooled connection is held across HTTP calls. Events whose lease expires
+    are claimed again by any worker.
+
+    Each worker leases a fair share of the outbox hash partitions and only
+    claims events of its own partitions. Within a partition key events are
+    claimed one at a time in order, while different keys run in parallel.
+
+    Up to `outbox_worker_concurrency` events are processed at once, each in its
+    own task, so a slow event only occupies its own slot. Free slots are
+    refilled in batches sized by `AdaptiveBatchSize`, and the outcomes of
+    events finishing together are written in one bulk UPDATE.
+
+    Events of `outbox_relay_event_types` are not handled in-process but
+    published to one Redis Stream per type, where consumer groups read them
+    at their own pace.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession] = AsyncSessionLocal,
+        worker_id: str | None = None,
+        concurrency: int | None = None,
+        handlers: EventHandlerRegistry = event_handlers,
+    ):
         self.running = False
+        self.session_factory = session_factory
+        self.concurrency = concurrency or settings.outbox_worker_concurrency
+        self.handlers = handlers
+        self.scheduler = DelayedTaskScheduler("outbox")
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
         self.http_client: httpx.AsyncClient | None = None
+        self._listener: asyncpg.Connection | None = None
+        self._wakeup = asyncio.Event()
+        self._in_flight: dict[uuid.UUID, asyncio.Task[None]] = {}
+        self._in_flight_by_type: Counter[str] = Counter()
+        self._unhandled_types: set[str] = set()
+        self._partitions: list[int] = []
+        self._rebalance_at = 0.0
+        self._batch_sizes = {
+            handler.event_type: AdaptiveBatchSize(handler.event_type, handler.batch_size)
+            for handler in handlers
+        }
+        self._outcomes: list[tuple[EventOutcome, asyncio.Future[bool]]] = []
+        self._flusher: asyncio.Task[None] | None = None
+        self.relay_types = list(settings.outbox_relay_event_types)
+        self.redis: redis.Redis | None = None
+
+    @property
+    def claimed_types(self) -> list[str]:
+        """Event types this worker handles or relays; only these keep their key's order."""
+        return [*self.handlers.event_types, *self.relay_types]
 
     async def start(self) -> None:
         """Start the outbox worker."""
         self.running = True
-        self.http_client = httpx.AsyncClient(timeout=30.0)
+        self.http_client = create_payment_http_client()
+        if self.relay_types:
+            self.redis = redis.from_url(str(settings.redis_url), decode_responses=True)
+            await self._ensure_consumer_groups()
         logger.info("Outbox worker started")
 
         try:
             while self.running:
-                await self._process_events()
-                await asyncio.sleep(settings.outbox_worker_interval_seconds)
+                self._wakeup.clear()
+                if time.monotonic() >= self._rebalance_at:
+                    await self._rebalance_partitions()
+
+                if self.relay_types:
+                    await self._relay_events()
+                if len(self._in_flight) < self.concurrency:
+                    await self._dispatch_events()
+
+                if len(self._in_flight) >= self.concurrency:
+                    await asyncio.wait(
+                        self._in_flight.values(), return_when=asyncio.FIRST_COMPLETED
+                    )
+                else:
+                    await self._wait_for_events()
         except Exception as e:
             logger.error(f"Outbox worker crashed: {e}")
         finally:
+            await self._drain()
+            if self._flusher:
+                # Outcomes of events cancelled by the drain are still written
+                await asyncio.gather(self._flusher, return_exceptions=True)
+            await self.scheduler.close(settings.outbox_drain_timeout_seconds)
+            await self._release_partitions()
+            await self._close_listener()
             if self.http_client:
                 await self.http_client.aclose()
+            if self.redis:
+                await self.redis.close()
 
     async def stop(self) -> None:
         """Stop the outbox worker."""
         self.running = False
+        self._wakeup.set()
         logger.info("Outbox worker stopped")
 
-    async def _process_events(self) -> None:
-        """Process pending outbox events."""
-        async with AsyncSessionLocal() as session:
+    async def _drain(self) -> None:
+        """Let in-flight events finish, cancelling those still running after the drain timeout."""
+        if not self._in_flight:
+            return
+
+        logger.info(f"Draining {len(self._in_flight)} in-flight outbox events")
+        _, pending = await asyncio.wait(
+            list(self._in_flight.values()), timeout=settings.outbox_drain_timeout_seconds
+        )
+        # Cancelled events are claimed again once their lease expires
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _wait_for_events(self) -> None:
+        """Sleep until notified of new events or the polling interval elapses."""
+        if settings.outbox_listen_enabled:
+            await self._ensure_listener()
+
+        if self._listener is not None:
+            timeout = float(settings.outbox_listen_fallback_interval_seconds)
+            # Retries are scheduled in the future and are not notified
+            next_attempt_at = await self._get_next_attempt_at()
+            if next_attempt_at is not None:
+                until_next = (next_attempt_at - datetime.now(timezone.utc)).total_seconds()
+                timeout = min(timeout, max(until_next, 0.0))
+        else:
+            timeout = float(settings.outbox_worker_interval_seconds)
+        timeout = min(timeout, max(self._rebalance_at - time.monotonic(), 0.0))
+        for handler in self.handlers:
+            if handler.breaker and handler.breaker.state == CircuitState.OPEN:
+                timeout = min(timeout, handler.breaker.seconds_until_retry())
+
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _rebalance_partitions(self) -> None:
+        """Renew partition leases and move towards a fair share of the partitions."""
+        lease_seconds = settings.outbox_partition_lease_seconds
+        self._rebalance_at = time.monotonic() + lease_seconds / 3
+
+        async with self.session_factory() as session:
+            try:
+                partitions = await OutboxPartitionRepository(session).rebalance(
+                    self.worker_id, lease_seconds
+                )
+                await session.commit()
+            except Exception as e:
+                logger.error(f"Error rebalancing outbox partitions: {e}")
+                await session.rollback()
+                return
+
+        if partitions != self._partitions:
+            logger.info(f"Outbox worker {self.worker_id} owns {len(partitions)} partitions")
+            # Newly taken partitions may already have events waiting
+            self._wakeup.set()
+        self._partitions = partitions
+        outbox_partitions_owned.set(len(partitions))
+        await self._report_unhandled_events()
+
+    async def _report_unhandled_events(self) -> None:
+        """Warn about pending events that no registered handler will ever claim."""
+        async with self.session_factory() as session:
             try:
-                repo = OutboxRepository(session)
-                events = await repo.get_pending_events(limit=10)
+                counts = await OutboxRepository(session).count_pending_by_type(
+                    self._partitions, self.claimed_types
+                )
+            except Exception as e:
+                logger.error(f"Error counting unhandled outbox events: {e}")
+                return
+
+        for event_type in self._unhandled_types - counts.keys():
+            outbox_unhandled_events.labels(event_type=event_type).set(0)
+        for event_type, count in counts.items():
+            outbox_unhandled_events.labels(event_type=event_type).set(count)
+            logger.warning(
+                f"{count} pending outbox events of type {event_type} have no handler "
+                f"and are left pending without holding back later events of their keys"
+            )
+        self._unhandled_types = set(counts)
 
-                if not events:
-                    return
+    async def _release_partitions(self) -> None:
+        """Hand partitions back so other workers can take them without waiting for expiry."""
+        async with self.session_factory() as session:
+            try:
+                await OutboxPartitionRepository(session).release(self.worker_id)
+                await session.commit()
+            except Exception as e:
+                logger.error(f"Error releasing outbox partitions: {e}")
+                await session.rollback()
+        self._partitions = []
+        outbox_partitions_owned.set(0)
+
+    async def _get_next_attempt_at(self) -> datetime | None:
+        # Types that cannot be claimed yet would otherwise look due right away;
+        # a finishing event wakes the worker for them
+        event_types = [
+            *self.relay_types,
+            *(handler.event_type for handler in self.handlers if self._claim_limit(handler) > 0),
+        ]
+        async with self.session_factory() as session:
+            try:
+                return await OutboxRepository(session).get_next_attempt_at(
+                    self._partitions, event_types, ordered_types=self.claimed_types
+                )
+            except Exception as e:
+                logger.error(f"Error fetching next outbox attempt: {e}")
+                return None
 
-                logger.info(f"Processing {len(events)} outbox events")
+    async def _ensure_listener(self) -> None:
+        """Open the LISTEN connection if it is not open."""
+        if self._listener is not None and not self._listener.is_closed():
+            return
 
-                for event in events:
-                    request_id_ctx_var.set(str(event.id))
+        dsn = make_url(str(settings.database_url)).set(drivername="postgresql")
+        try:
+            self._listener = await asyncpg.connect(dsn.render_as_string(hide_password=False))
+            await self._listener.add_listener(OUTBOX_NOTIFY_CHANNEL, self._on_notify)
+            self._listener.add_termination_listener(self._on_listener_closed)
+        except Exception as e:
+            logger.error(f"Failed to listen for outbox notifications: {e}")
+            await self._close_listener()
+            return
+
+        logger.info(f"Listening for outbox notifications on {OUTBOX_NOTIFY_CHANNEL}")
+        # Events committed while nobody was listening were not notified
+        self._wakeup.set()
+
+    async def _close_listener(self) -> None:
+        listener, self._listener = self._listener, None
+        if listener is not None and not listener.is_closed():
+            await listener.close()
+
+    def _on_notify(self, connection: Any, pid: int, channel: str, payload: str) -> None:
+        self._wakeup.set()
+
+    def _on_listener_closed(self, connection: Any) -> None:
+        logger.warning("Outbox notification listener disconnected")
+        self._listener = None
+        self._wakeup.set()
+
+    async def _ensure_consumer_groups(self) -> None:
+        """Create the configured consumer groups on every relay stream."""
+        client = self.redis
+        if client is None:
+            return
+        for event_type in self.relay_types:
+            for group in settings.outbox_relay_consumer_groups:
+                try:
+                    await ensure_consumer_group(client, event_type, group)
+                except Exception as e:
+                    logger.error(f"Failed to create consumer group {group} for {event_type}: {e}")
+
+    async def _relay_events(self) -> int:
+        """
+        Publish claimed events of relayed types to their streams and mark them sent.
+
+        A batch is published in one pipelined round trip and finished in one
+        UPDATE. Events are only marked sent after Redis accepted them, so a
+        crash in between publishes them again: delivery is at least once.
+
+        Returns:
+            int: number of events relayed
+        """
+        client = self.redis
+        if client is None:
+            return 0
+        async with self.session_factory() as session:
+            repo = OutboxRepository(session)
+            try:
+                events = await repo.claim_events(
+                    self.worker_id,
+                    self._partitions,
+                    limit=settings.outbox_relay_batch_size,
+                    lease_seconds=settings.outbox_lease_seconds,
+                    event_types=self.relay_types,
+                    ordered_types=self.claimed_types,
+                )
+                await session.commit()
+            except Exception as e:
+                logger.error(f"Error claiming outbox events to relay: {e}")
+                await session.rollback()
+                return 0
+            if not events:
+                return 0
 
-                    try:
-                        await self._process_event(event, session)
-                        await session.commit()
-                    except Exception as e:
-                        logger.error(f"Failed to process event {event.id}: {e}")
-                        await session.rollback()
+            started = time.perf_counter()
+            try:
+                await publish_events(client, events)
+                outcomes = [
+                    (event.id, OutboxStatus.SENT, event.attempts, event.next_attempt_at)
+                    for event in events
+                ]
+                relayed = len(events)
+            except Exception as e:
+                logger.error(f"Failed to relay {len(events)} outbox events: {e!r}")
+                outcomes = [self._relay_retry(event) for event in events]
+                relayed = 0
+            outbox_relay_batch_seconds.observe(time.perf_counter() - started)
 
+            try:
+                await repo.finish_events(self.worker_id, outcomes)
+                await session.commit()
             except Exception as e:
-                logger.error(f"Error fetching outbox events: {e}")
+                # The leases expire and the events are relayed again
+                logger.error(f"Failed to record relay of {len(events)} outbox events: {e}")
                 await session.rollback()
+                return 0
+
+        if relayed:
+            for event_type, count in Counter(event.event_type for event in events).items():
+                outbox_events_relayed_total.labels(event_type=event_type).inc(count)
+            logger.info(f"Relayed {relayed} outbox events to Redis Streams")
+        return relayed
+
+    @staticmethod
+    def _relay_retry(event: Outbox) -> EventOutcome:
+        """Outcome of an event whose relay failed, backing off like handler retries."""
+        attempts = event.attempts + 1
+        if attempts >= settings.outbox_max_attempts:
+            return event.id, OutboxStatus.DEAD, attempts, event.next_attempt_at
+        delay = settings.outbox_retry_base_delay_seconds * (2 ** (attempts - 1))
+        return (
+            event.id,
+            OutboxStatus.PENDING,
+            attempts,
+            datetime.now(timezone.utc) + timedelta(seconds=delay),
+        )
+
+    async def _dispatch_events(self) -> int:
+        """
+        Claim events for each registered handler up to its free slots and start a task for each.
+
+        Returns:
+            int: number of events dispatched
+        """
+        dispatched = 0
+        for handler in self.handlers:
+            limit = self._claim_limit(handler)
+            if limit <= 0:
+                continue
+
+            async with self.session_factory() as session:
+                try:
+                    repo = OutboxRepository(session)
+                    coalesced = 0
+                    if handler.coalesce and settings.outbox_coalescing_enabled:
+                        coalesced = await repo.supersede_events(
+                            self._partitions, [handler.event_type]
+                        )
+                    events = await repo.claim_events(
+                        self.worker_id,
+                        self._partitions,
+                        limit=limit,
+                        lease_seconds=handler.lease_seconds,
+                        event_types=[handler.event_type],
+                        ordered_types=self.claimed_types,
+                    )
+                    await session.commit()
+                except Exception as e:
+                    logger.error(f"Error claiming {handler.event_type} outbox events: {e}")
+                    await session.rollback()
+                    continue
+
+            if coalesced:
+                outbox_events_coalesced_total.labels(event_type=handler.event_type).inc(coalesced)
+
+            self._batch_sizes[handler.event_type].observe_claim(limit, len(events))
+            if events:
+                logger.info(f"Dispatching {len(events)} {handler.event_type} outbox events")
+
+            for event in events:
+                if event.id in self._in_flight:
+                    # Our own lease expired while the handler was still running
+                    continue
+                self._start_event(event, handler)
+                dispatched += 1
+
+        return dispatched
+
+    def _claim_limit(self, handler: EventHandler) -> int:
+        """
+        Events of `handler` to claim now.
+
+        Zero while its type is relayed, its slots are full, its circuit is
+        open, or its batch is still filling up: while handlers finish quickly
+        enough, claiming waits for a full batch instead of spending a
+        transaction on every free slot.
+        """
+        if handler.event_type in self.relay_types:
+            return 0
+        in_flight = self._in_flight_by_type[handler.event_type]
+        free = min(handler.concurrency - in_flight, self.concurrency - len(self._in_flight))
+        if handler.breaker:
+            # An open circuit pauses the type; half-open admits a few trial events
+            available = handler.breaker.available_calls()
+            if available is not None:
+                free = min(free, available)
+        if free <= 0:
+            return 0
+
+        batch = self._batch_sizes[handler.event_type]
+        if not batch.should_claim(free, in_flight):
+            return 0
+        return min(free, batch.size)
+
+    def _start_event(self, event: Outbox, handler: EventHandler) -> None:
+        task = asyncio.create_task(self._run_event(event, handler))
+        self._in_flight[event.id] = task
+        self._in_flight_by_type[handler.event_type] += 1
+
+        def forget(_: asyncio.Task[None]) -> None:
+            self._in_flight.pop(event.id, None)
+            self._in_flight_by_type[handler.event_type] -= 1
+
+        task.add_done_callback(forget)
+
+    async def _run_event(self, event: Outbox, handler: EventHandler) -> None:
+        """Process one claimed event and wait until its outcome is written with its batch."""
+        request_id_ctx_var.set(str(event.id))
+        started = time.perf_counter()
+        handler_seconds = 0.0
+        outcome = "failed"
+
+        outbox_events_in_flight.labels(event_type=event.event_type).inc()
+        try:
+            handler_started = time.perf_counter()
+            status, attempts, next_attempt_at = await self._process_event(event, handler)
+            handler_seconds = time.perf_counter() - handler_started
+            outbox_handler_seconds.labels(event_type=event.event_type).observe(handler_seconds)
+            self._batch_sizes[handler.event_type].observe_latency(handler_seconds)
+
+            recorded: asyncio.Future[bool] = asyncio.get_running_loop().create_future()
+            self._outcomes.append(((event.id, status, attempts, next_attempt_at), recorded))
+            if self._flusher is None or self._flusher.done():
+                self._flusher = asyncio.create_task(self._flush_outcomes())
+            try:
+                finished = await recorded
+            except Exception as e:
+                logger.error(f"Failed to record outcome of event {event.id}: {e}")
+                return
 
-    async def _process_event(self, event: any, session: AsyncSession) -> None:  # type: ignore[valid-type]
-        """Process a single outbox event."""
+            if finished:
+                outcome = status.value
+            else:
+                outcome = "lease_lost"
+                logger.warning(f"Lease on event {event.id} expired before it finished")
+        finally:
+            outbox_events_in_flight.labels(event_type=event.event_type).dec()
+            total_seconds = time.perf_counter() - started
+            outbox_event_processing_seconds.labels(
+                event_type=event.event_type, outcome=outcome
+            ).observe(total_seconds)
+            if handler_seconds:
+                outbox_dispatch_overhead_seconds.labels(event_type=event.event_type).observe(
+                    total_seconds - handler_seconds
+                )
+            # The next event of the key, or a retry, may now be due
+            self._wakeup.set()
+
+    async def _flush_outcomes(self) -> None:
+        """Write outcomes of finished events in batches until none are left."""
+        while self._outcomes:
+            # Events finishing close together share one UPDATE
+            await asyncio.sleep(settings.outbox_finish_batch_window_seconds)
+            await self._write_outcomes()
+
+    async def _write_outcomes(self) -> None:
+        """Record the collected outcomes in one transaction and resolve their waiters."""
+        batch, self._outcomes = self._outcomes, []
+
+        outbox_finish_batch_size.observe(len(batch))
+        async with self.session_factory() as session:
+            try:
+                finished = await OutboxRepository(session).finish_events(
+                    self.worker_id, [outcome for outcome, _ in batch]
+                )
+                await session.commit()
+            except Exception as e:
+                await session.rollback()
+                # Unrecorded events are claimed again once their lease expires
+                for _, recorded in batch:
+                    if not recorded.done():
+                        recorded.set_exception(e)
+                return
+
+        for (event_id, *_), recorded in batch:
+            if not recorded.done():
+                recorded.set_result(event_id in finished)
+
+    async def _process_event(
+        self, event: Outbox, handler: EventHandler
+    ) -> tuple[OutboxStatus, int, datetime]:
+        """
+        Run the registered handler of a claimed event with no transaction open.
+
+        The handler is cut off after its timeout, which is shorter than the
+        claim lease, so the event is finished before the lease can expire.
+
+        With a circuit breaker, failures of the dependency are recorded on it.
+        An event that hit an open circuit, or opened it, is put back until the
+        circuit lets trial calls through, without using up an attempt.
+
+        Returns:
+            tuple: the resulting status, attempt count and next attempt time
+        """
         logger.info(f"Processing event: {event.id} ({event.event_type})")
 
+        breaker = handler.breaker
         try:
-            if event.event_type == "order.created":
-                await self._handle_order_created(event, session)
-
-            event.status = OutboxStatus.SENT.value
-            await session.flush()
+            if breaker:
+                breaker.before_call()
+            await asyncio.wait_for(
+                handler.func(
+                    event, EventContext(self.session_factory, self.http_client, self.scheduler)
+                ),
+                timeout=handler.timeout_seconds,
+            )
+            if breaker:
+                breaker.record_success()
 
             logger.info(f"Event {event.id} processed successfully")
+            return OutboxStatus.SENT, event.attempts, event.next_attempt_at
 
         except Exception as e:
-            event.attempts += 1
-
-            if event.attempts >= settings.outbox_max_attempts:
-                event.status = OutboxStatus.DEAD.value
-                logger.error(
-                    f"Event {event.id} moved to dead letter queue after "
-                    f"{event.attempts} attempts: {e}"
-                )
-            else:
-                delay = settings.outbox_retry_base_delay_seconds * (2 ** (event.attempts - 1))
-                delay += random.uniform(0, 1)
-                event.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
-
+            if breaker and not isinstance(e, CircuitOpenError):
+                if is_upstream_failure(e):
+                    breaker.record_failure()
+                else:
+                    breaker.cancel_call()
+
+            if breaker and (
+                isinstance(e, CircuitOpenError) or breaker.state == CircuitState.OPEN
+            ):
+                delay = breaker.seconds_until_retry()
                 logger.warning(
-                    f"Event {event.id} retry scheduled in {delay}s "
-                    f"(attempt {event.attempts}/{settings.outbox_max_attempts}): {e}"
+                    f"Event {event.id} deferred for {delay:.1f}s, "
+                    f"circuit {breaker.name} is open: {e!r}"
+                )
+                return (
+                    OutboxStatus.PENDING,
+                    event.attempts,
+                    datetime.now(timezone.utc) + timedelta(seconds=delay),
                 )
 
-            await session.flush()
-            raise
-
-    async def _handle_order_created(self, event: any, session: AsyncSession) -> None:  # type: ignore[valid-type]
-        """Handle order.created event by calling fake payment service."""
-        payload = json.loads(event.payload_json)
-        order_id = payload["order_id"]
-        total = float(payload["total"])
-
-        logger.info(f"Initiating payment for order {order_id}, amount: {total}")
-
-        order_repo = OrderRepository(session)
-        order = await order_repo.get_by_id(uuid.UUID(order_id))
-        if order:
-            order.status = OrderStatus.PAYMENT_PENDING.value
-            await order_repo.update(order)
-
-        if settings.fake_payment_enabled and self.http_client:
-            payment_response = await self.http_client.post(
-                "http://localhost:8000/_fake_payments",
-                json={"order_id": order_id, "amount": total},
-            )
-            payment_response.raise_for_status()
-            payment_data = payment_response.json()
-            payment_id = payment_data["payment_id"]
-
-            logger.info(f"Payment initiated: {payment_id} for order {order_id}")
+            attempts = event.attempts + 1
 
-            await asyncio.sleep(1)
+            if attempts >= handler.max_attempts:
+                logger.error(
+                    f"Event {event.id} moved to dead letter queue after "
+                    f"{attempts} attempts: {e!r}"
+                )
+                return OutboxStatus.DEAD, attempts, event.next_attempt_at
 
-            success = random.random() < settings.fake_payment_success_rate
-            payment_status = "success" if success else "failed"
+            delay = handler.retry_delay(attempts)
 
-            logger.info(
-                f"Simulating payment webhook: payment_id={payment_id}, "
-                f"order_id={order_id}, status={payment_status}"
+            logger.warning(
+                f"Event {event.id} retry scheduled in {delay}s "
+                f"(attempt {attempts}/{handler.max_attempts}): {e!r}"
             )
-
-            webhook_response = await self.http_client.post(
-                "http://localhost:8000/payments/callback",
-                json={
-                    "payment_id": payment_id,
-                    "order_id": order_id,
-                    "status": payment_status,
-                },
+            return (
+                OutboxStatus.PENDING,
+                attempts,
+                datetime.now(timezone.utc) + timedelta(seconds=delay),
             )
-            webhook_response.raise_for_status()
-
-        else:
-            logger.warning("Fake payment service is disabled, skipping payment call")
 
 
 outbox_worker = OutboxWorker()
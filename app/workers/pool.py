@@ -0,0 +1,182 @@
+"""Standalone pool of outbox worker processes with a health endpoint."""
+import asyncio
+import json
+import multiprocessing
+import signal
+import time
+from multiprocessing.process import BaseProcess
+
+from app.core.config import settings
+from app.core.logging_config import get_logger, setup_logging
+from app.workers.idempotency_purger import idempotency_purger
+from app.workers.outbox_archiver import outbox_archiver
+from app.workers.outbox_worker import OutboxWorker
+
+logger = get_logger(__name__)
+
+
+def run_worker_process(concurrency: int | None) -> None:
+    """Entry point of one worker process: run an outbox worker until SIGTERM/SIGINT."""
+    setup_logging()
+    asyncio.run(_serve_worker(concurrency))
+
+
+async def _serve_worker(concurrency: int | None) -> None:
+    worker = OutboxWorker(concurrency=concurrency)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        # stop() lets the worker drain its in-flight events before start() returns
+        loop.add_signal_handler(sig, lambda: asyncio.ensure_future(worker.stop()))
+
+    await worker.start()
+
+
+class OutboxWorkerPool:
+    """
+    Supervisor running outbox workers in separate processes.
+
+    Workers claim events with leases, so any number of processes on any number
+    of nodes can run side by side. The supervisor restarts processes that exit
+    unexpectedly, backing off exponentially while the same process keeps
+    crashing, forwards SIGTERM/SIGINT so they drain in-flight events, and
+    serves `GET /healthz` reporting how many processes are alive. The
+    supervisor itself runs the idempotency key purger and the outbox archiver,
+    which advisory locks keep to one instance across pools and API processes.
+    """
+
+    def __init__(
+        self,
+        processes: int | None = None,
+        concurrency: int | None = None,
+        health_port: int | None = None,
+    ):
+        self.processes = processes or settings.outbox_worker_processes
+        self.concurrency = concurrency
+        self.health_port = health_port or settings.outbox_worker_health_port
+        self._context = multiprocessing.get_context("spawn")
+        self._children: list[BaseProcess] = []
+        self._started_at: list[float] = []
+        self._crashes: list[int] = []
+        self._restart_at: list[float | None] = []
+        self._stopping = asyncio.Event()
+
+    async def run(self) -> None:
+        """Start the workers and supervise them until asked to stop."""
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, self._stopping.set)
+
+        self._children = [self._spawn() for _ in range(self.processes)]
+        self._started_at = [time.monotonic()] * self.processes
+        self._crashes = [0] * self.processes
+        self._restart_at = [None] * self.processes
+        maintenance = [
+            asyncio.create_task(idempotency_purger.start()),
+            asyncio.create_task(outbox_archiver.start()),
+        ]
+        server = await asyncio.start_server(self._handle_health, "0.0.0.0", self.health_port)
+        logger.info(
+            f"Outbox worker pool started: {self.processes} processes, "
+            f"health on port {self.health_port}"
+        )
+
+        try:
+            while not self._stopping.is_set():
+                self._supervise()
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=1)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            server.close()
+            await server.wait_closed()
+            await idempotency_purger.stop()
+            await outbox_archiver.stop()
+            for task in maintenance:
+                task.cancel()
+            await asyncio.gather(*maintenance, return_exceptions=True)
+            await self._stop_children()
+            logger.info("Outbox worker pool stopped")
+
+    def _supervise(self) -> None:
+        """Restart exited processes once their backoff delay has passed."""
+        now = time.monotonic()
+        max_delay = settings.outbox_worker_restart_backoff_max_seconds
+        for index, child in enumerate(self._children):
+            if child.is_alive():
+                # A process that outlived the longest delay is considered stable
+                if now - self._started_at[index] >= max_delay:
+                    self._crashes[index] = 0
+                continue
+
+            restart_at = self._restart_at[index]
+            if restart_at is None:
+                delay = settings.outbox_worker_restart_backoff_seconds * 2 ** self._crashes[index]
+                if delay < max_delay:
+                    self._crashes[index] += 1
+                else:
+                    delay = max_delay
+                self._restart_at[index] = now + delay
+                logger.error(
+                    f"Outbox worker process {child.pid} exited with {child.exitcode}, "
+                    f"restarting in {delay:.1f}s"
+                )
+            elif now >= restart_at:
+                self._children[index] = self._spawn()
+                self._started_at[index] = now
+                self._restart_at[index] = None
+
+    def _spawn(self) -> BaseProcess:
+        child = self._context.Process(
+            target=run_worker_process, args=(self.concurrency,), daemon=False
+        )
+        child.start()
+        return child
+
+    async def _stop_children(self) -> None:
+        """Ask every process to drain, killing those that outlive the drain timeout."""
+        for child in self._children:
+            if child.is_alive():
+                child.terminate()
+
+        deadline = settings.outbox_drain_timeout_seconds + 5
+        loop = asyncio.get_running_loop()
+        for child in self._children:
+            await loop.run_in_executor(None, child.join, deadline)
+            if child.is_alive():
+                logger.error(f"Outbox worker process {child.pid} did not drain in time, killing")
+                child.kill()
+                await loop.run_in_executor(None, child.join)
+
+    def health(self) -> tuple[bool, dict[str, object]]:
+        """Report whether every worker process is alive."""
+        alive = sum(child.is_alive() for child in self._children)
+        healthy = not self._stopping.is_set() and alive == self.processes
+        return healthy, {
+            "status": "healthy" if healthy else "unhealthy",
+            "processes": self.processes,
+            "alive": alive,
+        }
+
+    async def _handle_health(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+            parts = request_line.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1] == "/healthz":
+                healthy, report = self.health()
+                status = "200 OK" if healthy else "503 Service Unavailable"
+                body = json.dumps(report).encode()
+            else:
+                status, body = "404 Not Found", b'{"detail": "Not Found"}'
+
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except Exception as e:
+            logger.warning(f"Outbox worker health request failed: {e}")
+        finally:
+            writer.close()
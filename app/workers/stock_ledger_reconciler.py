@@ -0,0 +1,112 @@
+"""Reconciler keeping the Redis stock ledger in line with PostgreSQL."""
+import asyncio
+import uuid
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.logging_config import get_logger
+from app.core.metrics import stock_ledger_repairs_total
+from app.core.stock_ledger import stock_ledger
+from app.db import AsyncSessionLocal
+from app.repositories.product_repository import ProductRepository
+
+logger = get_logger(__name__)
+
+
+class StockLedgerReconciler:
+    """Worker that seeds the Redis stock ledger and repairs drift."""
+
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession] = AsyncSessionLocal):
+        self.running = False
+        self.session_factory = session_factory
+        self._suspects: set[uuid.UUID] = set()
+
+    async def start(self) -> None:
+        """Seed the ledger from PostgreSQL, then periodically repair drift."""
+        self.running = True
+        logger.info("Stock ledger reconciler started")
+
+        full_reseed = True
+        while self.running:
+            try:
+                repaired = await self.reconcile(full_reseed=full_reseed)
+                if repaired:
+                    logger.info(f"Stock ledger reconciled: {repaired} entries updated")
+                full_reseed = False
+            except Exception as e:
+                logger.error(f"Stock ledger reconciliation failed: {e}")
+
+            await asyncio.sleep(settings.stock_ledger_reconcile_interval_seconds)
+
+    async def stop(self) -> None:
+        """Stop the reconciler."""
+        self.running = False
+        logger.info("Stock ledger reconciler stopped")
+
+    async def reconcile(self, full_reseed: bool = False) -> int:
+        """
+        Compare the ledger with PostgreSQL in batches and overwrite drifted entries.
+
+        Missing entries are seeded immediately. A differing value may just be an
+        order between its Redis hold and its database commit, so it is only
+        overwritten when the same product differs on two consecutive passes, and
+        only if the entry still holds the value compared: an order holding or
+        releasing stock meanwhile is not clobbered by the database snapshot.
+        Inactive products are removed so their orders reach the database and get
+        the usual "not active" error.
+
+        Returns:
+            int: number of ledger entries written
+        """
+        repaired = 0
+        suspects: set[uuid.UUID] = set()
+        after_id: uuid.UUID | None = None
+
+        async with self.session_factory() as session:
+            repo = ProductRepository(session)
+
+            while True:
+                rows = await repo.get_available_stock(
+                    after_id=after_id, limit=settings.stock_ledger_reconcile_batch_size
+                )
+                if not rows:
+                    break
+                after_id = rows[-1][0]
+
+                expected: dict[uuid.UUID, int | None] = {
+                    product_id: available if is_active else None
+                    for product_id, is_active, available in rows
+                }
+
+                if full_reseed:
+                    await stock_ledger.set_levels(expected)
+                    stock_ledger_repairs_total.labels(reason="startup").inc(len(expected))
+                    repaired += len(expected)
+                    continue
+
+                current = await stock_ledger.get_levels(list(expected))
+                repairs: dict[uuid.UUID, tuple[int | None, int | None]] = {}
+                reasons: dict[uuid.UUID, str] = {}
+
+                for product_id, value in expected.items():
+                    if current[product_id] == value:
+                        continue
+                    if current[product_id] is None:
+                        reasons[product_id] = "missing"
+                    elif product_id in self._suspects:
+                        reasons[product_id] = "drift"
+                    else:
+                        suspects.add(product_id)
+                        continue
+                    repairs[product_id] = (current[product_id], value)
+
+                for product_id in await stock_ledger.repair_levels(repairs):
+                    stock_ledger_repairs_total.labels(reason=reasons[product_id]).inc()
+                    repaired += 1
+
+        self._suspects = suspects
+        return repaired
+
+
+stock_ledger_reconciler = StockLedgerReconciler()
@@ -0,0 +1,84 @@
+"""Test the circuit breaker around payment provider calls."""
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.circuit_breaker import (
+    CircuitBreaker,
+    CircuitOpenError,
+    CircuitState,
+    is_upstream_failure,
+)
+
+
+def make_breaker(open_seconds: float = 0.1) -> CircuitBreaker:
+    return CircuitBreaker(
+        "test",
+        failure_rate=0.5,
+        window_size=4,
+        min_calls=4,
+        open_seconds=open_seconds,
+        max_open_seconds=1,
+        half_open_max_calls=2,
+    )
+
+
+@pytest.mark.asyncio
+async def test_breaker_opens_on_failure_rate_and_recovers():
+    """Test the breaker opens past the failure rate, rejects calls, then closes after trials."""
+    breaker = make_breaker()
+
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_success()
+    assert breaker.state == CircuitState.CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+    assert breaker.available_calls() == 0
+    assert 0 < breaker.seconds_until_retry() <= 0.1
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    await asyncio.sleep(0.15)
+    assert breaker.state == CircuitState.HALF_OPEN
+    assert breaker.available_calls() == 2
+
+    breaker.before_call()
+    breaker.before_call()
+    assert breaker.available_calls() == 0
+    breaker.record_success()
+    breaker.record_success()
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.available_calls() is None
+
+
+@pytest.mark.asyncio
+async def test_failed_trial_reopens_for_longer():
+    """Test a failed half-open trial re-opens the circuit for twice as long."""
+    breaker = make_breaker(open_seconds=0.1)
+    for _ in range(4):
+        breaker.record_failure()
+    await asyncio.sleep(0.15)
+
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+    assert breaker.seconds_until_retry() > 0.15
+
+
+def test_only_upstream_errors_count_as_failures():
+    """Test 5xx, 429, timeouts and transport errors count against the provider, 4xx do not."""
+    request = httpx.Request("POST", "http://payments/_fake_payments")
+
+    def status_error(status_code: int) -> httpx.HTTPStatusError:
+        response = httpx.Response(status_code, request=request)
+        return httpx.HTTPStatusError("error", request=request, response=response)
+
+    assert is_upstream_failure(status_error(503))
+    assert is_upstream_failure(status_error(429))
+    assert not is_upstream_failure(status_error(400))
+    assert is_upstream_failure(httpx.ConnectError("refused", request=request))
+    assert is_upstream_failure(asyncio.TimeoutError())
+    assert not is_upstream_failure(KeyError("payment_id"))
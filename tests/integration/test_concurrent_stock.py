@@ -4,9 +4,19 @@ import uuid
 
 import pytest
 from httpx import AsyncClient
+from prometheus_client import REGISTRY
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
+from app.core.idempotency_cache import idempotency_cache
+from app.db.retry import retry_on_db_conflict
 from app.models.product import Product
+from app.repositories.idempotency_repository import IdempotencyRepository
+from app.schemas.order import OrderCreate, OrderItemCreate
+from app.services.order_group_commit import OrderGroupCommitter
+from app.services.order_service import OrderService
+from tests.conftest import TestSessionLocal
 
 
 @pytest.mark.asyncio
@@ -47,3 +57,183 @@ async def test_concurrent_stock_reservation(client: AsyncClient, db_session: Asy
 
 
 
+
+
+@pytest.mark.asyncio
+async def test_conditional_update_reservation(
+    client: AsyncClient, db_session: AsyncSession, monkeypatch: pytest.MonkeyPatch
+):
+    """Test guarded single-statement reservation rejects orders beyond available stock."""
+    monkeypatch.setattr(settings, "stock_reservation_mode", "conditional_update")
+
+    product = Product(name="Flash Sale Item", price=50.00, stock=3, is_active=True)
+    db_session.add(product)
+    await db_session.commit()
+    await db_session.refresh(product)
+
+    order_data = {
+        "user_email": "test@example.com",
+        "items": [{"product_id": str(product.id), "quantity": 2}],
+    }
+
+    response1 = await client.post(
+        "/orders", json=order_data, headers={"Idempotency-Key": str(uuid.uuid4())}
+    )
+    assert response1.status_code == 201
+    assert float(response1.json()["items_total"]) == 100.00
+
+    response2 = await client.post(
+        "/orders", json=order_data, headers={"Idempotency-Key": str(uuid.uuid4())}
+    )
+    assert response2.status_code == 409
+    assert "Insufficient stock" in response2.json()["detail"]
+
+    await db_session.refresh(product)
+    assert product.stock == 1
+
+    response3 = await client.post(f"/orders/{response1.json()['id']}/cancel")
+    assert response3.status_code == 200
+
+    await db_session.refresh(product)
+    assert product.stock == 3
+
+
+@pytest.mark.asyncio
+async def test_concurrent_multi_item_orders_do_not_deadlock(db_session: AsyncSession):
+    """Test that orders locking the same products in opposite item order all succeed."""
+    product_a = Product(name="Product A", price=10.00, stock=100, is_active=True)
+    product_b = Product(name="Product B", price=20.00, stock=100, is_active=True)
+    db_session.add_all([product_a, product_b])
+    await db_session.commit()
+
+    async def place_order(index: int) -> None:
+        pair = [product_a.id, product_b.id]
+        if index % 2:
+            pair.reverse()
+        order_data = OrderCreate(
+            user_email="test@example.com",
+            items=[OrderItemCreate(product_id=product_id, quantity=1) for product_id in pair],
+        )
+        async with TestSessionLocal() as session:
+            await OrderService(session).create_order(order_data, str(uuid.uuid4()))
+
+    await asyncio.gather(*(place_order(i) for i in range(20)))
+
+    await db_session.refresh(product_a)
+    await db_session.refresh(product_b)
+    assert product_a.stock == 80
+    assert product_b.stock == 80
+
+
+@pytest.mark.asyncio
+async def test_retry_on_deadlock(monkeypatch: pytest.MonkeyPatch):
+    """Test that a unit of work aborted by the deadlock detector is re-run."""
+    monkeypatch.setattr(settings, "db_retry_base_delay_seconds", 0)
+
+    class DeadlockError(Exception):
+        sqlstate = "40P01"
+
+    class FakeSession:
+        rollbacks = 0
+
+        async def rollback(self) -> None:
+            self.rollbacks += 1
+
+    class UnitOfWork:
+        def __init__(self) -> None:
+            self.session = FakeSession()
+            self.calls = 0
+
+        @retry_on_db_conflict("test")
+        async def run(self) -> str:
+            self.calls += 1
+            if self.calls == 1:
+                raise DBAPIError("UPDATE products", {}, DeadlockError())
+            return "done"
+
+    unit = UnitOfWork()
+    assert await unit.run() == "done"
+    assert unit.calls == 2
+    assert unit.session.rollbacks == 1
+
+
+@pytest.mark.asyncio
+async def test_group_commit_allocates_in_arrival_order(db_session: AsyncSession):
+    """Test that concurrent orders for one product are merged into a single commit."""
+    product = Product(name="Group Commit Item", price=10.00, stock=7, is_active=True)
+    db_session.add(product)
+    await db_session.commit()
+    await db_session.refresh(product)
+
+    committer = OrderGroupCommitter(TestSessionLocal)
+    groups_before = REGISTRY.get_sample_value("order_group_commit_size_count") or 0
+    order_data = OrderCreate(
+        user_email="test@example.com",
+        items=[OrderItemCreate(product_id=product.id, quantity=1)],
+    )
+
+    results = await asyncio.gather(
+        *(committer.submit(order_data, str(uuid.uuid4())) for _ in range(10)),
+        return_exceptions=True,
+    )
+
+    created = [r for r in results if not isinstance(r, Exception)]
+    failed = [r for r in results if isinstance(r, ValueError)]
+    assert len(created) == 7
+    assert len(failed) == 3
+    assert all("Insufficient stock" in str(e) for e in failed)
+    # Stock went to the first requests to arrive
+    assert all(not isinstance(r, Exception) for r in results[:7])
+    assert REGISTRY.get_sample_value("order_group_commit_size_count") == groups_before + 1
+
+    await db_session.refresh(product)
+    assert product.stock == 0
+
+
+@pytest.mark.asyncio
+async def test_group_commit_replays_stored_responses(db_session: AsyncSession):
+    """Test group-committed keys replay their stored bytes and wait for in-flight claims."""
+    product = Product(name="Group Replay Item", price=10.00, stock=5, is_active=True)
+    db_session.add(product)
+    await db_session.commit()
+
+    committer = OrderGroupCommitter(TestSessionLocal)
+    order_data = OrderCreate(
+        user_email="test@example.com",
+        items=[OrderItemCreate(product_id=product.id, quantity=1)],
+    )
+
+    key = str(uuid.uuid4())
+    (first, created_duplicate), (second, is_duplicate) = await asyncio.gather(
+        committer.submit(order_data, key), committer.submit(order_data, key)
+    )
+    assert not created_duplicate and is_duplicate
+    assert second.body == first.body
+
+    stored = await IdempotencyRepository(db_session).get_by_key(key)
+    assert stored is not None
+    assert stored.response_body == first.body
+
+    idempotency_cache.clear()
+    replay, is_duplicate = await committer.submit(order_data, key)
+    assert is_duplicate
+    assert replay.body == first.body
+
+    # A duplicate of a request still in flight waits for its response
+    pending_key = str(uuid.uuid4())
+    order_id = uuid.uuid4()
+    claims = IdempotencyRepository(db_session)
+    assert await claims.claim(
+        pending_key, OrderService._compute_request_hash(order_data), order_id, lease_seconds=60
+    )
+    await db_session.commit()
+
+    waiting = asyncio.create_task(committer.submit(order_data, pending_key))
+    await asyncio.sleep(0.2)
+    assert not waiting.done()
+    assert await claims.complete(pending_key, order_id, 201, b'{"id": "in-flight"}')
+    await db_session.commit()
+
+    response, is_duplicate = await asyncio.wait_for(waiting, timeout=5)
+    assert is_duplicate
+    assert response.body == b'{"id": "in-flight"}'
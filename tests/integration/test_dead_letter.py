@@ -0,0 +1,169 @@
+"""Test dead-letter inspection and replay."""
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.outbox import Outbox, OutboxStatus
+from app.repositories.outbox_repository import OutboxRepository
+
+ADMIN_HEADERS = {"X-Admin-Secret": settings.admin_secret}
+
+
+async def create_dead_events(db_session: AsyncSession, event_type: str, count: int) -> list[Outbox]:
+    """Create `count` dead events of `event_type`, one minute apart, oldest first."""
+    events = []
+    for _ in range(count):
+        order_id = uuid.uuid4()
+        events.append(
+            Outbox(
+                event_type=event_type,
+                partition_key=str(order_id),
+                payload_json={"order_id": str(order_id)},
+                status=OutboxStatus.DEAD.value,
+                attempts=5,
+                next_attempt_at=datetime.now(timezone.utc),
+            )
+        )
+    await OutboxRepository(db_session).create_many(events)
+    await db_session.commit()
+
+    now = datetime.now(timezone.utc)
+    for age, event in enumerate(reversed(events)):
+        await db_session.execute(
+            update(Outbox)
+            .where(Outbox.id == event.id)
+            .values(created_at=now - timedelta(minutes=age + 1))
+        )
+    await db_session.commit()
+    return events
+
+
+@pytest.mark.asyncio
+async def test_dead_events_are_paged_newest_first(client: AsyncClient, db_session: AsyncSession):
+    """Test keyset pages cover every dead event of a type exactly once."""
+    events = await create_dead_events(db_session, "order.created", 5)
+    await create_dead_events(db_session, "test.other", 2)
+
+    seen: list[str] = []
+    cursor = None
+    while True:
+        params = {"event_type": "order.created", "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = await client.get("/admin/outbox/dead", params=params, headers=ADMIN_HEADERS)
+        assert response.status_code == 200
+        page = response.json()
+        seen += [item["id"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == [str(event.id) for event in reversed(events)]
+
+    response = await client.get(
+        "/admin/outbox/dead", params={"cursor": "not-a-cursor"}, headers=ADMIN_HEADERS
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_dead_events_are_requeued_with_spread(client: AsyncClient, db_session: AsyncSession):
+    """Test a replay by filter resets attempts and spreads next attempts over the window."""
+    events = await create_dead_events(db_session, "order.created", 3)
+    other = await create_dead_events(db_session, "test.other", 1)
+
+    started = datetime.now(timezone.utc)
+    response = await client.post(
+        "/admin/outbox/dead/replay",
+        json={"event_type": "order.created", "spread_seconds": 60},
+        headers=ADMIN_HEADERS,
+    )
+    assert response.status_code == 200
+    assert response.json() == {"requeued": 3}
+
+    db_session.expire_all()
+    for event in events:
+        await db_session.refresh(event)
+        assert event.status == OutboxStatus.PENDING.value
+        assert event.attempts == 0
+        assert started - timedelta(seconds=1) <= event.next_attempt_at
+        assert event.next_attempt_at <= started + timedelta(seconds=61)
+    await db_session.refresh(other[0])
+    assert other[0].status == OutboxStatus.DEAD.value
+
+    response = await client.post(
+        "/admin/outbox/dead/replay",
+        json={"event_ids": [str(other[0].id)]},
+        headers=ADMIN_HEADERS,
+    )
+    assert response.json() == {"requeued": 1}
+
+
+@pytest.mark.asyncio
+async def test_dead_events_are_found_by_payload(client: AsyncClient, db_session: AsyncSession):
+    """Test dead events can be listed and requeued by payload containment."""
+    events = await create_dead_events(db_session, "order.created", 3)
+    target = events[1]
+    payload = {"order_id": target.partition_key}
+
+    response = await client.get(
+        "/admin/outbox/dead",
+        params={"payload": json.dumps(payload)},
+        headers=ADMIN_HEADERS,
+    )
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert [item["id"] for item in items] == [str(target.id)]
+    assert items[0]["payload_json"] == payload
+
+    response = await client.get(
+        "/admin/outbox/dead", params={"payload": "[1, 2]"}, headers=ADMIN_HEADERS
+    )
+    assert response.status_code == 400
+
+    response = await client.post(
+        "/admin/outbox/dead/replay",
+        json={"payload_contains": payload},
+        headers=ADMIN_HEADERS,
+    )
+    assert response.json() == {"requeued": 1}
+
+    db_session.expire_all()
+    for event in events:
+        await db_session.refresh(event)
+    assert [event.status for event in events] == [
+        OutboxStatus.DEAD.value,
+        OutboxStatus.PENDING.value,
+        OutboxStatus.DEAD.value,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_full_replay_requires_all(client: AsyncClient, db_session: AsyncSession):
+    """Test a replay without ids or filters is rejected unless `all` is set explicitly."""
+    events = await create_dead_events(db_session, "order.created", 2)
+
+    response = await client.post("/admin/outbox/dead/replay", json={}, headers=ADMIN_HEADERS)
+    assert response.status_code == 422
+    response = await client.post(
+        "/admin/outbox/dead/replay",
+        json={"all": True, "event_type": "order.created"},
+        headers=ADMIN_HEADERS,
+    )
+    assert response.status_code == 422
+
+    db_session.expire_all()
+    for event in events:
+        await db_session.refresh(event)
+        assert event.status == OutboxStatus.DEAD.value
+
+    response = await client.post(
+        "/admin/outbox/dead/replay", json={"all": True}, headers=ADMIN_HEADERS
+    )
+    assert response.json() == {"requeued": 2}
@@ -0,0 +1,48 @@
+"""Test the in-process delayed task scheduler."""
+import asyncio
+
+import pytest
+
+from app.core.scheduler import DelayedTaskScheduler
+
+
+@pytest.mark.asyncio
+async def test_jobs_run_in_deadline_order_without_blocking():
+    """Test jobs fire after their delays, earliest first, and scheduling returns at once."""
+    scheduler = DelayedTaskScheduler("test")
+    fired: list[str] = []
+
+    def record(name: str):
+        async def job() -> None:
+            fired.append(name)
+
+        return job
+
+    scheduler.schedule(0.2, record("late"))
+    scheduler.schedule(0.05, record("early"))
+    scheduler.schedule(0.1, record("middle"))
+    assert scheduler.pending == 3
+    assert fired == []
+
+    await asyncio.sleep(0.3)
+    assert fired == ["early", "middle", "late"]
+    assert scheduler.pending == 0
+
+    await scheduler.close(timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_close_drops_jobs_past_the_timeout():
+    """Test close waits for due jobs and drops those scheduled beyond the timeout."""
+    scheduler = DelayedTaskScheduler("test")
+    fired: list[str] = []
+
+    async def job() -> None:
+        fired.append("job")
+
+    scheduler.schedule(0.05, job)
+    scheduler.schedule(10, job)
+    await scheduler.close(timeout=0.2)
+
+    assert fired == ["job"]
+    assert scheduler.pending == 0
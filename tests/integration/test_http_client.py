@@ -0,0 +1,31 @@
+"""Test the payment provider HTTP client transport."""
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.http_client import HostLimitedTransport
+
+
+@pytest.mark.asyncio
+async def test_requests_are_capped_per_host():
+    """Test no more than the per-host limit of requests to one host are in flight."""
+    in_flight = {"a.test": 0, "b.test": 0}
+    peak = {"a.test": 0, "b.test": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        in_flight[host] += 1
+        peak[host] = max(peak[host], in_flight[host])
+        await asyncio.sleep(0.02)
+        in_flight[host] -= 1
+        return httpx.Response(200, json={"ok": True})
+
+    transport = HostLimitedTransport(httpx.MockTransport(handler), per_host_limit=2)
+    async with httpx.AsyncClient(transport=transport) as client:
+        responses = await asyncio.gather(
+            *(client.post(f"http://{host}/pay") for host in ["a.test", "b.test"] * 5)
+        )
+
+    assert all(response.json() == {"ok": True} for response in responses)
+    assert peak == {"a.test": 2, "b.test": 2}
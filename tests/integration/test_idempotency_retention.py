@@ -0,0 +1,131 @@
+"""Test idempotency key retention and purging."""
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import func, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.locks import try_advisory_lock
+from app.db.partitions import (
+    day_bounds,
+    drop_partitions_before,
+    ensure_daily_partitions,
+    is_partitioned,
+    list_partitions,
+    partition_name,
+)
+from app.models.idempotency import IdempotencyKey
+from app.repositories.idempotency_repository import IdempotencyRepository
+from app.workers.idempotency_purger import IdempotencyPurger
+from tests.conftest import TestSessionLocal, partition_by_day, test_engine
+
+
+@pytest.mark.asyncio
+async def test_expired_keys_are_absent_and_reclaimable(db_session: AsyncSession):
+    """Test expired keys are ignored by lookups, can be claimed again and are purged."""
+    repo = IdempotencyRepository(db_session)
+    key = str(uuid.uuid4())
+
+    assert await repo.claim(key, "hash", uuid.uuid4(), lease_seconds=30)
+    assert not await repo.claim(key, "hash", uuid.uuid4(), lease_seconds=30)
+    await db_session.commit()
+
+    # Age the key past the retention period
+    await db_session.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.key == key)
+        .values(created_at=func.now() - timedelta(days=30))
+    )
+    await db_session.commit()
+
+    assert await repo.get_by_key(key) is None
+    assert await repo.claim(key, "hash", uuid.uuid4(), lease_seconds=30)
+    await db_session.commit()
+
+    await IdempotencyPurger(session_factory=TestSessionLocal).purge()
+
+    result = await db_session.execute(
+        select(func.count()).select_from(IdempotencyKey).where(IdempotencyKey.key == key)
+    )
+    assert result.scalar_one() == 1
+    assert await repo.get_by_key(key) is not None
+
+
+@pytest.mark.asyncio
+async def test_daily_partitions_are_created_and_dropped(db_session: AsyncSession):
+    """Test the partition helpers on a scratch partitioned table."""
+    table = "partition_test"
+    await db_session.execute(text(f"DROP TABLE IF EXISTS {table}"))
+    await db_session.execute(
+        text(f"CREATE TABLE {table} (created_at TIMESTAMPTZ NOT NULL) PARTITION BY RANGE (created_at)")
+    )
+
+    try:
+        today = datetime.now(timezone.utc).date()
+        await ensure_daily_partitions(db_session, table, today - timedelta(days=3), days=5)
+        await ensure_daily_partitions(db_session, table, today, days=2)
+        assert await is_partitioned(db_session, table)
+        assert len(await list_partitions(db_session, table)) == 5
+
+        cutoff = datetime.now(timezone.utc) - timedelta(days=1)
+        dropped = await drop_partitions_before(db_session, table, cutoff)
+        assert sorted(dropped) == [
+            partition_name(table, today - timedelta(days=3)),
+            partition_name(table, today - timedelta(days=2)),
+        ]
+        assert await list_partitions(db_session, table) == [
+            partition_name(table, today - timedelta(days=1)),
+            partition_name(table, today),
+            partition_name(table, today + timedelta(days=1)),
+        ]
+    finally:
+        await db_session.execute(text(f"DROP TABLE IF EXISTS {table}"))
+        await db_session.commit()
+
+
+@pytest.mark.asyncio
+async def test_partitioned_keys_are_dropped_not_deleted(db_session: AsyncSession):
+    """Test expired keys in daily partitions wait for the drop; only the default one is purged."""
+    await partition_by_day(db_session, "idempotency_keys")
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.idempotency_key_retention_hours)
+    cutoff_day = cutoff.date()
+    await ensure_daily_partitions(db_session, "idempotency_keys", cutoff_day - timedelta(days=1), 2)
+    await db_session.commit()
+
+    keys = {
+        # Partition wholly past the retention period: dropped
+        "dropped": day_bounds(cutoff_day - timedelta(days=1))[0],
+        # Expired, but its partition still holds live keys: kept until the drop
+        "waiting": day_bounds(cutoff_day)[0],
+        # Outside the daily partitions, in the default one: deleted
+        "deleted": cutoff - timedelta(days=10),
+    }
+    for key, created_at in keys.items():
+        await db_session.execute(
+            text(
+                "INSERT INTO idempotency_keys (key, request_hash, order_id, created_at) "
+                "VALUES (:key, 'hash', :order_id, :created_at)"
+            ),
+            {"key": key, "order_id": uuid.uuid4(), "created_at": created_at},
+        )
+    await db_session.commit()
+
+    await IdempotencyPurger(session_factory=TestSessionLocal).purge()
+
+    result = await db_session.execute(text("SELECT key FROM idempotency_keys"))
+    assert result.scalars().all() == ["waiting"]
+    assert partition_name("idempotency_keys", cutoff_day - timedelta(days=1)) not in (
+        await list_partitions(db_session, "idempotency_keys")
+    )
+
+
+@pytest.mark.asyncio
+async def test_advisory_lock_admits_one_holder():
+    """Test the purge lock is taken by one holder at a time and released after the block."""
+    async with try_advisory_lock(test_engine, "idempotency_purger") as first:
+        async with try_advisory_lock(test_engine, "idempotency_purger") as second:
+            assert first and not second
+    async with try_advisory_lock(test_engine, "idempotency_purger") as again:
+        assert again
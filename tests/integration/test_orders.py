@@ -1,11 +1,23 @@
 """Integration tests for order creation and idempotency."""
+import asyncio
 import uuid
+from datetime import timedelta
 
 import pytest
 from httpx import AsyncClient
+from sqlalchemy import func, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core import rate_limiter
+from app.core.config import settings
+from app.core.idempotency_cache import IdempotencyCache, StoredResponse, idempotency_cache
+from app.models.idempotency import IdempotencyKey, IdempotencyStatus
+from app.models.order import Order
 from app.models.product import Product
+from app.repositories.idempotency_repository import IdempotencyRepository
+from app.schemas.order import OrderCreate, OrderItemCreate
+from app.services.order_service import OrderService
+from tests.conftest import TestSessionLocal
 
 
 @pytest.mark.asyncio
@@ -140,3 +152,247 @@ async def test_cancel_order_restores_stock(client: AsyncClient, db_session: Asyn
 
 
 
+
+
+@pytest.mark.asyncio
+async def test_create_orders_batch(client: AsyncClient, db_session: AsyncSession):
+    """Test batch order creation with per-order outcomes."""
+    product1 = Product(name="Product 1", price=10.00, stock=5, is_active=True)
+    product2 = Product(name="Product 2", price=20.00, stock=5, is_active=True)
+    db_session.add_all([product1, product2])
+    await db_session.commit()
+    await db_session.refresh(product1)
+    await db_session.refresh(product2)
+
+    # An order created earlier through the single-order endpoint
+    existing_key = str(uuid.uuid4())
+    existing_order = {
+        "user_email": "test@example.com",
+        "items": [{"product_id": str(product1.id), "quantity": 1}],
+    }
+    response = await client.post(
+        "/orders", json=existing_order, headers={"Idempotency-Key": existing_key}
+    )
+    assert response.status_code == 201
+    existing_id = response.json()["id"]
+
+    key1 = str(uuid.uuid4())
+    batch = {
+        "orders": [
+            {
+                "idempotency_key": key1,
+                "user_email": "b2b@example.com",
+                "items": [
+                    {"product_id": str(product1.id), "quantity": 2},
+                    {"product_id": str(product2.id), "quantity": 1},
+                ],
+            },
+            {
+                "idempotency_key": str(uuid.uuid4()),
+                "user_email": "b2b@example.com",
+                "items": [{"product_id": str(product1.id), "quantity": 5}],
+            },
+            {"idempotency_key": existing_key, **existing_order},
+            {
+                "idempotency_key": key1,
+                "user_email": "b2b@example.com",
+                "items": [
+                    {"product_id": str(product1.id), "quantity": 2},
+                    {"product_id": str(product2.id), "quantity": 1},
+                ],
+            },
+            {
+                "idempotency_key": str(uuid.uuid4()),
+                "user_email": "b2b@example.com",
+                "items": [{"product_id": str(product2.id), "quantity": 4}],
+            },
+        ]
+    }
+
+    response = await client.post("/orders/batch", json=batch)
+    assert response.status_code == 200
+    results = response.json()["results"]
+
+    assert [r["status_code"] for r in results] == [201, 409, 201, 201, 201]
+    assert float(results[0]["order"]["items_total"]) == 40.00
+    assert len(results[0]["order"]["items"]) == 2
+    assert "Insufficient stock" in results[1]["error"]
+    assert results[2]["order"]["id"] == existing_id
+    assert results[3]["order"]["id"] == results[0]["order"]["id"]
+
+    await db_session.refresh(product1)
+    await db_session.refresh(product2)
+    assert product1.stock == 2  # 5 - 1 (existing) - 2
+    assert product2.stock == 0  # 5 - 1 - 4
+
+    # Replaying the whole batch creates nothing new
+    response = await client.post("/orders/batch", json=batch)
+    replay = response.json()["results"]
+    assert [r["status_code"] for r in replay] == [201, 409, 201, 201, 201]
+    assert replay[0]["order"]["id"] == results[0]["order"]["id"]
+    await db_session.refresh(product1)
+    assert product1.stock == 2
+
+
+@pytest.mark.asyncio
+async def test_create_order_round_trips(client: AsyncClient, db_session: AsyncSession):
+    """Test order creation stays within a fixed number of database round trips."""
+    product = Product(name="Round Trip Product", price=10.00, stock=5, is_active=True)
+    db_session.add(product)
+    await db_session.commit()
+    await db_session.refresh(product)
+
+    order_data = {
+        "user_email": "test@example.com",
+        "items": [{"product_id": str(product.id), "quantity": 1}],
+    }
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+
+    response = await client.post("/orders", json=order_data, headers=headers)
+    assert response.status_code == 201
+    assert response.json()["created_at"] is not None
+    assert len(response.json()["items"]) == 1
+
+    # Claim: BEGIN, advisory lock, idempotency claim, COMMIT
+    # Order: BEGIN, product lock, order, stock update, items, claim completion,
+    # outbox event, COMMIT
+    assert int(response.headers["X-DB-Round-Trips"]) <= 12
+
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicates_replay_one_order(db_session: AsyncSession):
+    """Test concurrent requests with one idempotency key create a single order."""
+    product = Product(name="Retry Storm Product", price=10.00, stock=5, is_active=True)
+    db_session.add(product)
+    await db_session.commit()
+    await db_session.refresh(product)
+
+    order_data = OrderCreate(
+        user_email="test@example.com",
+        items=[OrderItemCreate(product_id=product.id, quantity=1)],
+    )
+    idempotency_key = str(uuid.uuid4())
+
+    async def place_order() -> tuple[Order, bool]:
+        async with TestSessionLocal() as session:
+            return await OrderService(session).create_order(order_data, idempotency_key)
+
+    results = await asyncio.gather(*(place_order() for _ in range(5)))
+
+    assert len({order.id for order, _ in results}) == 1
+    assert sorted(is_duplicate for _, is_duplicate in results) == [False, True, True, True, True]
+
+    await db_session.refresh(product)
+    assert product.stock == 4
+
+
+@pytest.mark.asyncio
+async def test_duplicate_of_pending_claim(db_session: AsyncSession, monkeypatch):
+    """Test a duplicate waits on a pending claim without touching products."""
+    monkeypatch.setattr(settings, "idempotency_wait_timeout_seconds", 0.2)
+
+    product = Product(name="Pending Claim Product", price=10.00, stock=5, is_active=True)
+    db_session.add(product)
+    await db_session.commit()
+    await db_session.refresh(product)
+
+    order_data = OrderCreate(
+        user_email="test@example.com",
+        items=[OrderItemCreate(product_id=product.id, quantity=1)],
+    )
+    service = OrderService(db_session)
+    idempotency_key = str(uuid.uuid4())
+    request_hash = service._compute_request_hash(order_data)
+
+    # Another request holds the key
+    assert await IdempotencyRepository(db_session).claim(
+        idempotency_key, request_hash, uuid.uuid4(), lease_seconds=60
+    )
+    await db_session.commit()
+
+    with pytest.raises(ValueError, match="Idempotency key in progress"):
+        await service.create_order(order_data, idempotency_key)
+
+    await db_session.refresh(product)
+    assert product.stock == 5
+
+    # Once the claim is abandoned, a retry takes it over and creates the order
+    await db_session.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.key == idempotency_key)
+        .values(claimed_until=func.now() - timedelta(seconds=1))
+    )
+    await db_session.commit()
+
+    order, is_duplicate = await service.create_order(order_data, idempotency_key)
+    assert not is_duplicate
+
+    key = await IdempotencyRepository(db_session).get_by_key(idempotency_key)
+    assert key.status == IdempotencyStatus.COMPLETED.value
+    assert key.order_id == order.id
+
+
+@pytest.mark.asyncio
+async def test_duplicate_replays_stored_response(client: AsyncClient, db_session: AsyncSession):
+    """Test duplicates replay the original response bytes from the cache or the key."""
+    product = Product(name="Replay Product", price=10.00, stock=5, is_active=True)
+    db_session.add(product)
+    await db_session.commit()
+    await db_session.refresh(product)
+
+    order_data = {
+        "user_email": "test@example.com",
+        "items": [{"product_id": str(product.id), "quantity": 1}],
+    }
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+
+    response1 = await client.post("/orders", json=order_data, headers=headers)
+    assert response1.status_code == 201
+
+    # Served from the in-process cache without touching the database
+    response2 = await client.post("/orders", json=order_data, headers=headers)
+    assert response2.status_code == 201
+    assert response2.content == response1.content
+    assert response2.headers["X-DB-Round-Trips"] == "0"
+
+    # Served from the snapshot stored with the idempotency key
+    idempotency_cache.clear()
+    if rate_limiter.redis_client is not None:
+        await rate_limiter.redis_client.delete(f"idempotency_response:{headers['Idempotency-Key']}")
+    response3 = await client.post("/orders", json=order_data, headers=headers)
+    assert response3.status_code == 201
+    assert response3.content == response1.content
+
+    # A different payload for a cached key is still a conflict
+    order_data["items"][0]["quantity"] = 2
+    response4 = await client.post("/orders", json=order_data, headers=headers)
+    assert response4.status_code == 409
+
+
+@pytest.mark.asyncio
+async def test_idempotency_cache_bounds(monkeypatch):
+    """Test the in-process replay cache evicts least recently used entries by size."""
+    monkeypatch.setattr(settings, "idempotency_cache_max_entries", 3)
+    monkeypatch.setattr(settings, "idempotency_cache_max_bytes", 10)
+    cache = IdempotencyCache()
+
+    cache._put_local("a", StoredResponse("h", 201, b"aaaa"))
+    cache._put_local("b", StoredResponse("h", 201, b"bbbb"))
+    assert list(cache._entries) == ["a", "b"]
+
+    # Over the byte budget: the oldest entry goes
+    cache._put_local("c", StoredResponse("h", 201, b"cccc"))
+    assert list(cache._entries) == ["b", "c"]
+    assert cache._size == 8
+
+    # Larger than the whole budget: never cached
+    cache._put_local("d", StoredResponse("h", 201, b"d" * 11))
+    assert "d" not in cache._entries
+
+    # Expired entries are dropped on lookup
+    monkeypatch.setattr(rate_limiter, "redis_client", None)
+    monkeypatch.setattr(settings, "idempotency_cache_ttl_seconds", -1)
+    cache._put_local("e", StoredResponse("h", 201, b"e"))
+    assert await cache.get("e") is None
+    assert "e" not in cache._entries
+    assert (await cache.get("c")).body == b"cccc"
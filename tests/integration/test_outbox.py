@@ -0,0 +1,448 @@
+"""Test outbox event delivery."""
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import asyncpg
+import pytest
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.partitions import (
+    day_bounds,
+    ensure_daily_partitions,
+    list_detached_partitions,
+    list_partitions,
+    partition_name,
+)
+from app.models.outbox import (
+    OUTBOX_NOTIFY_CHANNEL,
+    OUTBOX_PARTITIONS,
+    Outbox,
+    OutboxArchive,
+    OutboxStatus,
+)
+from app.repositories.outbox_partition_repository import OutboxPartitionRepository
+from app.repositories.outbox_repository import OutboxRepository
+from app.workers.event_handlers import EventContext, EventHandlerRegistry, event_handlers
+from app.workers.outbox_archiver import OutboxArchiver
+from app.workers.outbox_worker import AdaptiveBatchSize, OutboxWorker
+from tests.conftest import TEST_DATABASE_URL, TestSessionLocal, partition_by_day
+
+ALL_PARTITIONS = list(range(OUTBOX_PARTITIONS))
+
+
+def make_event(order_id: uuid.UUID | None = None, **payload: str) -> Outbox:
+    """Build an order.created event for `order_id` (a new order by default)."""
+    order_id = order_id or uuid.uuid4()
+    return Outbox(
+        event_type="order.created",
+        partition_key=str(order_id),
+        payload_json={"order_id": str(order_id), **payload},
+        next_attempt_at=datetime.utcnow(),
+    )
+
+
+@pytest.mark.asyncio
+async def test_outbox_insert_notifies_on_commit(db_session: AsyncSession):
+    """Test committing outbox events sends a single NOTIFY to listeners."""
+    notifications: asyncio.Queue[str] = asyncio.Queue()
+    listener = await asyncpg.connect(TEST_DATABASE_URL.replace("+asyncpg", ""))
+    await listener.add_listener(
+        OUTBOX_NOTIFY_CHANNEL, lambda conn, pid, channel, payload: notifications.put_nowait(channel)
+    )
+
+    try:
+        repo = OutboxRepository(db_session)
+        await repo.create_many([make_event() for _ in range(3)])
+        await asyncio.sleep(0.1)
+        assert notifications.empty()
+
+        await db_session.commit()
+        channel = await asyncio.wait_for(notifications.get(), timeout=5)
+        assert channel == OUTBOX_NOTIFY_CHANNEL
+
+        await asyncio.sleep(0.1)
+        assert notifications.empty()
+    finally:
+        await listener.close()
+
+
+@pytest.mark.asyncio
+async def test_events_are_processed_concurrently_in_own_transactions(db_session: AsyncSession):
+    """Test a failing event records its retry without affecting the others."""
+    repo = OutboxRepository(db_session)
+    good = [make_event(total="10.00") for _ in range(3)]
+    bad = make_event()
+    await repo.create_many([*good, bad])
+    await db_session.commit()
+
+    worker = OutboxWorker(session_factory=TestSessionLocal)
+    events = await OutboxRepository(db_session).claim_events(
+        worker.worker_id, ALL_PARTITIONS, limit=10, lease_seconds=60
+    )
+    await db_session.commit()
+    assert len(events) == 4
+
+    handler = event_handlers.get("order.created")
+    await asyncio.gather(*(worker._run_event(event, handler) for event in events))
+
+    db_session.expire_all()
+    for event in good:
+        await db_session.refresh(event)
+        assert event.status == OutboxStatus.SENT.value
+        assert event.claimed_by is None
+    await db_session.refresh(bad)
+    assert bad.status == OutboxStatus.PENDING.value
+    assert bad.attempts == 1
+    assert bad.next_attempt_at > datetime.now(timezone.utc)
+
+
+@pytest.mark.asyncio
+async def test_expired_leases_are_reclaimed(db_session: AsyncSession):
+    """Test claims are exclusive until the lease expires and stale owners cannot finish."""
+    repo = OutboxRepository(db_session)
+    event = make_event(total="10.00")
+    await repo.create(event)
+    await db_session.commit()
+
+    claimed = await repo.claim_events("worker-a", ALL_PARTITIONS, limit=10, lease_seconds=60)
+    await db_session.commit()
+    assert [e.id for e in claimed] == [event.id]
+    assert claimed[0].status == OutboxStatus.PROCESSING.value
+    assert await repo.claim_events("worker-b", ALL_PARTITIONS, limit=10, lease_seconds=60) == []
+    await db_session.commit()
+
+    # Let worker-a's lease run out
+    await db_session.execute(
+        update(Outbox)
+        .where(Outbox.id == event.id)
+        .values(lease_until=func.now() - timedelta(seconds=1))
+    )
+    await db_session.commit()
+
+    reclaimed = await repo.claim_events("worker-b", ALL_PARTITIONS, limit=10, lease_seconds=60)
+    await db_session.commit()
+    assert [e.id for e in reclaimed] == [event.id]
+    assert reclaimed[0].claimed_by == "worker-b"
+    assert reclaimed[0].attempts == 1
+
+    assert not await repo.finish_event(
+        event.id, "worker-a", OutboxStatus.SENT, 1, reclaimed[0].next_attempt_at
+    )
+    assert await repo.finish_event(
+        event.id, "worker-b", OutboxStatus.SENT, 1, reclaimed[0].next_attempt_at
+    )
+    await db_session.commit()
+
+
+@pytest.mark.asyncio
+async def test_events_of_one_key_are_claimed_in_order(db_session: AsyncSession):
+    """Test a key's next event is only claimable once the previous one has finished."""
+    repo = OutboxRepository(db_session)
+    order_id = uuid.uuid4()
+    first, second = make_event(order_id), make_event(order_id)
+    other = make_event()
+    await repo.create_many([first, second, other])
+    await db_session.commit()
+
+    claimed = await repo.claim_events("worker-a", ALL_PARTITIONS, limit=10, lease_seconds=60)
+    await db_session.commit()
+    assert {e.id for e in claimed} == {first.id, other.id}
+
+    # A scheduled retry keeps holding back the later event
+    assert await repo.finish_event(
+        first.id, "worker-a", OutboxStatus.PENDING, 1, datetime.now(timezone.utc)
+    )
+    await db_session.commit()
+    claimed = await repo.claim_events("worker-b", ALL_PARTITIONS, limit=10, lease_seconds=60)
+    await db_session.commit()
+    assert [e.id for e in claimed] == [first.id]
+
+    assert await repo.finish_event(
+        first.id, "worker-b", OutboxStatus.SENT, 1, datetime.now(timezone.utc)
+    )
+    await db_session.commit()
+    claimed = await repo.claim_events("worker-b", ALL_PARTITIONS, limit=10, lease_seconds=60)
+    await db_session.commit()
+    assert [e.id for e in claimed] == [second.id]
+
+
+@pytest.mark.asyncio
+async def test_partitions_are_divided_between_workers(db_session: AsyncSession):
+    """Test workers converge on disjoint fair shares of the partitions."""
+    repo = OutboxPartitionRepository(db_session)
+
+    assert await repo.rebalance("worker-a", lease_seconds=30) == ALL_PARTITIONS
+    await db_session.commit()
+
+    # worker-b finds nothing free until worker-a gives up its surplus
+    assert await repo.rebalance("worker-b", lease_seconds=30) == []
+    await db_session.commit()
+    owned_a = await repo.rebalance("worker-a", lease_seconds=30)
+    await db_session.commit()
+    owned_b = await repo.rebalance("worker-b", lease_seconds=30)
+    await db_session.commit()
+
+    assert len(owned_a) == len(owned_b) == OUTBOX_PARTITIONS // 2
+    assert sorted(owned_a + owned_b) == ALL_PARTITIONS
+
+    await repo.release("worker-a")
+    await db_session.commit()
+    assert await repo.rebalance("worker-b", lease_seconds=30) == ALL_PARTITIONS
+    await db_session.commit()
+
+
+@pytest.mark.asyncio
+async def test_events_without_handler_are_left_pending(db_session: AsyncSession):
+    """Test only registered types are dispatched, within their own concurrency limit."""
+    registry = EventHandlerRegistry()
+    handled: list[uuid.UUID] = []
+
+    @registry.register("test.handled", concurrency=2)
+    async def handle(event: Outbox, context: EventContext) -> None:
+        handled.append(event.id)
+
+    repo = OutboxRepository(db_session)
+    known = [make_event() for _ in range(3)]
+    for event in known:
+        event.event_type = "test.handled"
+    unknown = make_event()
+    unknown.event_type = "test.unknown"
+    await repo.create_many([*known, unknown])
+    await db_session.commit()
+
+    worker = OutboxWorker(session_factory=TestSessionLocal, handlers=registry)
+    worker._partitions = ALL_PARTITIONS
+
+    assert await worker._dispatch_events() == 2
+    await asyncio.gather(*worker._in_flight.values())
+    assert await worker._dispatch_events() == 1
+    await asyncio.gather(*worker._in_flight.values())
+    assert await worker._dispatch_events() == 0
+
+    assert sorted(handled) == sorted(event.id for event in known)
+    db_session.expire_all()
+    await db_session.refresh(unknown)
+    assert unknown.status == OutboxStatus.PENDING.value
+    assert unknown.attempts == 0
+
+    with pytest.raises(ValueError):
+        registry.register("test.handled")(handle)
+
+
+@pytest.mark.asyncio
+async def test_events_without_handler_do_not_block_their_key(db_session: AsyncSession):
+    """Test a registered event queued behind an unknown-type event of its key is delivered."""
+    registry = EventHandlerRegistry()
+    handled: list[uuid.UUID] = []
+
+    @registry.register("test.handled")
+    async def handle(event: Outbox, context: EventContext) -> None:
+        handled.append(event.id)
+
+    order_id = uuid.uuid4()
+    unknown, known = make_event(order_id), make_event(order_id)
+    unknown.event_type = "test.unknown"
+    known.event_type = "test.handled"
+    await OutboxRepository(db_session).create_many([unknown, known])
+    await db_session.commit()
+
+    worker = OutboxWorker(session_factory=TestSessionLocal, handlers=registry)
+    worker._partitions = ALL_PARTITIONS
+    assert await worker._dispatch_events() == 1
+    await asyncio.gather(*worker._in_flight.values())
+
+    assert handled == [known.id]
+    db_session.expire_all()
+    await db_session.refresh(unknown)
+    assert unknown.status == OutboxStatus.PENDING.value
+
+
+@pytest.mark.asyncio
+async def test_outcomes_are_recorded_in_one_statement(db_session: AsyncSession):
+    """Test sent, retried and dead outcomes of a batch are written together, skipping lost leases."""
+    repo = OutboxRepository(db_session)
+    sent, retried, dead, stolen = (make_event() for _ in range(4))
+    await repo.create_many([sent, retried, dead, stolen])
+    await db_session.commit()
+    await repo.claim_events("worker-a", ALL_PARTITIONS, limit=10, lease_seconds=60)
+    await db_session.execute(
+        update(Outbox).where(Outbox.id == stolen.id).values(claimed_by="worker-b")
+    )
+    await db_session.commit()
+
+    retry_at = datetime.now(timezone.utc) + timedelta(minutes=1)
+    finished = await repo.finish_events(
+        "worker-a",
+        [
+            (sent.id, OutboxStatus.SENT, 0, sent.next_attempt_at),
+            (retried.id, OutboxStatus.PENDING, 1, retry_at),
+            (dead.id, OutboxStatus.DEAD, 5, dead.next_attempt_at),
+            (stolen.id, OutboxStatus.SENT, 0, stolen.next_attempt_at),
+        ],
+    )
+    await db_session.commit()
+    assert finished == {sent.id, retried.id, dead.id}
+
+    db_session.expire_all()
+    for event, status in [
+        (sent, OutboxStatus.SENT),
+        (retried, OutboxStatus.PENDING),
+        (dead, OutboxStatus.DEAD),
+        (stolen, OutboxStatus.PROCESSING),
+    ]:
+        await db_session.refresh(event)
+        assert event.status == status.value
+    assert retried.attempts == 1
+    assert retried.next_attempt_at == retry_at
+    assert retried.claimed_by is None
+
+
+def test_claim_batch_adapts_to_backlog_and_latency():
+    """Test the claim batch follows the backlog and waits for slots only on fast handlers."""
+    batch = AdaptiveBatchSize("test", max_size=16)
+    batch.observe_claim(limit=16, claimed=3)
+    assert batch.size == 3
+    batch.observe_claim(limit=3, claimed=3)
+    batch.observe_claim(limit=6, claimed=6)
+    assert batch.size == 12
+    batch.observe_claim(limit=12, claimed=12)
+    assert batch.size == 16
+
+    batch.observe_latency(0.001)
+    assert not batch.should_claim(free=4, in_flight=12)
+    assert batch.should_claim(free=16, in_flight=0)
+    batch.observe_latency(5)
+    assert batch.should_claim(free=4, in_flight=12)
+
+
+@pytest.mark.asyncio
+async def test_old_sent_events_are_archived(db_session: AsyncSession):
+    """Test sent events past the retention period move to outbox_archive, others stay."""
+    repo = OutboxRepository(db_session)
+    old_sent, old_dead, recent_sent = make_event(), make_event(), make_event()
+    await repo.create_many([old_sent, old_dead, recent_sent])
+    await db_session.commit()
+
+    await db_session.execute(
+        update(Outbox)
+        .where(Outbox.id.in_([old_sent.id, recent_sent.id]))
+        .values(status=OutboxStatus.SENT.value)
+    )
+    await db_session.execute(
+        update(Outbox).where(Outbox.id == old_dead.id).values(status=OutboxStatus.DEAD.value)
+    )
+    await db_session.execute(
+        update(Outbox)
+        .where(Outbox.id.in_([old_sent.id, old_dead.id]))
+        .values(created_at=func.now() - timedelta(days=30))
+    )
+    await db_session.commit()
+
+    await OutboxArchiver(session_factory=TestSessionLocal).archive()
+
+    result = await db_session.execute(select(Outbox.id))
+    assert set(result.scalars().all()) == {old_dead.id, recent_sent.id}
+    result = await db_session.execute(select(OutboxArchive))
+    archived = result.scalars().all()
+    assert [event.id for event in archived] == [old_sent.id]
+    assert archived[0].partition_key == old_sent.partition_key
+
+
+@pytest.mark.asyncio
+async def test_old_partitions_are_archived_by_the_drop(
+    db_session: AsyncSession, monkeypatch: pytest.MonkeyPatch
+):
+    """Test sent events of old daily partitions are archived by the drop, not by DELETEs."""
+    monkeypatch.setattr(settings, "outbox_archive_batch_size", 1)
+    await partition_by_day(db_session, "outbox")
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.outbox_retention_hours)
+    old_day, cutoff_day = cutoff.date() - timedelta(days=1), cutoff.date()
+    await ensure_daily_partitions(db_session, "outbox", old_day, 2)
+    await db_session.commit()
+
+    events = {
+        # In a partition wholly past the retention period
+        "old_sent": (day_bounds(old_day)[0], OutboxStatus.SENT),
+        "old_sent_2": (day_bounds(old_day)[0], OutboxStatus.SENT),
+        "old_dead": (day_bounds(old_day)[0], OutboxStatus.DEAD),
+        # Past the retention period, but its partition is still live
+        "waiting": (day_bounds(cutoff_day)[0], OutboxStatus.SENT),
+        # Outside the daily partitions, in the default one
+        "default_sent": (cutoff - timedelta(days=10), OutboxStatus.SENT),
+    }
+    ids = {}
+    for label, (created_at, status) in events.items():
+        event = make_event()
+        await OutboxRepository(db_session).create(event)
+        await db_session.commit()
+        await db_session.execute(
+            update(Outbox)
+            .where(Outbox.id == event.id)
+            .values(status=status.value, created_at=created_at)
+        )
+        await db_session.commit()
+        ids[label] = event.id
+
+    archiver = OutboxArchiver(session_factory=TestSessionLocal)
+    moved: list[int] = []
+    move_sent = archiver._move_sent
+
+    async def record_move_sent(session: AsyncSession, cutoff: datetime, table: str) -> int:
+        count = await move_sent(session, cutoff, table)
+        moved.append(count)
+        return count
+
+    monkeypatch.setattr(archiver, "_move_sent", record_move_sent)
+    await archiver.archive()
+
+    # Only the default partition's event was moved row by row
+    assert moved == [1]
+    partitions = await list_partitions(db_session, "outbox")
+    assert partition_name("outbox", old_day) not in partitions
+    assert partition_name("outbox", cutoff_day) in partitions
+    assert await list_detached_partitions(db_session, "outbox") == []
+
+    result = await db_session.execute(select(OutboxArchive.id))
+    assert set(result.scalars().all()) == {
+        ids["old_sent"],
+        ids["old_sent_2"],
+        ids["default_sent"],
+    }
+    result = await db_session.execute(select(Outbox.id))
+    assert set(result.scalars().all()) == {ids["old_dead"], ids["waiting"]}
+
+
+@pytest.mark.asyncio
+async def test_coalescing_delivers_only_the_latest_state(
+    db_session: AsyncSession, monkeypatch: pytest.MonkeyPatch
+):
+    """Test superseded events of a coalescing type are marked sent without delivery."""
+    monkeypatch.setattr(settings, "outbox_coalescing_enabled", True)
+    registry = EventHandlerRegistry()
+    delivered: list[uuid.UUID] = []
+
+    @registry.register("test.state", coalesce=True)
+    async def handle(event: Outbox, context: EventContext) -> None:
+        delivered.append(event.id)
+
+    order_id = uuid.uuid4()
+    burst = [make_event(order_id) for _ in range(3)]
+    single = make_event()
+    for event in [*burst, single]:
+        event.event_type = "test.state"
+    await OutboxRepository(db_session).create_many([*burst, single])
+    await db_session.commit()
+
+    worker = OutboxWorker(session_factory=TestSessionLocal, handlers=registry)
+    worker._partitions = ALL_PARTITIONS
+    assert await worker._dispatch_events() == 2
+    await asyncio.gather(*worker._in_flight.values())
+
+    assert sorted(delivered) == sorted([burst[-1].id, single.id])
+    db_session.expire_all()
+    for event in [*burst, single]:
+        await db_session.refresh(event)
+        assert event.status == OutboxStatus.SENT.value
@@ -0,0 +1,82 @@
+"""Test relaying outbox events to Redis Streams."""
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from typing import AsyncGenerator
+
+import pytest
+import redis.asyncio as redis
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import json_codec
+from app.core.config import settings
+from app.core.event_stream import StreamConsumer, ensure_consumer_group, stream_name
+from app.models.outbox import OUTBOX_PARTITIONS, Outbox, OutboxStatus
+from app.repositories.outbox_repository import OutboxRepository
+from app.workers.event_handlers import EventHandlerRegistry
+from app.workers.outbox_worker import OutboxWorker
+from tests.conftest import TestSessionLocal
+
+EVENT_TYPE = "test.relayed"
+
+
+@pytest.fixture
+async def redis_client() -> AsyncGenerator[redis.Redis, None]:
+    """Redis client with the test relay stream removed before and after."""
+    client = redis.from_url(str(settings.redis_url), decode_responses=True)
+    await client.delete(stream_name(EVENT_TYPE))
+    yield client
+    await client.delete(stream_name(EVENT_TYPE))
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_events_fan_out_to_consumer_groups(
+    db_session: AsyncSession, redis_client: redis.Redis
+):
+    """Test relayed events are marked sent and every consumer group reads and acks them."""
+    events = []
+    for _ in range(3):
+        order_id = uuid.uuid4()
+        events.append(
+            Outbox(
+                event_type=EVENT_TYPE,
+                partition_key=str(order_id),
+                payload_json={"order_id": order_id, "total": Decimal("10.50")},
+                next_attempt_at=datetime.utcnow(),
+            )
+        )
+    await OutboxRepository(db_session).create_many(events)
+    await db_session.commit()
+
+    for group in ("payments", "analytics"):
+        await ensure_consumer_group(redis_client, EVENT_TYPE, group)
+    # creating an existing group is a no-op
+    await ensure_consumer_group(redis_client, EVENT_TYPE, "payments")
+
+    worker = OutboxWorker(session_factory=TestSessionLocal, handlers=EventHandlerRegistry())
+    worker._partitions = list(range(OUTBOX_PARTITIONS))
+    worker.relay_types = [EVENT_TYPE]
+    worker.redis = redis_client
+    assert await worker._relay_events() == 3
+    assert await worker._relay_events() == 0
+
+    db_session.expire_all()
+    for event in events:
+        await db_session.refresh(event)
+        assert event.status == OutboxStatus.SENT.value
+
+    expected = {str(event.id) for event in events}
+    for group in ("payments", "analytics"):
+        consumer = StreamConsumer(redis_client, EVENT_TYPE, group, f"{group}-1")
+        messages = await consumer.read(count=10, block_ms=100)
+        assert {fields["id"] for _, fields in messages} == expected
+        for _, fields in messages:
+            payload = json_codec.loads(fields["payload"])
+            assert payload["order_id"] == fields["partition_key"]
+            assert payload["total"] == "10.50"
+        await consumer.ack([message_id for message_id, _ in messages])
+        assert await consumer.read(count=10, block_ms=100) == []
+
+    pending = await redis_client.xpending(stream_name(EVENT_TYPE), "payments")
+    assert pending["pending"] == 0
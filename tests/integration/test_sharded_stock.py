@@ -0,0 +1,176 @@
+"""Test sharded stock counters for hot products."""
+import asyncio
+import time
+import uuid
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.order import OrderItem
+from app.models.product import Product
+from app.repositories.stock_shard_repository import StockShardRepository
+from app.schemas.order import OrderBatchEntry, OrderCreate, OrderItemCreate
+from app.services.inventory_service import InventoryService
+from app.services.order_service import OrderService
+from app.services.product_service import ProductService
+from tests.conftest import TestSessionLocal
+
+ADMIN_HEADERS = {"X-Admin-Secret": settings.admin_secret}
+
+
+@pytest.mark.asyncio
+async def test_sharded_product_lifecycle(client: AsyncClient, db_session: AsyncSession):
+    """Test that sharded stock is reserved, restored, aggregated and rebalanced."""
+    response = await client.post(
+        "/admin/products",
+        json={"name": "Hot SKU", "price": "10.00", "stock": 10, "stock_shards": 4},
+        headers=ADMIN_HEADERS,
+    )
+    assert response.status_code == 201
+    product = response.json()
+    assert product["stock"] == 10
+    assert product["stock_shards"] == 4
+
+    order_data = {
+        "user_email": "test@example.com",
+        "items": [{"product_id": product["id"], "quantity": 3}],
+    }
+    response = await client.post(
+        "/orders", json=order_data, headers={"Idempotency-Key": str(uuid.uuid4())}
+    )
+    assert response.status_code == 201
+    order_id = response.json()["id"]
+
+    response = await client.get("/products")
+    assert response.json()[0]["stock"] == 7
+
+    # More than any single shard holds: reserved across shards
+    order_data["items"][0]["quantity"] = 7
+    response = await client.post(
+        "/orders", json=order_data, headers={"Idempotency-Key": str(uuid.uuid4())}
+    )
+    assert response.status_code == 201
+
+    order_data["items"][0]["quantity"] = 1
+    response = await client.post(
+        "/orders", json=order_data, headers={"Idempotency-Key": str(uuid.uuid4())}
+    )
+    assert response.status_code == 409
+    assert "Insufficient stock" in response.json()["detail"]
+
+    response = await client.post(f"/orders/{order_id}/cancel")
+    assert response.status_code == 200
+
+    response = await client.get("/products")
+    assert response.json()[0]["stock"] == 3
+
+    response = await client.patch(
+        f"/admin/products/{product['id']}",
+        json={"stock": 20, "stock_shards": 0},
+        headers=ADMIN_HEADERS,
+    )
+    assert response.status_code == 200
+    assert response.json()["stock"] == 20
+    assert response.json()["stock_shards"] == 0
+
+
+@pytest.mark.asyncio
+async def test_release_after_reshard(db_session: AsyncSession):
+    """Test that released stock lands on an existing shard or on products.stock."""
+    product_service = ProductService(db_session)
+    resharded = await product_service.create_product(
+        name="Resharded SKU", price=10, stock=10, stock_shards=4
+    )
+    unsharded = await product_service.create_product(
+        name="Unsharded SKU", price=10, stock=10, stock_shards=4
+    )
+    await product_service.update_product(resharded.id, stock_shards=2)
+    await product_service.update_product(unsharded.id, stock_shards=0)
+
+    await InventoryService(db_session)._release_sharded(
+        [
+            OrderItem(product_id=resharded.id, quantity=3),
+            OrderItem(product_id=unsharded.id, quantity=3),
+        ],
+        "Restored",
+    )
+    await db_session.commit()
+
+    totals = await StockShardRepository(db_session).get_totals([resharded.id, unsharded.id])
+    assert totals == {resharded.id: 13}
+    db_session.expire_all()
+    product = await product_service.get_product(unsharded.id)
+    assert product is not None
+    assert product.stock == 13
+
+
+@pytest.mark.asyncio
+async def test_batch_does_not_lock_sharded_product_rows(db_session: AsyncSession):
+    """Test a batch allocates from the shards while another transaction holds the product row."""
+    product = await ProductService(db_session).create_product(
+        name="Hot Batch SKU", price=10, stock=10, stock_shards=4
+    )
+    entries = [
+        OrderBatchEntry(
+            idempotency_key=str(uuid.uuid4()),
+            user_email="b2b@example.com",
+            items=[OrderItemCreate(product_id=product.id, quantity=3)],
+        )
+        for _ in range(2)
+    ]
+
+    async with TestSessionLocal() as holder:
+        await holder.execute(select(Product).where(Product.id == product.id).with_for_update())
+        async with TestSessionLocal() as session:
+            outcomes = await asyncio.wait_for(
+                OrderService(session).create_orders_batch(entries), timeout=5
+            )
+        await holder.rollback()
+
+    assert all(error is None for *_, error in outcomes)
+    totals = await StockShardRepository(db_session).get_totals([product.id])
+    assert totals == {product.id: 4}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("stock_shards", [0, 1, 4, 16])
+async def test_sharded_stock_throughput(db_session: AsyncSession, stock_shards: int):
+    """Benchmark orders/sec on a single product versus shard count."""
+    total_orders = 200
+    concurrency = 10
+
+    product = await ProductService(db_session).create_product(
+        name="Benchmark SKU", price=1, stock=total_orders, stock_shards=stock_shards
+    )
+    order_data = OrderCreate(
+        user_email="bench@example.com",
+        items=[OrderItemCreate(product_id=product.id, quantity=1)],
+    )
+    queue: asyncio.Queue[int] = asyncio.Queue()
+    for i in range(total_orders):
+        queue.put_nowait(i)
+
+    async def client_loop() -> None:
+        async with TestSessionLocal() as session:
+            service = OrderService(session)
+            while not queue.empty():
+                queue.get_nowait()
+                await service.create_order(order_data, str(uuid.uuid4()))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    print(
+        f"\nstock_shards={stock_shards}: {total_orders} orders in {elapsed:.2f}s "
+        f"({total_orders / elapsed:.0f} orders/sec, concurrency={concurrency})"
+    )
+
+    product_id = product.id
+    db_session.expire_all()
+    product = await ProductService(db_session).get_product(product_id)
+    assert product is not None
+    assert product.stock == 0
@@ -0,0 +1,110 @@
+"""Test Redis stock ledger admission and reconciliation."""
+import uuid
+from typing import AsyncGenerator
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import rate_limiter
+from app.core.config import settings
+from app.core.stock_ledger import KEY_PREFIX, stock_ledger
+from app.models.product import Product
+from app.workers.stock_ledger_reconciler import StockLedgerReconciler
+from tests.conftest import TestSessionLocal
+
+ADMIN_HEADERS = {"X-Admin-Secret": settings.admin_secret}
+
+
+@pytest.fixture
+async def ledger(monkeypatch: pytest.MonkeyPatch) -> AsyncGenerator[None, None]:
+    """Enable the stock ledger against a clean Redis keyspace."""
+    monkeypatch.setattr(settings, "stock_ledger_enabled", True)
+    client = rate_limiter.init_redis()
+    async for key in client.scan_iter(f"{KEY_PREFIX}*"):
+        await client.delete(key)
+    yield
+    await rate_limiter.close_redis()
+    rate_limiter.redis_client = None
+
+
+@pytest.mark.asyncio
+async def test_ledger_rejects_sold_out_and_tracks_cancellation(
+    client: AsyncClient, db_session: AsyncSession, ledger: None
+):
+    """Test that the ledger mirrors reservations and cancellations."""
+    response = await client.post(
+        "/admin/products",
+        json={"name": "Ledger SKU", "price": "5.00", "stock": 2},
+        headers=ADMIN_HEADERS,
+    )
+    product_id = uuid.UUID(response.json()["id"])
+    assert await stock_ledger.get_levels([product_id]) == {product_id: 2}
+
+    order_data = {
+        "user_email": "test@example.com",
+        "items": [{"product_id": str(product_id), "quantity": 2}],
+    }
+    response = await client.post(
+        "/orders", json=order_data, headers={"Idempotency-Key": str(uuid.uuid4())}
+    )
+    assert response.status_code == 201
+    order_id = response.json()["id"]
+    assert await stock_ledger.get_levels([product_id]) == {product_id: 0}
+
+    response = await client.post(
+        "/orders", json=order_data, headers={"Idempotency-Key": str(uuid.uuid4())}
+    )
+    assert response.status_code == 409
+    assert f"Insufficient stock for product {product_id}" in response.json()["detail"]
+
+    response = await client.post(f"/orders/{order_id}/cancel")
+    assert response.status_code == 200
+    assert await stock_ledger.get_levels([product_id]) == {product_id: 2}
+
+
+@pytest.mark.asyncio
+async def test_reconciler_repairs_persistent_drift(db_session: AsyncSession, ledger: None):
+    """Test that the reconciler seeds the ledger and repairs drift seen twice."""
+    product = Product(name="Drifting SKU", price=1, stock=7, is_active=True)
+    inactive = Product(name="Inactive SKU", price=1, stock=3, is_active=False)
+    db_session.add_all([product, inactive])
+    await db_session.commit()
+
+    reconciler = StockLedgerReconciler(TestSessionLocal)
+    assert await reconciler.reconcile(full_reseed=True) == 2
+    assert await stock_ledger.get_levels([product.id, inactive.id]) == {
+        product.id: 7,
+        inactive.id: None,
+    }
+
+    await stock_ledger.set_levels({product.id: 1})
+    assert await reconciler.reconcile() == 0
+    assert await reconciler.reconcile() == 1
+    assert await stock_ledger.get_levels([product.id]) == {product.id: 7}
+
+
+@pytest.mark.asyncio
+async def test_reconciler_keeps_concurrent_holds(
+    db_session: AsyncSession, ledger: None, monkeypatch: pytest.MonkeyPatch
+):
+    """Test that a drift repair does not overwrite a hold made after the comparison."""
+    product = Product(name="Busy SKU", price=1, stock=7, is_active=True)
+    db_session.add(product)
+    await db_session.commit()
+
+    reconciler = StockLedgerReconciler(TestSessionLocal)
+    await reconciler.reconcile(full_reseed=True)
+    await stock_ledger.set_levels({product.id: 2})
+    assert await reconciler.reconcile() == 0
+
+    get_levels = stock_ledger.get_levels
+
+    async def get_levels_then_hold(product_ids: list[uuid.UUID]) -> dict[uuid.UUID, int | None]:
+        levels = await get_levels(product_ids)
+        assert await stock_ledger.hold([(product.id, 1)])
+        return levels
+
+    monkeypatch.setattr(stock_ledger, "get_levels", get_levels_then_hold)
+    assert await reconciler.reconcile() == 0
+    assert await get_levels([product.id]) == {product.id: 1}
@@ -0,0 +1,119 @@
+"""Test the outbox worker pool supervisor and worker draining."""
+import asyncio
+import json
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.workers import pool as pool_module
+from app.workers.outbox_worker import OutboxWorker
+from app.workers.pool import OutboxWorkerPool
+
+
+class FakeProcess:
+    """Stand-in for a worker process that is alive until `exit()` is called."""
+
+    def __init__(self) -> None:
+        self.pid = id(self)
+        self.exitcode: int | None = None
+
+    def is_alive(self) -> bool:
+        return self.exitcode is None
+
+    def exit(self, code: int = 1) -> None:
+        self.exitcode = code
+
+
+async def get_health(port: int) -> tuple[str, dict[str, object]]:
+    """Request GET /healthz and return the status line and JSON body."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"GET /healthz HTTP/1.1\r\nHost: localhost\r\n\r\n")
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, body = response.split(b"\r\n\r\n", 1)
+    return head.split(b"\r\n", 1)[0].decode(), json.loads(body)
+
+
+@pytest.mark.asyncio
+async def test_health_reports_dead_processes_and_shutdown():
+    """Test /healthz answers 200 with every process alive and 503 otherwise."""
+    pool = OutboxWorkerPool(processes=2)
+    children = [FakeProcess(), FakeProcess()]
+    pool._children = list(children)
+    server = await asyncio.start_server(pool._handle_health, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+
+    try:
+        status, report = await get_health(port)
+        assert status == "HTTP/1.1 200 OK"
+        assert report == {"status": "healthy", "processes": 2, "alive": 2}
+
+        children[1].exit()
+        status, report = await get_health(port)
+        assert status == "HTTP/1.1 503 Service Unavailable"
+        assert report == {"status": "unhealthy", "processes": 2, "alive": 1}
+
+        pool._children = [FakeProcess(), FakeProcess()]
+        pool._stopping.set()
+        status, report = await get_health(port)
+        assert status == "HTTP/1.1 503 Service Unavailable"
+        assert report["alive"] == 2
+    finally:
+        server.close()
+        await server.wait_closed()
+
+
+def test_crashing_process_is_restarted_with_backoff(monkeypatch: pytest.MonkeyPatch):
+    """Test restarts of a crashing process wait twice as long each time, up to the cap."""
+    monkeypatch.setattr(settings, "outbox_worker_restart_backoff_seconds", 1)
+    monkeypatch.setattr(settings, "outbox_worker_restart_backoff_max_seconds", 4)
+    now = [0.0]
+    monkeypatch.setattr(pool_module, "time", SimpleNamespace(monotonic=lambda: now[0]))
+
+    pool = OutboxWorkerPool(processes=1)
+    spawned: list[FakeProcess] = []
+
+    def spawn() -> FakeProcess:
+        spawned.append(FakeProcess())
+        return spawned[-1]
+
+    monkeypatch.setattr(pool, "_spawn", spawn)
+    pool._children = [spawn()]
+    pool._started_at, pool._crashes, pool._restart_at = [0.0], [0], [None]
+
+    def crash_and_time_restart() -> float:
+        """Crash the current process and return how long its restart took."""
+        crashed_at = now[0]
+        pool._children[0].exit()
+        count = len(spawned)
+        while len(spawned) == count:
+            pool._supervise()
+            now[0] += 0.5
+        return now[0] - 0.5 - crashed_at
+
+    assert [crash_and_time_restart() for _ in range(4)] == [1, 2, 4, 4]
+
+    # A process that stays up as long as the cap resets the backoff
+    now[0] += 4
+    pool._supervise()
+    assert crash_and_time_restart() == 1
+
+
+@pytest.mark.asyncio
+async def test_drain_finishes_in_flight_events_and_cancels_the_rest(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    """Test a stopping worker waits for in-flight events up to the drain timeout."""
+    monkeypatch.setattr(settings, "outbox_drain_timeout_seconds", 0.2)
+    worker = OutboxWorker()
+    fast = asyncio.create_task(asyncio.sleep(0.05))
+    slow = asyncio.create_task(asyncio.sleep(10))
+    worker._in_flight = {uuid.uuid4(): fast, uuid.uuid4(): slow}
+
+    await asyncio.wait_for(worker._drain(), timeout=1)
+
+    assert fast.done() and not fast.cancelled()
+    assert slow.cancelled()